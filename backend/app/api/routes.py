@@ -1,34 +1,182 @@
 """
 API routes for the Activity Selector application.
 """
-from typing import List
-from fastapi import APIRouter, HTTPException, Query
-from fastapi.responses import JSONResponse
+import asyncio
+import hashlib
+import hmac
+import json
+import math
+import os
+import time
+from datetime import date
+from functools import partial
+from itertools import chain
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, TypeVar
+import httpx
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 
 from ..models import (
     Category, 
     Activity, 
+    ActivityFilter,
     ActivityRequest, 
     ActivityResponse, 
+    CategoryStats,
     ErrorResponse,
-    PriceLevel
+    OrderRecord,
+    PriceLevel,
+    SnapshotEvent,
+    TenantConfig,
+    VisitRecord
 )
-from ..services.sheets_service import sheets_service
+from ..services.admission import AdmissionLimiter, Overloaded, QuotaExceeded, admission
+from ..services.geo_index import parse_point
+from ..services.geocoding import Geocoder
+from ..services.sheets_service import DEFAULT_TENANT, GoogleSheetsService, UnknownCategory
+from ..services.snapshot import CategorySnapshot
+from ..services.snapshot_events import SnapshotEventBus, Subscription
+from ..services.tenants import tenant_registry
 
 router = APIRouter(prefix="/api", tags=["activities"])
 
+T = TypeVar("T")
+FilterT = TypeVar("FilterT", bound=ActivityFilter)
+
+# Maximum number of suggestion requests accepted by /suggest/batch
+MAX_BATCH_SIZE = 50
+
+# Number of NDJSON lines written per chunk by /activities/export
+EXPORT_CHUNK_SIZE = 500
+
+# Seconds between keep-alive comments on an idle /events stream
+SSE_HEARTBEAT_SECONDS = 15
+
+# Reconnect delay suggested to EventSource clients, in milliseconds
+SSE_RETRY_MS = 3000
+
+
+async def get_tenant_service(
+    x_tenant_id: Optional[str] = Header(None, description="Tenant whose spreadsheet to use"),
+    x_api_key: Optional[str] = Header(None, description="API key of the tenant"),
+    tenant: Optional[str] = Query(None, description="Tenant id, for clients that cannot send headers (EventSource)")
+) -> GoogleSheetsService:
+    """
+    Resolve and authenticate the Sheets service of the requesting tenant.
+    
+    Async so that requests served from the cache never wait for a
+    threadpool worker behind Sheets-bound requests.
+    
+    Args:
+        x_tenant_id (str, optional): X-Tenant-ID header
+        x_api_key (str, optional): X-API-Key header
+        tenant (str, optional): Tenant query parameter, used if the header is absent
+    
+    Returns:
+        GoogleSheetsService: Service of the tenant (the default tenant if none is given)
+    
+    Raises:
+        HTTPException: 404 if the tenant is not registered, 401 if the API key is missing or wrong
+    """
+    return await _authenticated_service(x_tenant_id or tenant or DEFAULT_TENANT, x_api_key)
+
+
+async def get_event_tenant_service(
+    x_tenant_id: Optional[str] = Header(None, description="Tenant whose spreadsheet to use"),
+    x_api_key: Optional[str] = Header(None, description="API key of the tenant"),
+    tenant: Optional[str] = Query(None, description="Tenant id, for clients that cannot send headers (EventSource)"),
+    api_key: Optional[str] = Query(None, description="API key, for clients that cannot send headers (EventSource)")
+) -> GoogleSheetsService:
+    """
+    Resolve the tenant of an event stream, which may send its key in the query.
+    
+    EventSource cannot send headers. Other routes only take the key from
+    the X-API-Key header, so it stays out of access logs.
+    
+    Args:
+        x_tenant_id (str, optional): X-Tenant-ID header
+        x_api_key (str, optional): X-API-Key header
+        tenant (str, optional): Tenant query parameter, used if the header is absent
+        api_key (str, optional): API key query parameter, used if the header is absent
+    
+    Returns:
+        GoogleSheetsService: Service of the tenant (the default tenant if none is given)
+    
+    Raises:
+        HTTPException: 404 if the tenant is not registered, 401 if the API key is missing or wrong
+    """
+    return await _authenticated_service(x_tenant_id or tenant or DEFAULT_TENANT, x_api_key or api_key)
+
+
+async def _authenticated_service(tenant_id: str, api_key: Optional[str]) -> GoogleSheetsService:
+    """
+    Check a tenant's API key and get its service.
+    
+    Args:
+        tenant_id (str): Tenant identifier
+        api_key (Optional[str]): Key sent by the client
+    
+    Returns:
+        GoogleSheetsService: Service of the tenant
+    
+    Raises:
+        HTTPException: 404 if the tenant is not registered, 401 if the API key is missing or wrong
+    """
+    if not tenant_registry.is_registered(tenant_id):
+        raise HTTPException(
+            status_code=404,
+            detail=f"Unknown tenant: {tenant_id}"
+        )
+    if not tenant_registry.check_api_key(tenant_id, api_key):
+        raise HTTPException(
+            status_code=401,
+            detail="Invalid or missing API key"
+        )
+    
+    service = tenant_registry.started(tenant_id)
+    if service is None:
+        # Only a tenant's first request builds its service and API clients
+        service = await run_in_threadpool(tenant_registry.get, tenant_id)
+    return service
+
 
 @router.get("/categories", response_model=List[Category])
-async def get_categories():
+async def get_categories(
+    request: Request,
+    response: Response,
+    x_request_timeout: Optional[float] = Header(None, gt=0, description="Seconds the client is willing to wait"),
+    service: GoogleSheetsService = Depends(get_tenant_service)
+):
     """
     Get all available activity categories.
     
+    The response carries an ETag; a request whose If-None-Match matches it
+    gets an empty 304 instead.
+    
+    Args:
+        request (Request): Incoming request, checked for If-None-Match
+        response (Response): Response, marked stale when served under overload
+        x_request_timeout (float, optional): Client deadline in seconds
+        service (GoogleSheetsService): Sheets service of the requesting tenant
+    
     Returns:
         List[Category]: List of available categories
     """
     try:
-        categories = sheets_service.get_categories()
-        return categories
+        categories = service.cached_categories()
+        if categories is None:
+            categories = await _call_sheets(
+                "categories",
+                x_request_timeout,
+                service.get_categories,
+                stale=partial(service.cached_categories, allow_stale=True),
+                response=response
+            )
+        return _conditional_json(request, response, categories)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -38,22 +186,65 @@ async def get_categories():
 
 @router.get("/activities", response_model=List[Activity])
 async def get_activities(
+    request: Request,
+    response: Response,
     category: str = Query(..., description="Category name"),
-    price_level: PriceLevel = Query(None, description="Price level filter")
+    price_level: PriceLevel = Query(None, description="Price level filter"),
+    min_price_level: Optional[PriceLevel] = Query(None, description="Lowest price level to include"),
+    max_price_level: Optional[PriceLevel] = Query(None, description="Highest price level to include"),
+    min_bill_price: Optional[float] = Query(None, ge=0, description="Minimum last bill price"),
+    max_bill_price: Optional[float] = Query(None, ge=0, description="Maximum last bill price"),
+    last_visit_before: Optional[date] = Query(None, description="Only activities not visited since this date"),
+    last_visit_after: Optional[date] = Query(None, description="Only activities visited after this date"),
+    near: Optional[str] = Query(None, description="'latitude,longitude' or a place name to search around"),
+    radius: Optional[float] = Query(None, gt=0, description="Search radius around near in kilometres (default 5)"),
+    x_request_timeout: Optional[float] = Header(None, gt=0, description="Seconds the client is willing to wait"),
+    service: GoogleSheetsService = Depends(get_tenant_service)
 ):
     """
-    Get all activities for a specific category and optional price level.
+    Get all activities for a specific category, optionally filtered.
+    
+    The response carries an ETag; a request whose If-None-Match matches it
+    gets an empty 304 instead.
     
     Args:
+        request (Request): Incoming request, checked for If-None-Match
+        response (Response): Response, marked stale when served under overload
         category (str): Category name
         price_level (PriceLevel, optional): Price level filter
-        
+        min_price_level, max_price_level (PriceLevel, optional): Price level range
+        min_bill_price, max_bill_price (float, optional): Last bill price range
+        last_visit_before, last_visit_after (date, optional): Last visit date bounds
+        near (str, optional): Point or place to search around (results are sorted nearest first)
+        radius (float, optional): Search radius in kilometres
+        x_request_timeout (float, optional): Client deadline in seconds
+        service (GoogleSheetsService): Sheets service of the requesting tenant
+    
     Returns:
         List[Activity]: List of activities matching the criteria
     """
     try:
-        activities = sheets_service.get_activities_by_category(category, price_level)
-        return activities
+        filters = ActivityFilter(
+            min_price_level=min_price_level,
+            max_price_level=max_price_level,
+            min_bill_price=min_bill_price,
+            max_bill_price=max_bill_price,
+            last_visit_before=last_visit_before,
+            last_visit_after=last_visit_after,
+            near=near,
+            radius=radius
+        )
+        filters = await _resolve_near(filters, service.geocoder, x_request_timeout)
+        snapshots = await _load_snapshots("activities", service, [category], x_request_timeout, response)
+        activities = snapshots[category].select(price_level, filters)
+        return _conditional_json(request, response, activities)
+    except HTTPException:
+        raise
+    except UnknownCategory as e:
+        raise HTTPException(
+            status_code=404,
+            detail=str(e.args[0])
+        )
     except ValueError as e:
         raise HTTPException(
             status_code=400,
@@ -66,37 +257,227 @@ async def get_activities(
         )
 
 
-@router.post("/suggest", response_model=ActivityResponse)
-async def suggest_activities(request: ActivityRequest):
+@router.get("/activities/export")
+async def export_activities(
+    category: Optional[List[str]] = Query(None, description="Category names (all categories if omitted)"),
+    x_request_timeout: Optional[float] = Header(None, gt=0, description="Seconds the client is willing to wait"),
+    service: GoogleSheetsService = Depends(get_tenant_service)
+):
+    """
+    Stream activities as newline-delimited JSON.
+    
+    Activities are serialized in chunks while categories are loaded one at
+    a time, so memory stays bounded and the first bytes go out before the
+    whole export is built. Category names are checked and the first
+    category is loaded before the response starts, so those failures still
+    get a proper status code. The admission slot is held until the stream ends.
+    
+    Args:
+        category (List[str], optional): Category names to export
+        x_request_timeout (float, optional): Client deadline in seconds
+        service (GoogleSheetsService): Sheets service of the requesting tenant
+    
+    Returns:
+        StreamingResponse: One JSON-encoded Activity per line
+    """
+    limiter = admission.limiter("export")
+    try:
+        await limiter.acquire(x_request_timeout)
+    except Overloaded as e:
+        raise _overloaded(e)
+    
+    started = time.monotonic()
+    try:
+        activities = await _start_export(service, category)
+    except BaseException:
+        limiter.release(time.monotonic() - started)
+        raise
+    
+    return _AdmittedStreamingResponse(
+        _ndjson_chunks(activities),
+        limiter,
+        started,
+        media_type="application/x-ndjson"
+    )
+
+
+async def _start_export(service: GoogleSheetsService, categories: Optional[List[str]]) -> Iterator[Activity]:
+    """
+    Check the exported categories and load the first one.
+    
+    Args:
+        service (GoogleSheetsService): Sheets service of the requesting tenant
+        categories (Optional[List[str]]): Category names (all categories if None)
+    
+    Returns:
+        Iterator[Activity]: Activities of the first category, then of the others as they load
+    
+    Raises:
+        HTTPException: 404 for unknown categories, 500 if Sheets fails
+    """
+    try:
+        if not categories:
+            categories = [c.sheet_name for c in await run_in_threadpool(service.get_categories)]
+        unknown = await run_in_threadpool(service.unknown_categories, categories)
+        if unknown:
+            raise UnknownCategory(unknown)
+        if not categories:
+            return iter(())
+        first = await run_in_threadpool(service.get_category_snapshot, categories[0])
+    except UnknownCategory as e:
+        raise HTTPException(
+            status_code=404,
+            detail=str(e.args[0])
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to export activities: {str(e)}"
+        )
+    return chain(first.activities, service.iter_activities(categories[1:]))
+
+
+class _AdmittedStreamingResponse(StreamingResponse):
+    """
+    Streaming response that frees its admission slot however it ends.
+    
+    The release cannot live in the body generator alone: a generator that
+    is never iterated (e.g. the client left before streaming started)
+    never runs its finally block.
+    """
+    
+    def __init__(self, content: Iterator[str], limiter: AdmissionLimiter, started: float, **kwargs: Any):
+        """
+        Initialize the response.
+        
+        Args:
+            content (Iterator[str]): Blocking chunk iterator, run in the threadpool
+            limiter (AdmissionLimiter): Limiter holding the slot
+            started (float): time.monotonic() when the slot was acquired
+            **kwargs: Further StreamingResponse arguments
+        """
+        super().__init__(content, **kwargs)
+        self.limiter = limiter
+        self.started = started
+    
+    async def __call__(self, scope: Any, receive: Any, send: Any) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.limiter.release(time.monotonic() - self.started)
+
+
+def _ndjson_chunks(activities: Iterator[Activity]) -> Iterator[str]:
     """
-    Get random activity suggestions based on category and price level.
+    Serialize activities into NDJSON chunks.
     
     Args:
-        request (ActivityRequest): Request containing category, price level, and limit
+        activities (Iterator[Activity]): Activities to serialize
         
+    Yields:
+        str: Chunks of up to EXPORT_CHUNK_SIZE lines
+    """
+    lines = []
+    for activity in activities:
+        lines.append(activity.model_dump_json())
+        if len(lines) >= EXPORT_CHUNK_SIZE:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+@router.post("/suggest", response_model=ActivityResponse)
+async def suggest_activities(
+    request: ActivityRequest,
+    response: Response,
+    x_request_timeout: Optional[float] = Header(None, gt=0, description="Seconds the client is willing to wait"),
+    service: GoogleSheetsService = Depends(get_tenant_service)
+):
+    """
+    Get random activity suggestions based on category, price level and filters.
+    
+    Args:
+        request (ActivityRequest): Request containing category, price level, filters and limit
+        response (Response): Response, marked stale when served under overload
+        x_request_timeout (float, optional): Client deadline in seconds
+        service (GoogleSheetsService): Sheets service of the requesting tenant
+    
     Returns:
         ActivityResponse: Random suggestions with metadata
     """
     try:
-        activities = sheets_service.get_random_activities(
-            category=request.category,
-            price_level=request.price_level,
-            limit=request.limit or 5
+        request = await _resolve_near(request, service.geocoder, x_request_timeout)
+        snapshots = await _load_snapshots("suggest", service, [request.category], x_request_timeout, response)
+        return _suggest_from_snapshot(snapshots[request.category], request)
+    
+    except HTTPException:
+        raise
+    except UnknownCategory as e:
+        raise HTTPException(
+            status_code=404,
+            detail=str(e.args[0])
         )
-        
-        # Get total count for the category/price combination
-        all_activities = sheets_service.get_activities_by_category(
-            request.category, 
-            request.price_level
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid request: {str(e)}"
         )
-        
-        return ActivityResponse(
-            activities=activities,
-            total_found=len(all_activities),
-            category=request.category,
-            price_level=request.price_level
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to get suggestions: {str(e)}"
+        )
+
+
+@router.post("/suggest/batch", response_model=List[ActivityResponse])
+async def suggest_activities_batch(
+    requests: List[ActivityRequest],
+    response: Response,
+    x_request_timeout: Optional[float] = Header(None, gt=0, description="Seconds the client is willing to wait"),
+    service: GoogleSheetsService = Depends(get_tenant_service)
+):
+    """
+    Get suggestions for several requests in one round trip.
+    
+    Snapshots for all requested categories are resolved together, so cold
+    categories are loaded in a single Sheets call. Category names are
+    checked first, so one unknown category fails the batch with a 404
+    naming it instead of failing the Sheets call.
+    
+    Args:
+        requests (List[ActivityRequest]): Suggestion requests
+        response (Response): Response, marked stale when served under overload
+        x_request_timeout (float, optional): Client deadline in seconds
+        service (GoogleSheetsService): Sheets service of the requesting tenant
+    
+    Returns:
+        List[ActivityResponse]: One response per request, in request order
+    """
+    if len(requests) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid request: at most {MAX_BATCH_SIZE} requests per batch"
+        )
+    
+    try:
+        requests = [await _resolve_near(r, service.geocoder, x_request_timeout) for r in requests]
+        snapshots = await _load_snapshots(
+            "suggest",
+            service,
+            [r.category for r in requests],
+            x_request_timeout,
+            response
+        )
+        return [_suggest_from_snapshot(snapshots[r.category], r) for r in requests]
+    
+    except HTTPException:
+        raise
+    except UnknownCategory as e:
+        raise HTTPException(
+            status_code=404,
+            detail=str(e.args[0])
         )
-        
     except ValueError as e:
         raise HTTPException(
             status_code=400,
@@ -109,41 +490,540 @@ async def suggest_activities(request: ActivityRequest):
         )
 
 
+async def _resolve_near(filters: FilterT, geocoder: Geocoder, timeout: Optional[float]) -> FilterT:
+    """
+    Geocode a place name given as proximity filter into coordinates.
+    
+    Lookups run under the 'geocode' admission limiter, since a rate-limited
+    geocoder can hold a threadpool worker for seconds per request.
+    
+    Args:
+        filters (FilterT): Filters, possibly with a place name in near
+        geocoder (Geocoder): Geocoder of the requesting tenant
+        timeout (Optional[float]): Client deadline in seconds
+    
+    Returns:
+        FilterT: Filters whose near is a 'latitude,longitude' pair, if set
+    
+    Raises:
+        HTTPException: 400 if the place cannot be located, 502 if the
+            geocoder fails, 503 if geocoding is overloaded
+        ValueError: If near holds out-of-range coordinates
+    """
+    if filters.near is None or parse_point(filters.near) is not None:
+        return filters
+    
+    try:
+        point = await _call_sheets("geocode", timeout, partial(geocoder.geocode, filters.near))
+    except httpx.HTTPError as e:
+        raise HTTPException(
+            status_code=502,
+            detail=f"Geocoding failed: {str(e)}"
+        )
+    if point is None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid request: could not locate '{filters.near}'"
+        )
+    return filters.model_copy(update={"near": f"{point[0]},{point[1]}"})
+
+
+def _suggest_from_snapshot(snapshot: CategorySnapshot, request: ActivityRequest) -> ActivityResponse:
+    """
+    Build a suggestion response from a category snapshot.
+    
+    Args:
+        snapshot (CategorySnapshot): Snapshot of the requested category
+        request (ActivityRequest): Suggestion request
+        
+    Returns:
+        ActivityResponse: Random suggestions with metadata
+    """
+    activities = snapshot.sample(
+        request.limit or 5,
+        price_level=request.price_level,
+        filters=request,
+        recency_weighted=request.recency_weighted,
+        favor_price_levels=request.favor_price_levels
+    )
+    
+    # Get total count for the category/price/filter combination
+    total_found = snapshot.count(request.price_level, filters=request)
+    
+    return ActivityResponse(
+        activities=activities,
+        total_found=total_found,
+        category=request.category,
+        price_level=request.price_level
+    )
+
+
+@router.get("/stats", response_model=List[CategoryStats])
+async def get_stats(
+    response: Response,
+    category: Optional[str] = Query(None, description="Category name (all categories if omitted)"),
+    not_visited_days: Optional[int] = Query(None, ge=1, description="Extra 'not visited in N days' window to report"),
+    x_request_timeout: Optional[float] = Header(None, gt=0, description="Seconds the client is willing to wait"),
+    service: GoogleSheetsService = Depends(get_tenant_service)
+):
+    """
+    Get aggregate statistics computed when category snapshots were built.
+    
+    Args:
+        response (Response): Response, marked stale when served under overload
+        category (str, optional): Category name
+        not_visited_days (int, optional): Additional not-visited window in days
+        x_request_timeout (float, optional): Client deadline in seconds
+        service (GoogleSheetsService): Sheets service of the requesting tenant
+    
+    Returns:
+        List[CategoryStats]: Statistics per category
+    """
+    # Both Sheets-bound steps share the client's one deadline
+    deadline = None if x_request_timeout is None else time.monotonic() + x_request_timeout
+    try:
+        if category is not None:
+            names = [category]
+        else:
+            categories = service.cached_categories()
+            if categories is None:
+                categories = await _call_sheets("stats", _time_left(deadline), service.get_categories)
+            names = [c.sheet_name for c in categories]
+        
+        snapshots = await _load_snapshots("stats", service, names, _time_left(deadline), response)
+        stats = []
+        for name in names:
+            snapshot = snapshots[name]
+            category_stats = snapshot.stats
+            if not_visited_days is not None:
+                windows = dict(category_stats.not_visited_in_days)
+                windows[not_visited_days] = snapshot.count_not_visited_in(not_visited_days)
+                category_stats = category_stats.model_copy(update={"not_visited_in_days": windows})
+            stats.append(category_stats)
+        return stats
+    except HTTPException:
+        raise
+    except UnknownCategory as e:
+        raise HTTPException(
+            status_code=404,
+            detail=str(e.args[0])
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid request: {str(e)}"
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to fetch stats: {str(e)}"
+        )
+
+
+@router.post("/visits", response_model=Activity)
+async def record_visit(
+    visit: VisitRecord,
+    x_request_timeout: Optional[float] = Header(None, gt=0, description="Seconds the client is willing to wait"),
+    service: GoogleSheetsService = Depends(get_tenant_service)
+):
+    """
+    Record a visit to an activity.
+    
+    The visit is reflected in suggestions immediately and written to the
+    sheet in the background.
+    
+    Args:
+        visit (VisitRecord): Activity, visit date, bill and orders
+        x_request_timeout (float, optional): Client deadline in seconds
+        service (GoogleSheetsService): Sheets service of the requesting tenant
+    
+    Returns:
+        Activity: The updated activity
+    """
+    try:
+        return await _call_sheets("visits", x_request_timeout, partial(
+            service.record_visit,
+            visit.category,
+            visit.name,
+            visit_date=visit.visit_date,
+            bill_price=visit.bill_price,
+            orders=visit.orders
+        ))
+    except HTTPException:
+        raise
+    except KeyError as e:
+        raise HTTPException(
+            status_code=404,
+            detail=str(e.args[0])
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to record visit: {str(e)}"
+        )
+
+
+@router.post("/orders", response_model=Activity)
+async def record_orders(
+    order: OrderRecord,
+    x_request_timeout: Optional[float] = Header(None, gt=0, description="Seconds the client is willing to wait"),
+    service: GoogleSheetsService = Depends(get_tenant_service)
+):
+    """
+    Add items to the past orders of an activity.
+    
+    Args:
+        order (OrderRecord): Activity and ordered items
+        x_request_timeout (float, optional): Client deadline in seconds
+        service (GoogleSheetsService): Sheets service of the requesting tenant
+    
+    Returns:
+        Activity: The updated activity
+    """
+    try:
+        return await _call_sheets("visits", x_request_timeout, partial(
+            service.record_orders,
+            order.category,
+            order.name,
+            order.orders
+        ))
+    except HTTPException:
+        raise
+    except KeyError as e:
+        raise HTTPException(
+            status_code=404,
+            detail=str(e.args[0])
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to record orders: {str(e)}"
+        )
+
+
+async def _load_snapshots(
+    route: str,
+    service: GoogleSheetsService,
+    categories: List[str],
+    timeout: Optional[float],
+    response: Response
+) -> Dict[str, CategorySnapshot]:
+    """
+    Get category snapshots, admitting the request only if Sheets is needed.
+    
+    Requests whose snapshots are all fresh in the cache take a priority lane
+    that bypasses admission control entirely. Under overload, expired
+    snapshots are served (marked stale) rather than failing.
+    
+    Args:
+        route (str): Admission route name
+        service (GoogleSheetsService): Sheets service of the requesting tenant
+        categories (List[str]): Category names
+        timeout (Optional[float]): Client deadline in seconds
+        response (Response): Response to mark stale if needed
+    
+    Returns:
+        Dict[str, CategorySnapshot]: Snapshot per category
+    """
+    snapshots = service.cached_snapshots(categories)
+    if snapshots is not None:
+        return snapshots
+    
+    return await _call_sheets(
+        route,
+        timeout,
+        partial(service.get_category_snapshots, categories),
+        stale=partial(service.cached_snapshots, categories, allow_stale=True),
+        response=response
+    )
+
+
+async def _call_sheets(
+    route: str,
+    timeout: Optional[float],
+    call: Callable[[], T],
+    stale: Optional[Callable[[], Optional[T]]] = None,
+    response: Optional[Response] = None
+) -> T:
+    """
+    Run a blocking, possibly Sheets-bound call under admission control.
+    
+    The call runs in the threadpool so a slow Sheets API never blocks the
+    event loop serving cached and health requests.
+    
+    Args:
+        route (str): Admission route name
+        timeout (Optional[float]): Client deadline in seconds
+        call (Callable[[], T]): Blocking call to run
+        stale (Optional[Callable[[], Optional[T]]]): Cache-only fallback used when overloaded
+        response (Optional[Response]): Response to mark stale if the fallback is used
+    
+    Returns:
+        T: Result of the call, or of the fallback
+    
+    Raises:
+        HTTPException: 503 if overloaded and no fallback is available
+    """
+    try:
+        async with admission.limiter(route).admit(timeout):
+            return await run_in_threadpool(call)
+    except Overloaded as e:
+        result = stale() if stale is not None else None
+        if result is None:
+            raise _overloaded(e)
+        if response is not None:
+            response.headers["Warning"] = '110 - "Response is Stale"'
+        return result
+
+
+def _time_left(deadline: Optional[float]) -> Optional[float]:
+    """
+    Get the seconds left before a deadline.
+    
+    Args:
+        deadline (Optional[float]): time.monotonic() deadline, or None for no deadline
+    
+    Returns:
+        Optional[float]: Seconds left (never negative), or None for no deadline
+    """
+    if deadline is None:
+        return None
+    return max(deadline - time.monotonic(), 0.0)
+
+
+def _conditional_json(request: Request, response: Response, content: Any) -> Response:
+    """
+    Serialize a GET result with an ETag, honouring If-None-Match.
+    
+    The ETag is a hash of the serialized body, so it changes exactly when
+    the client's copy would. Cache-Control: no-cache lets browsers keep the
+    body but revalidate it on every use.
+    
+    Args:
+        request (Request): Incoming request, checked for If-None-Match
+        response (Response): Response whose headers (e.g. Warning) are kept
+        content (Any): Result to serialize
+    
+    Returns:
+        Response: JSON response, or an empty 304 if the client's copy is current
+    """
+    body = JSONResponse(jsonable_encoder(content))
+    etag = f'"{hashlib.blake2b(body.body, digest_size=16).hexdigest()}"'
+    headers = {**response.headers, "ETag": etag, "Cache-Control": "no-cache"}
+    
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        if "*" in tags or etag in (tag[2:] if tag.startswith("W/") else tag for tag in tags):
+            return Response(status_code=304, headers=headers)
+    
+    body.headers.update(headers)
+    return body
+
+
+def _overloaded(error: Overloaded) -> HTTPException:
+    """
+    Build the fast response for a rejected request.
+    
+    Args:
+        error (Overloaded): Admission or quota error
+    
+    Returns:
+        HTTPException: 503 (429 if the tenant's quota is used up) with a Retry-After hint
+    """
+    if isinstance(error, QuotaExceeded):
+        return HTTPException(
+            status_code=429,
+            detail=f"Quota exceeded: {str(error)}",
+            headers={"Retry-After": str(math.ceil(error.retry_after))}
+        )
+    return HTTPException(
+        status_code=503,
+        detail=f"Service overloaded: {str(error)}",
+        headers={"Retry-After": str(math.ceil(error.retry_after))}
+    )
+
+
+@router.get("/events")
+async def stream_snapshot_events(
+    request: Request,
+    last_event_id: Optional[str] = Header(None, description="Id of the last event received before reconnecting"),
+    service: GoogleSheetsService = Depends(get_event_tenant_service)
+):
+    """
+    Stream category snapshot changes as Server-Sent Events.
+    
+    A "snapshot" event carries the category, its version and the names of
+    changed activities, so clients refetch only what changed instead of
+    polling. A "ready" event marks the current position on connect, and a
+    "reset" event means events were missed and everything should be
+    refetched.
+    
+    Args:
+        request (Request): Incoming request, used to detect disconnects
+        last_event_id (str, optional): Last-Event-ID header sent by reconnecting clients
+        service (GoogleSheetsService): Sheets service of the requesting tenant
+    
+    Returns:
+        StreamingResponse: text/event-stream of snapshot events
+    """
+    try:
+        resume_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        resume_id = None
+    
+    subscription, missed = service.events.subscribe(resume_id)
+    return StreamingResponse(
+        _sse_stream(request, service.events, subscription, missed),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+async def _sse_stream(
+    request: Request,
+    events: SnapshotEventBus,
+    subscription: Subscription,
+    missed: Optional[List[SnapshotEvent]]
+) -> AsyncIterator[str]:
+    """
+    Format a subscription as a Server-Sent Events stream.
+    
+    Args:
+        request (Request): Incoming request, used to detect disconnects
+        events (SnapshotEventBus): Event bus the subscription belongs to
+        subscription (Subscription): Subscription to drain
+        missed (Optional[List[SnapshotEvent]]): Events to replay first (None to send a reset)
+    
+    Yields:
+        str: SSE messages and keep-alive comments
+    """
+    try:
+        yield f"retry: {SSE_RETRY_MS}\n\n"
+        if missed is None:
+            yield _sse_message("reset", {"id": events.last_id}, events.last_id)
+        elif not missed:
+            yield _sse_message("ready", {"id": events.last_id}, events.last_id)
+        for event in missed or []:
+            yield _sse_message("snapshot", event.model_dump(), event.id)
+        
+        while True:
+            if subscription.overflowed:
+                # The client fell behind: drop the backlog and ask it to resynchronize
+                while not subscription.queue.empty():
+                    subscription.queue.get_nowait()
+                subscription.overflowed = False
+                yield _sse_message("reset", {"id": events.last_id}, events.last_id)
+            
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), SSE_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                yield ": keep-alive\n\n"
+                continue
+            yield _sse_message("snapshot", event.model_dump(), event.id)
+    finally:
+        events.unsubscribe(subscription)
+
+
+def _sse_message(event_type: str, data: Dict[str, Any], event_id: int) -> str:
+    """
+    Format one Server-Sent Events message.
+    
+    Args:
+        event_type (str): SSE event name
+        data (Dict[str, Any]): JSON payload
+        event_id (int): Event id, echoed back by clients in Last-Event-ID
+    
+    Returns:
+        str: Encoded message
+    """
+    return f"id: {event_id}\nevent: {event_type}\ndata: {json.dumps(data)}\n\n"
+
+
 @router.get("/health")
 async def health_check():
     """
     Health check endpoint.
     
+    Needs no tenant or API key, so liveness probes work in any
+    configuration. Counters are totals over the tenants started so far.
+    
     Returns:
         dict: Health status
     """
+    services = tenant_registry.active_services()
     return {
         "status": "healthy",
         "service": "activity-selector-api",
-        "version": "1.0.0"
+        "version": "1.0.0",
+        "pending_writes": sum(s.visit_log.pending_count for s in services),
+        "sheets_requests": sum(s.quota.consumed for s in services),
+        "admission": admission.stats()
     }
 
 
 @router.get("/cache/stats")
-async def get_cache_stats():
+async def get_cache_stats(service: GoogleSheetsService = Depends(get_tenant_service)):
     """
-    Get cache statistics (for debugging).
+    Get the requesting tenant's cache statistics (for debugging).
+    
+    Args:
+        service (GoogleSheetsService): Sheets service of the requesting tenant
     
     Returns:
-        dict: Cache statistics
+        dict: Cache statistics of the tenant's namespace
     """
     from ..services.cache_service import cache_service
-    return cache_service.get_cache_stats()
+    return cache_service.get_cache_stats(service.tenant_id)
 
 
 @router.delete("/cache/clear")
-async def clear_cache():
+async def clear_cache(service: GoogleSheetsService = Depends(get_tenant_service)):
     """
-    Clear all cached data (for debugging).
+    Clear the requesting tenant's cached data (for debugging).
+    
+    Args:
+        service (GoogleSheetsService): Sheets service of the requesting tenant
     
     Returns:
         dict: Clear operation result
     """
     from ..services.cache_service import cache_service
-    cache_service.clear()
-    return {"message": "Cache cleared successfully"} 
\ No newline at end of file
+    cache_service.clear(service.tenant_id)
+    return {"message": "Cache cleared successfully"}
+
+
+@router.post("/tenants", status_code=201)
+async def register_tenant(
+    config: TenantConfig,
+    x_admin_token: Optional[str] = Header(None, description="Must match TENANT_ADMIN_TOKEN")
+):
+    """
+    Register a tenant served from its own spreadsheet.
+    
+    Disabled unless TENANT_ADMIN_TOKEN is set.
+    
+    Args:
+        config (TenantConfig): Tenant configuration
+        x_admin_token (str, optional): Admin token header
+    
+    Returns:
+        dict: Registered tenant id
+    """
+    admin_token = os.getenv("TENANT_ADMIN_TOKEN")
+    if not admin_token or not hmac.compare_digest(x_admin_token or "", admin_token):
+        raise HTTPException(
+            status_code=403,
+            detail="Tenant registration is not allowed"
+        )
+    
+    try:
+        tenant_registry.register(config)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=409,
+            detail=str(e)
+        )
+    return {"tenant_id": config.tenant_id} 
\ No newline at end of file
@@ -1,12 +1,17 @@
 """
 Main FastAPI application for the Activity Selector.
 """
+import asyncio
 import os
+from functools import partial
+from typing import Any, Callable
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 
 from .api.routes import router
+from .services.admission import admission, parse_route_limits
 
 # Load environment variables
 load_dotenv()
@@ -28,6 +33,15 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
+)
+
+# Admission control for routes that may wait on the Google Sheets API
+admission.configure(
+    max_concurrent=int(os.getenv("ADMISSION_MAX_CONCURRENT", "8")),
+    max_queue=int(os.getenv("ADMISSION_MAX_QUEUE", "16")),
+    queue_timeout=float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "2.0")),
+    route_limits=parse_route_limits(os.getenv("ADMISSION_ROUTE_LIMITS", ""))
 )
 
 # Include API routes
@@ -53,14 +67,99 @@ async def root():
 @app.on_event("startup")
 async def startup_event():
     """Initialize services on startup."""
+    from .services.cache_service import cache_service
+    from .services.geocoding import NullGeocoder, geocoder
+    from .services.sheets_service import sheets_service
+    from .services.tenants import tenant_registry
+    
+    tenants_file = os.getenv("TENANTS_FILE")
+    if tenants_file:
+        try:
+            count = tenant_registry.load_file(tenants_file)
+            print(f"✅ Registered {count} tenants from {tenants_file}.")
+        except Exception as e:
+            print(f"⚠️  Warning: Could not load tenants from {tenants_file}: {e}")
+    
     try:
         # Test Google Sheets connection
-        from .services.sheets_service import sheets_service
         categories = sheets_service.get_categories()
         print(f"✅ Connected to Google Sheets. Found {len(categories)} categories.")
     except Exception as e:
         print(f"⚠️  Warning: Could not connect to Google Sheets: {e}")
         print("   Make sure GOOGLE_SHEETS_CREDENTIALS_FILE and GOOGLE_SHEETS_SPREADSHEET_ID are set.")
+    
+    warm_interval = int(os.getenv("CACHE_WARM_INTERVAL", "60"))
+    if warm_interval > 0:
+        app.state.cache_warmer = asyncio.create_task(
+            run_periodically(warm_interval, partial(for_each_tenant, "warm_popular_snapshots"), "Cache warming")
+        )
+    
+    geocode_interval = int(os.getenv("GEOCODE_INTERVAL", "300"))
+    if geocode_interval > 0 and not isinstance(geocoder, NullGeocoder):
+        app.state.geocoder = asyncio.create_task(
+            run_periodically(geocode_interval, partial(for_each_tenant, "geocode_activities"), "Geocoding")
+        )
+    
+    flush_interval = int(os.getenv("VISIT_FLUSH_INTERVAL", "15"))
+    if flush_interval > 0:
+        app.state.visit_flusher = asyncio.create_task(
+            run_periodically(flush_interval, partial(for_each_tenant, "flush_visits"), "Visit flush")
+        )
+    
+    purge_interval = int(os.getenv("CACHE_PURGE_INTERVAL", "3600"))
+    if purge_interval > 0:
+        app.state.cache_purger = asyncio.create_task(
+            run_periodically(purge_interval, cache_service.purge_expired, "Cache purge")
+        )
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Write queued visits before shutting down."""
+    try:
+        await run_in_threadpool(for_each_tenant, "flush_visits")
+    except Exception as e:
+        print(f"⚠️  Warning: Queued visits kept in the journal: {e}")
+
+
+def for_each_tenant(method: str) -> None:
+    """
+    Run a maintenance method of every active tenant's Sheets service.
+    
+    A failing tenant does not stop the others.
+    
+    Args:
+        method (str): Name of a GoogleSheetsService method taking no arguments
+    
+    Raises:
+        RuntimeError: If the method failed for any tenant
+    """
+    from .services.tenants import tenant_registry
+    failed = []
+    for service in tenant_registry.active_services():
+        try:
+            getattr(service, method)()
+        except Exception as e:
+            failed.append(f"{service.tenant_id}: {e}")
+    if failed:
+        raise RuntimeError("; ".join(failed))
+
+
+async def run_periodically(interval: int, task: Callable[[], Any], description: str):
+    """
+    Run a blocking maintenance task in the threadpool at a fixed interval.
+    
+    Args:
+        interval (int): Seconds between runs
+        task (Callable[[], Any]): Task to run
+        description (str): Task name used in warnings
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_in_threadpool(task)
+        except Exception as e:
+            print(f"⚠️  Warning: {description} failed: {e}")
 
 
 if __name__ == "__main__":
@@ -1,8 +1,9 @@
 """
 Data models for the Activity Selector application.
 """
+from datetime import date, datetime
 from enum import Enum
-from typing import Optional, List
+from typing import Dict, Optional, List
 from pydantic import BaseModel, Field
 
 
@@ -29,6 +30,8 @@ class Activity(BaseModel):
     last_visit_date: Optional[str] = Field(None, description="Date when this activity was last visited (YYYY-MM-DD format)")
     past_orders: Optional[List[str]] = Field(None, description="List of past orders (for restaurants)")
     last_bill_price: Optional[float] = Field(None, description="Last bill amount (for restaurants)")
+    latitude: Optional[float] = Field(None, ge=-90, le=90, description="Latitude of the activity in degrees")
+    longitude: Optional[float] = Field(None, ge=-180, le=180, description="Longitude of the activity in degrees")
     
     model_config = {
         "use_enum_values": True
@@ -42,11 +45,60 @@ class Category(BaseModel):
     sheet_name: str = Field(..., description="Corresponding Google Sheets worksheet name")
 
 
-class ActivityRequest(BaseModel):
+class ActivityFilter(BaseModel):
+    """Model for optional multi-predicate activity filters."""
+    min_price_level: Optional[PriceLevel] = Field(None, description="Lowest price level to include")
+    max_price_level: Optional[PriceLevel] = Field(None, description="Highest price level to include")
+    min_bill_price: Optional[float] = Field(None, ge=0, description="Only activities whose last bill was at least this amount")
+    max_bill_price: Optional[float] = Field(None, ge=0, description="Only activities whose last bill was at most this amount")
+    last_visit_before: Optional[date] = Field(None, description="Only activities not visited since this date (never-visited activities are included)")
+    last_visit_after: Optional[date] = Field(None, description="Only activities visited after this date")
+    near: Optional[str] = Field(None, description="Only activities around this point: 'latitude,longitude' or a place name to geocode")
+    radius: Optional[float] = Field(None, gt=0, description="Search radius around near in kilometres (default 5)")
+
+
+class ActivityRequest(ActivityFilter):
     """Model for activity suggestion requests."""
     category: str = Field(..., description="Selected category")
     price_level: Optional[PriceLevel] = Field(None, description="Selected price level")
     limit: Optional[int] = Field(5, ge=1, le=20, description="Number of suggestions to return")
+    recency_weighted: bool = Field(True, description="Favour activities that have not been visited recently")
+    favor_price_levels: Optional[List[PriceLevel]] = Field(None, description="Price levels to favour without excluding others")
+
+
+class VisitRecord(BaseModel):
+    """Model for recording a visit to an activity."""
+    category: str = Field(..., description="Category of the visited activity")
+    name: str = Field(..., description="Name of the visited activity")
+    visit_date: Optional[date] = Field(None, description="Date of the visit (defaults to today)")
+    bill_price: Optional[float] = Field(None, ge=0, description="Bill amount of the visit")
+    orders: Optional[List[str]] = Field(None, description="Items ordered during the visit")
+
+
+class OrderRecord(BaseModel):
+    """Model for adding past orders to an activity."""
+    category: str = Field(..., description="Category of the activity")
+    name: str = Field(..., description="Name of the activity")
+    orders: List[str] = Field(..., min_length=1, description="Items to add to the past orders")
+
+
+class SnapshotEvent(BaseModel):
+    """Model for a notification that a category snapshot was replaced."""
+    id: int = Field(..., description="Sequence number of the event, increasing per server process")
+    category: str = Field(..., description="Category whose snapshot changed")
+    version: Optional[str] = Field(None, description="Change-probe token of the sheet data, if known")
+    changed: Optional[List[str]] = Field(None, description="Names of added or modified activities (None if unknown or too many)")
+    removed: List[str] = Field(default_factory=list, description="Names of activities no longer in the category")
+
+
+class TenantConfig(BaseModel):
+    """Model for registering a tenant served from its own spreadsheet."""
+    tenant_id: str = Field(..., pattern=r'^[A-Za-z0-9_-]{1,64}$', description="Tenant identifier sent in the X-Tenant-ID header")
+    spreadsheet_id: str = Field(..., min_length=1, description="Google Sheets spreadsheet holding the tenant's activities")
+    api_key: str = Field(..., min_length=16, description="Secret clients of the tenant send in the X-API-Key header")
+    credentials_file: Optional[str] = Field(None, description="Service account key file (defaults to GOOGLE_SHEETS_CREDENTIALS_FILE)")
+    requests_per_minute: Optional[float] = Field(None, gt=0, description="Sheets API requests per minute (defaults to SHEETS_REQUESTS_PER_MINUTE)")
+    cache_bytes: Optional[int] = Field(None, gt=0, description="Cache budget in bytes (defaults to TENANT_CACHE_BYTES)")
 
 
 class ActivityResponse(BaseModel):
@@ -57,6 +109,24 @@ class ActivityResponse(BaseModel):
     price_level: Optional[PriceLevel] = Field(None, description="Price level that was filtered")
 
 
+class PriceLevelStats(BaseModel):
+    """Model for aggregate statistics of one price level within a category."""
+    count: int = Field(..., description="Number of activities at this price level")
+    avg_last_bill_price: Optional[float] = Field(None, description="Average last bill amount, if any were recorded")
+
+
+class CategoryStats(BaseModel):
+    """Model for aggregate statistics of a category snapshot."""
+    category: str = Field(..., description="Category name")
+    total_found: int = Field(..., description="Total number of activities in the category")
+    by_price_level: Dict[str, PriceLevelStats] = Field(..., description="Statistics per price level")
+    avg_last_bill_price: Optional[float] = Field(None, description="Average last bill amount, if any were recorded")
+    visited_count: int = Field(..., description="Number of activities with a last visit date")
+    never_visited_count: int = Field(..., description="Number of activities without a last visit date")
+    not_visited_in_days: Dict[int, int] = Field(..., description="Activities not visited within N days, keyed by N")
+    computed_at: datetime = Field(..., description="When the snapshot and its statistics were built")
+
+
 class ErrorResponse(BaseModel):
     """Model for error responses."""
     error: str = Field(..., description="Error message")
@@ -0,0 +1,288 @@
+"""
+Admission control for requests that may wait on the Google Sheets API.
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+
+
+# Weight of the latest request in the per-route service time moving average
+SERVICE_TIME_SMOOTHING = 0.2
+
+
+class Overloaded(Exception):
+    """Raised when a request cannot be admitted in time."""
+    
+    def __init__(self, route: str, reason: str, retry_after: float):
+        super().__init__(f"{route} is overloaded: {reason}")
+        self.route = route
+        self.retry_after = retry_after
+
+
+class QuotaExceeded(Overloaded):
+    """Raised when a tenant has used up its Sheets API quota."""
+
+
+class QuotaBudget:
+    """
+    Token bucket limiting the Sheets API requests of one tenant.
+    
+    Holds up to one minute of requests and refills continuously, so short
+    bursts are allowed while the sustained rate stays within the budget.
+    Thread-safe, since Sheets calls run on worker threads.
+    """
+    
+    def __init__(self, tenant_id: str, requests_per_minute: Optional[float]):
+        """
+        Initialize a full bucket.
+        
+        Args:
+            tenant_id (str): Tenant the budget belongs to
+            requests_per_minute (Optional[float]): Sustained request rate (unlimited if None)
+        """
+        self.tenant_id = tenant_id
+        self.requests_per_minute = requests_per_minute
+        self.consumed = 0
+        self._tokens = float(requests_per_minute or 0)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def consume(self, requests: int = 1) -> None:
+        """
+        Take tokens for Sheets API requests about to be made.
+        
+        Args:
+            requests (int): Number of API requests
+        
+        Raises:
+            QuotaExceeded: If the budget does not cover the requests right now
+        """
+        with self._lock:
+            if not self.requests_per_minute:
+                self.consumed += requests
+                return
+            
+            rate = self.requests_per_minute / 60.0
+            now = time.monotonic()
+            self._tokens = min(self.requests_per_minute, self._tokens + (now - self._updated) * rate)
+            self._updated = now
+            if self._tokens < requests:
+                retry_after = (requests - self._tokens) / rate
+                raise QuotaExceeded(self.tenant_id, "Sheets API quota exhausted", retry_after)
+            self._tokens -= requests
+            self.consumed += requests
+
+
+class AdmissionLimiter:
+    """
+    Concurrency limit with a bounded FIFO wait queue for one route.
+    
+    At most max_concurrent requests run at once and at most max_queue wait
+    behind them. A request is rejected immediately when the queue is full
+    or when the expected wait (from a moving average of service times)
+    already exceeds its deadline, and after waiting for its deadline
+    otherwise. Failing fast keeps overload from turning into unbounded
+    latency for everyone.
+    
+    Must be used from a single event loop.
+    """
+    
+    def __init__(self, route: str, max_concurrent: int, max_queue: int, queue_timeout: float):
+        """
+        Initialize the limiter.
+        
+        Args:
+            route (str): Route name used in errors and statistics
+            max_concurrent (int): Requests allowed to run at once
+            max_queue (int): Requests allowed to wait for a slot
+            queue_timeout (float): Longest wait for a slot, in seconds
+        """
+        self.route = route
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.service_time = 0.0
+        self._waiters: Deque[asyncio.Future] = deque()
+    
+    def expected_wait(self) -> float:
+        """Estimated seconds a new request would wait for a slot."""
+        if self.active < self.max_concurrent and not self._waiters:
+            return 0.0
+        return (len(self._waiters) + 1) / max(self.max_concurrent, 1) * self.service_time
+    
+    async def acquire(self, timeout: Optional[float] = None) -> None:
+        """
+        Wait for a slot.
+        
+        Args:
+            timeout (Optional[float]): Time left before the caller's deadline, in seconds
+        
+        Raises:
+            Overloaded: If no slot can be obtained before the deadline
+        """
+        if self.active < self.max_concurrent and not self._waiters:
+            self.active += 1
+            self.admitted += 1
+            return
+        
+        budget = self.queue_timeout if timeout is None else min(timeout, self.queue_timeout)
+        if len(self._waiters) >= self.max_queue:
+            self._reject("wait queue is full")
+        if self.expected_wait() > budget:
+            self._reject("expected wait exceeds the deadline")
+        
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), budget)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we gave up: pass it on
+                self.release()
+            else:
+                waiter.cancel()
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self._reject("timed out waiting for a slot")
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+        self.admitted += 1
+    
+    def release(self, elapsed: Optional[float] = None) -> None:
+        """
+        Free a slot, handing it directly to the oldest waiter.
+        
+        Args:
+            elapsed (Optional[float]): Seconds the finished request held the slot
+        """
+        if elapsed is not None:
+            self.service_time += SERVICE_TIME_SMOOTHING * (elapsed - self.service_time)
+        
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+    
+    @asynccontextmanager
+    async def admit(self, timeout: Optional[float] = None) -> AsyncIterator[None]:
+        """
+        Hold a slot for the duration of a block.
+        
+        Args:
+            timeout (Optional[float]): Time left before the caller's deadline, in seconds
+        
+        Raises:
+            Overloaded: If no slot can be obtained before the deadline
+        """
+        await self.acquire(timeout)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - started)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get the limiter's configuration and counters."""
+        return {
+            'max_concurrent': self.max_concurrent,
+            'max_queue': self.max_queue,
+            'active': self.active,
+            'waiting': len(self._waiters),
+            'admitted': self.admitted,
+            'rejected': self.rejected,
+            'avg_service_time': round(self.service_time, 3)
+        }
+    
+    def _reject(self, reason: str) -> None:
+        """Count a rejection and raise Overloaded."""
+        self.rejected += 1
+        raise Overloaded(self.route, reason, retry_after=max(1.0, self.expected_wait()))
+
+
+class AdmissionController:
+    """Per-route admission limiters sharing one default configuration."""
+    
+    def __init__(self):
+        """Initialize the controller with default limits."""
+        self._limiters: Dict[str, AdmissionLimiter] = {}
+        self.configure()
+    
+    def configure(
+        self,
+        max_concurrent: int = 8,
+        max_queue: int = 16,
+        queue_timeout: float = 2.0,
+        route_limits: Optional[Dict[str, int]] = None
+    ) -> None:
+        """
+        Set the limits; existing limiters are replaced.
+        
+        Args:
+            max_concurrent (int): Default concurrent requests per route
+            max_queue (int): Requests allowed to wait per route
+            queue_timeout (float): Longest wait for a slot, in seconds
+            route_limits (Optional[Dict[str, int]]): Concurrency overrides per route
+        """
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.route_limits = dict(route_limits or {})
+        self._limiters = {}
+    
+    def limiter(self, route: str) -> AdmissionLimiter:
+        """
+        Get the limiter of a route, creating it on first use.
+        
+        Args:
+            route (str): Route name
+        
+        Returns:
+            AdmissionLimiter: Limiter of the route
+        """
+        limiter = self._limiters.get(route)
+        if limiter is None:
+            limiter = AdmissionLimiter(
+                route,
+                self.route_limits.get(route, self.max_concurrent),
+                self.max_queue,
+                self.queue_timeout
+            )
+            self._limiters[route] = limiter
+        return limiter
+    
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get the statistics of every route seen so far."""
+        return {route: limiter.stats() for route, limiter in self._limiters.items()}
+
+
+def parse_route_limits(value: str) -> Dict[str, int]:
+    """
+    Parse per-route concurrency limits.
+    
+    Args:
+        value (str): Comma-separated ``route=limit`` pairs, e.g. "suggest=16,export=2"
+    
+    Returns:
+        Dict[str, int]: Limit per route name
+    
+    Raises:
+        ValueError: If a pair is malformed
+    """
+    limits = {}
+    for pair in filter(None, (part.strip() for part in value.split(','))):
+        route, _, limit = pair.partition('=')
+        limits[route.strip()] = int(limit)
+    return limits
+
+
+# Global admission controller, configured from the environment in main.py
+admission = AdmissionController()
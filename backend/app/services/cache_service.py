@@ -1,23 +1,171 @@
 """
 Caching service for Google Sheets data to reduce API calls.
 """
+import math
+import os
+import threading
 import time
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, NamedTuple, Tuple
 from datetime import datetime, timedelta
 
 
+# Weight of the latest refresh in the per-key change rate moving average
+CHANGE_RATE_SMOOTHING = 0.3
+
+# Seconds after which an access counts half towards a key's popularity
+ACCESS_HALF_LIFE = 6 * 3600
+
+
+class CacheEntry(NamedTuple):
+    """Immutable cache entry; updates replace the entry instead of mutating it."""
+    value: Any
+    expires_at: datetime
+    size: int = 0
+
+
+class CacheShard(NamedTuple):
+    """Immutable entries of one key namespace, with their statistics and total size."""
+    entries: Dict[str, CacheEntry]
+    key_stats: Dict[str, 'KeyStats']
+    size: int = 0
+    # No entry expires earlier; may lag behind once the earliest is removed
+    oldest_expiry: datetime = datetime.max
+
+
+EMPTY_SHARD = CacheShard({}, {})
+
+
+def key_namespace(key: str) -> str:
+    """
+    Get the namespace of a cache key.
+    
+    Keys are namespaced as "<namespace>:<name>"; keys without a colon
+    belong to the empty namespace.
+    
+    Args:
+        key (str): Cache key
+    
+    Returns:
+        str: Namespace of the key
+    """
+    namespace, separator, _ = key.partition(':')
+    return namespace if separator else ''
+
+
+class KeyStats:
+    """
+    Access and change statistics for one cache key.
+    
+    The access count decays with a half-life of ACCESS_HALF_LIFE, so keys
+    that were popular once but are no longer read drop down the ranking.
+    Counters are bumped without a lock, so under heavy concurrency they
+    are approximate; that is enough to rank keys and tune TTLs.
+    """
+    
+    __slots__ = ('accesses', 'last_access', 'refreshes', 'changes', 'change_rate', 'first_access')
+    
+    def __init__(self):
+        now = time.monotonic()
+        self.accesses = 0.0
+        self.last_access = now
+        self.refreshes = 0
+        self.changes = 0
+        # Start neutral so an unobserved key gets its base TTL
+        self.change_rate = 0.5
+        self.first_access = now
+    
+    def record_access(self) -> None:
+        """Count one access to the key."""
+        now = time.monotonic()
+        self.accesses = self.decayed_accesses(now) + 1
+        self.last_access = now
+    
+    def decayed_accesses(self, now: Optional[float] = None) -> float:
+        """
+        Get the access count, with older accesses weighing less.
+        
+        Args:
+            now (Optional[float]): Current time.monotonic() value (read if None)
+        
+        Returns:
+            float: Accesses decayed to the current time
+        """
+        now = time.monotonic() if now is None else now
+        return self.accesses * 0.5 ** (max(now - self.last_access, 0) / ACCESS_HALF_LIFE)
+    
+    def accesses_per_hour(self) -> float:
+        """Recent access rate, over the decay window or the key's age if shorter."""
+        now = time.monotonic()
+        window = min(now - self.first_access, ACCESS_HALF_LIFE / math.log(2))
+        return self.decayed_accesses(now) / max(window / 3600, 1 / 60)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize the statistics for reporting."""
+        return {
+            'accesses': round(self.decayed_accesses(), 2),
+            'refreshes': self.refreshes,
+            'changes': self.changes,
+            'change_rate': round(self.change_rate, 3)
+        }
+
+
 class CacheService:
-    """Service for caching Google Sheets data."""
+    """
+    Service for caching Google Sheets data.
+    
+    The cache is copy-on-write: entry mappings are never mutated once
+    published. Writers copy them under a lock, apply their change and swap
+    the reference in a single assignment, so readers never take a lock and
+    always see a complete mapping. Entries are sharded by key namespace
+    (one per tenant), and a write only copies its own namespace's entries,
+    so it costs O(entries of the namespace + namespaces) however many
+    tenants share the cache. Entries that have been expired for longer
+    than stale_window are dropped when their namespace is next written
+    and by purge_expired().
+    
+    Per-key access counts and observed change rates feed adaptive_ttl(),
+    which stretches TTLs for stable data and shortens them for hot data
+    that keeps changing, within [min_ttl, max_ttl]. Statistics are only
+    kept for keys that are in the cache and are dropped with their entry,
+    so lookups of missing keys cost nothing and the statistics can never
+    outgrow the cache.
+    
+    Entries may carry an approximate size. Each key namespace (one per
+    tenant) can be given a byte budget, and the whole cache a byte limit.
+    A namespace over its budget only evicts its own entries, and when the
+    cache as a whole is full the namespace furthest over its fair share
+    is evicted first, so one large tenant cannot push out everyone else.
+    """
     
-    def __init__(self, default_ttl: int = 3600):
+    def __init__(
+        self,
+        default_ttl: int = 3600,
+        min_ttl: Optional[int] = None,
+        max_ttl: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        namespace_bytes: Optional[int] = None,
+        stale_window: Optional[int] = None
+    ):
         """
         Initialize the cache service.
         
         Args:
             default_ttl (int): Default time-to-live in seconds (default: 1 hour)
+            min_ttl (Optional[int]): Lower bound for adaptive TTLs (default: 1 minute)
+            max_ttl (Optional[int]): Upper bound for adaptive TTLs (default: 1 day)
+            max_bytes (Optional[int]): Limit on the total size of sized entries (default: unlimited)
+            namespace_bytes (Optional[int]): Default budget per key namespace (default: unlimited)
+            stale_window (Optional[int]): Seconds expired entries are kept for stale reads (default: 1 day)
         """
-        self._cache: Dict[str, Dict[str, Any]] = {}
+        self._shards: Dict[str, CacheShard] = {}
+        self._write_lock = threading.Lock()
         self._default_ttl = default_ttl
+        self._min_ttl = min_ttl if min_ttl is not None else 60
+        self._max_ttl = max_ttl if max_ttl is not None else 86400
+        self._max_bytes = max_bytes
+        self._namespace_bytes = namespace_bytes
+        self._stale_window = stale_window if stale_window is not None else 86400
+        self._budgets: Dict[str, int] = {}
     
     def get(self, key: str) -> Optional[Any]:
         """
@@ -29,17 +177,149 @@ class CacheService:
         Returns:
             Optional[Any]: Cached value or None if not found/expired
         """
-        if key not in self._cache:
+        shard = self._shard(key)
+        cache_entry = shard.entries.get(key)
+        if cache_entry is None:
             return None
         
-        cache_entry = self._cache[key]
+        # Published with the entries, so every cached key has statistics
+        shard.key_stats[key].record_access()
         if self._is_expired(cache_entry):
-            del self._cache[key]
+            self._evict(key, cache_entry)
+            return None
+        
+        return cache_entry.value
+    
+    def peek(self, key: str, count_access: bool = True) -> Tuple[Optional[Any], bool]:
+        """
+        Get a value from cache without evicting it when expired.
+        
+        Lets callers revalidate an expired value cheaply instead of
+        rebuilding it.
+        
+        Args:
+            key (str): Cache key
+            count_access (bool): Count this lookup towards the key's popularity
+        
+        Returns:
+            Tuple[Optional[Any], bool]: Cached value (or None) and whether it is still fresh
+        """
+        shard = self._shard(key)
+        cache_entry = shard.entries.get(key)
+        if cache_entry is None:
+            return None, False
+        
+        if count_access:
+            shard.key_stats[key].record_access()
+        return cache_entry.value, not self._is_expired(cache_entry)
+    
+    def touch(self, key: str, ttl: Optional[int] = None) -> bool:
+        """
+        Extend the expiry of an existing entry, even if it has expired.
+        
+        Args:
+            key (str): Cache key
+            ttl (Optional[int]): New time-to-live in seconds (uses default if None)
+        
+        Returns:
+            bool: True if the entry existed
+        """
+        ttl = ttl or self._default_ttl
+        with self._write_lock:
+            shard = self._shard(key)
+            cache_entry = shard.entries.get(key)
+            if cache_entry is None:
+                return False
+            
+            expires_at = datetime.now() + timedelta(seconds=ttl)
+            entries = {**shard.entries, key: cache_entry._replace(expires_at=expires_at)}
+            self._publish(key_namespace(key), entries, shard.size, min(shard.oldest_expiry, expires_at))
+            return True
+    
+    def time_to_live(self, key: str) -> Optional[float]:
+        """
+        Get the seconds left before an entry expires.
+        
+        Args:
+            key (str): Cache key
+            
+        Returns:
+            Optional[float]: Remaining seconds (negative once expired), or None if missing
+        """
+        cache_entry = self._shard(key).entries.get(key)
+        if cache_entry is None:
             return None
+        return (cache_entry.expires_at - datetime.now()).total_seconds()
+    
+    def record_refresh(self, key: str, changed: bool) -> None:
+        """
+        Record whether refreshing a key produced different data.
+        
+        Keys that are not cached have no statistics and are ignored.
         
-        return cache_entry['value']
+        Args:
+            key (str): Cache key
+            changed (bool): True if the refreshed value differed from the cached one
+        """
+        stats = self._shard(key).key_stats.get(key)
+        if stats is None:
+            return
+        stats.refreshes += 1
+        if changed:
+            stats.changes += 1
+        stats.change_rate += CHANGE_RATE_SMOOTHING * (float(changed) - stats.change_rate)
     
-    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+    def adaptive_ttl(self, key: str, base_ttl: Optional[int] = None) -> int:
+        """
+        Get a TTL for a key tuned to how often it changes and is read.
+        
+        Data that rarely changes gets up to 4x the base TTL and data that
+        changes on every refresh down to a quarter of it. Keys that change
+        are shortened further the hotter they are, so popular data stays
+        fresh while cold or stable keys cost fewer API calls.
+        
+        Args:
+            key (str): Cache key
+            base_ttl (Optional[int]): TTL for a key with no history (uses default if None)
+            
+        Returns:
+            int: TTL in seconds within [min_ttl, max_ttl]
+        """
+        base_ttl = base_ttl or self._default_ttl
+        stats = self._shard(key).key_stats.get(key)
+        if stats is None or stats.refreshes == 0:
+            return max(self._min_ttl, min(self._max_ttl, base_ttl))
+        
+        ttl = base_ttl * 2 ** ((0.5 - stats.change_rate) * 4)
+        ttl /= 1 + stats.change_rate * math.log2(1 + stats.accesses_per_hour())
+        return int(max(self._min_ttl, min(self._max_ttl, ttl)))
+    
+    def popular_keys(self, limit: int, prefix: str = "") -> List[str]:
+        """
+        Get the most frequently accessed keys.
+        
+        Args:
+            limit (int): Maximum number of keys to return
+            prefix (str): Only consider keys starting with this prefix
+            
+        Returns:
+            List[str]: Cached keys ordered by descending recent access count
+        """
+        if ':' in prefix:
+            shards = [self._shard(prefix)]
+        else:
+            shards = list(self._shards.values())
+        now = time.monotonic()
+        ranked = [
+            (key, stats.decayed_accesses(now))
+            for shard in shards
+            for key, stats in shard.key_stats.items()
+            if key.startswith(prefix)
+        ]
+        ranked.sort(key=lambda item: item[1], reverse=True)
+        return [key for key, _ in ranked[:limit]]
+    
+    def set(self, key: str, value: Any, ttl: Optional[int] = None, size: int = 0) -> None:
         """
         Set a value in cache.
         
@@ -47,14 +327,55 @@ class CacheService:
             key (str): Cache key
             value (Any): Value to cache
             ttl (Optional[int]): Time-to-live in seconds (uses default if None)
+            size (int): Approximate size of the value in bytes, counted against budgets
         """
         ttl = ttl or self._default_ttl
-        expiry_time = datetime.now() + timedelta(seconds=ttl)
+        cache_entry = CacheEntry(value, datetime.now() + timedelta(seconds=ttl), size)
         
-        self._cache[key] = {
-            'value': value,
-            'expires_at': expiry_time
-        }
+        namespace = key_namespace(key)
+        with self._write_lock:
+            shard = self._unexpired(self._shards.get(namespace, EMPTY_SHARD))
+            entries = dict(shard.entries)
+            replaced = entries.get(key)
+            entries[key] = cache_entry
+            usage = self.namespace_usage()
+            usage[namespace] = shard.size - (replaced.size if replaced else 0) + size
+            changed = {namespace: entries}
+            if size:
+                self._enforce_budgets(changed, usage, key)
+            oldest_expiry = min(shard.oldest_expiry, cache_entry.expires_at)
+            for changed_namespace, changed_entries in changed.items():
+                self._publish(
+                    changed_namespace,
+                    changed_entries,
+                    usage[changed_namespace],
+                    oldest_expiry if changed_namespace == namespace else None
+                )
+    
+    def set_budget(self, namespace: str, max_bytes: Optional[int]) -> None:
+        """
+        Set the byte budget of a key namespace.
+        
+        Args:
+            namespace (str): Key namespace (e.g. a tenant id)
+            max_bytes (Optional[int]): Budget in bytes, or None for the default
+        """
+        with self._write_lock:
+            budgets = dict(self._budgets)
+            if max_bytes is None:
+                budgets.pop(namespace, None)
+            else:
+                budgets[namespace] = max_bytes
+            self._budgets = budgets
+    
+    def namespace_usage(self) -> Dict[str, int]:
+        """
+        Get the total size of the entries of each namespace.
+        
+        Returns:
+            Dict[str, int]: Bytes per namespace
+        """
+        return {namespace: shard.size for namespace, shard in self._shards.items()}
     
     def delete(self, key: str) -> None:
         """
@@ -63,38 +384,262 @@ class CacheService:
         Args:
             key (str): Cache key to delete
         """
-        if key in self._cache:
-            del self._cache[key]
+        with self._write_lock:
+            shard = self._shard(key)
+            if key in shard.entries:
+                entries = dict(shard.entries)
+                removed = entries.pop(key)
+                self._publish(key_namespace(key), entries, shard.size - removed.size)
     
-    def clear(self) -> None:
-        """Clear all cached data."""
-        self._cache.clear()
+    def clear(self, namespace: Optional[str] = None) -> None:
+        """
+        Clear cached data and key statistics.
+        
+        Args:
+            namespace (Optional[str]): Only clear keys of this namespace (all if None)
+        """
+        with self._write_lock:
+            if namespace is None:
+                self._shards = {}
+                return
+            
+            self._publish(namespace, {}, 0)
     
-    def _is_expired(self, cache_entry: Dict[str, Any]) -> bool:
+    def purge_expired(self) -> int:
+        """
+        Drop entries that have been expired for longer than the stale window.
+        
+        Namespaces that are written regularly are purged as they go; this
+        catches those that are no longer written, e.g. idle tenants.
+        
+        Returns:
+            int: Number of entries dropped
+        """
+        purged = 0
+        with self._write_lock:
+            for namespace, shard in self._shards.items():
+                unexpired = self._unexpired(shard)
+                if unexpired is not shard:
+                    purged += len(shard.entries) - len(unexpired.entries)
+                    self._publish(namespace, unexpired.entries, unexpired.size, unexpired.oldest_expiry)
+        return purged
+    
+    def _shard(self, key: str) -> CacheShard:
+        """
+        Get the shard holding a key.
+        
+        Args:
+            key (str): Cache key (or key prefix including the namespace)
+        
+        Returns:
+            CacheShard: Shard of the key's namespace, empty if it has no entries
+        """
+        return self._shards.get(key_namespace(key), EMPTY_SHARD)
+    
+    def _unexpired(self, shard: CacheShard) -> CacheShard:
+        """
+        Drop a shard's entries that have been expired past the stale window.
+        
+        The entries are only scanned when the shard's oldest expiry is past
+        the window, which also tightens that bound for later calls.
+        
+        Args:
+            shard (CacheShard): Published shard
+        
+        Returns:
+            CacheShard: The shard itself if it was not scanned, else an unpublished
+                copy with the remaining entries, their size and oldest expiry
+        """
+        cutoff = datetime.now() - timedelta(seconds=self._stale_window)
+        if shard.oldest_expiry > cutoff:
+            return shard
+        
+        entries = {key: cache_entry for key, cache_entry in shard.entries.items() if cache_entry.expires_at > cutoff}
+        return shard._replace(
+            entries=entries,
+            size=sum(cache_entry.size for cache_entry in entries.values()),
+            oldest_expiry=min((cache_entry.expires_at for cache_entry in entries.values()), default=datetime.max)
+        )
+    
+    def _enforce_budgets(
+        self,
+        changed: Dict[str, Dict[str, CacheEntry]],
+        usage: Dict[str, int],
+        new_key: str
+    ) -> None:
+        """
+        Evict entries from unpublished mappings until budgets are respected.
+        
+        Must be called with the write lock held, before publishing. The
+        namespace of the new entry first evicts its own entries down to its
+        budget. If the cache is still over max_bytes, entries are evicted
+        from whichever namespace uses the largest share of its budget.
+        Victims are expired entries first, then the least accessed ones; the
+        new entry itself is never evicted. Only the namespaces that have to
+        evict are copied and ranked, once each.
+        
+        Args:
+            changed (Dict[str, Dict[str, CacheEntry]]): Unpublished mapping per
+                namespace, holding the new entry's; namespaces that evict are added
+            usage (Dict[str, int]): Bytes per namespace including the new entry,
+                updated in place as entries are evicted
+            new_key (str): Key that was just written
+        """
+        own_namespace = key_namespace(new_key)
+        
+        def budget(namespace: str) -> Optional[int]:
+            return self._budgets.get(namespace, self._namespace_bytes)
+        
+        # Eviction candidates per namespace, best victim last; ranked on first use
+        victims: Dict[str, List[str]] = {}
+        
+        def rank_victims(namespace: str) -> List[str]:
+            if namespace not in changed:
+                changed[namespace] = dict(self._shards[namespace].entries)
+            entries = changed[namespace]
+            key_stats = self._shards.get(namespace, EMPTY_SHARD).key_stats
+            now = datetime.now()
+            clock = time.monotonic()
+            keys = [key for key, cache_entry in entries.items() if key != new_key and cache_entry.size]
+            keys.sort(key=lambda key: (
+                now <= entries[key].expires_at,
+                key_stats[key].decayed_accesses(clock) if key in key_stats else 0
+            ))
+            # Ties go to the oldest entry, which pop() takes from the end
+            keys.reverse()
+            return keys
+        
+        def evict_from(namespace: str) -> bool:
+            if namespace not in victims:
+                victims[namespace] = rank_victims(namespace)
+            keys = victims[namespace]
+            if not keys:
+                return False
+            usage[namespace] -= changed[namespace].pop(keys.pop()).size
+            return True
+        
+        own_budget = budget(own_namespace)
+        while own_budget is not None and usage[own_namespace] > own_budget:
+            if not evict_from(own_namespace):
+                break
+        
+        if self._max_bytes is None:
+            return
+        while sum(usage.values()) > self._max_bytes:
+            # Namespaces without a budget are weighed against the default share
+            share = {
+                namespace: used / max(budget(namespace) or self._max_bytes, 1)
+                for namespace, used in usage.items() if used
+            }
+            for namespace in sorted(share, key=share.get, reverse=True):
+                if evict_from(namespace):
+                    break
+            else:
+                return
+    
+    def _evict(self, key: str, cache_entry: CacheEntry) -> None:
+        """
+        Remove an expired entry unless a writer has replaced it meanwhile.
+        
+        Args:
+            key (str): Cache key
+            cache_entry (CacheEntry): Entry the caller found expired
+        """
+        with self._write_lock:
+            shard = self._shard(key)
+            if shard.entries.get(key) is cache_entry:
+                entries = dict(shard.entries)
+                del entries[key]
+                self._publish(key_namespace(key), entries, shard.size - cache_entry.size)
+    
+    def _publish(
+        self,
+        namespace: str,
+        entries: Dict[str, CacheEntry],
+        size: int,
+        oldest_expiry: Optional[datetime] = None
+    ) -> None:
+        """
+        Publish a namespace's new entry mapping with an atomic reference swap.
+        
+        Must be called with the write lock held; the mapping must not be
+        mutated afterwards. Key statistics follow the entries: new keys
+        start counting and removed keys lose their statistics. Empty
+        namespaces are dropped.
+        
+        Args:
+            namespace (str): Key namespace of the entries
+            entries (Dict[str, CacheEntry]): New mapping
+            size (int): Total size of the entries
+            oldest_expiry (Optional[datetime]): Bound on the earliest expiry
+                (default: keep the current one, valid when no entry expires earlier)
+        """
+        shards = dict(self._shards)
+        if not entries:
+            shards.pop(namespace, None)
+        else:
+            shard = shards.get(namespace, EMPTY_SHARD)
+            key_stats = shard.key_stats
+            if key_stats.keys() != entries.keys():
+                # Copy-on-write like the entries, so readers can iterate safely
+                key_stats = {key: key_stats.get(key) or KeyStats() for key in entries}
+            shards[namespace] = CacheShard(entries, key_stats, size, oldest_expiry or shard.oldest_expiry)
+        self._shards = shards
+    
+    def _is_expired(self, cache_entry: CacheEntry) -> bool:
         """
         Check if a cache entry has expired.
         
         Args:
-            cache_entry (Dict[str, Any]): Cache entry to check
+            cache_entry (CacheEntry): Cache entry to check
             
         Returns:
             bool: True if expired, False otherwise
         """
-        return datetime.now() > cache_entry['expires_at']
+        return datetime.now() > cache_entry.expires_at
     
-    def get_cache_stats(self) -> Dict[str, Any]:
+    def get_cache_stats(self, namespace: Optional[str] = None) -> Dict[str, Any]:
         """
         Get cache statistics.
         
+        Args:
+            namespace (Optional[str]): Only report keys of this namespace (all if None)
+        
         Returns:
             Dict[str, Any]: Cache statistics
         """
+        shards = self._shards
+        if namespace is not None:
+            shards = {namespace: shards.get(namespace, EMPTY_SHARD)}
         return {
-            'total_entries': len(self._cache),
+            'total_entries': sum(len(shard.entries) for shard in shards.values()),
             'default_ttl': self._default_ttl,
-            'keys': list(self._cache.keys())
+            'min_ttl': self._min_ttl,
+            'max_ttl': self._max_ttl,
+            'stale_window': self._stale_window,
+            'total_bytes': sum(shard.size for shard in shards.values()),
+            'max_bytes': self._max_bytes,
+            'namespaces': {
+                namespace: {
+                    'bytes': shard.size,
+                    'budget': self._budgets.get(namespace, self._namespace_bytes)
+                }
+                for namespace, shard in shards.items()
+            },
+            'keys': [key for shard in shards.values() for key in shard.entries],
+            'key_stats': {
+                key: stats.to_dict()
+                for shard in shards.values()
+                for key, stats in shard.key_stats.items()
+            }
         }
 
 
 # Global cache instance
-cache_service = CacheService() 
\ No newline at end of file
+cache_service = CacheService(
+    min_ttl=int(os.getenv('CACHE_MIN_TTL', '60')),
+    max_ttl=int(os.getenv('CACHE_MAX_TTL', '86400')),
+    max_bytes=int(os.getenv('CACHE_MAX_BYTES', '0')) or None,
+    namespace_bytes=int(os.getenv('TENANT_CACHE_BYTES', '0')) or None,
+    stale_window=int(os.getenv('CACHE_STALE_WINDOW', '86400'))
+)
@@ -0,0 +1,222 @@
+"""
+Grid-bucket spatial index for radius queries over activity coordinates.
+"""
+import math
+import os
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+
+# Mean Earth radius used for great-circle distances
+EARTH_RADIUS_KM = 6371.0088
+
+# Kilometres per degree of latitude
+KM_PER_DEGREE = EARTH_RADIUS_KM * math.pi / 180
+
+# Side of the grid cells points are bucketed into, in degrees (0.05 is about 5.5 km)
+CELL_DEGREES = float(os.getenv('GEO_CELL_DEGREES', '0.05'))
+
+# Radius used when a proximity filter gives no radius, in kilometres
+DEFAULT_RADIUS_KM = 5.0
+
+
+def parse_point(value: str) -> Optional[Tuple[float, float]]:
+    """
+    Parse a "latitude,longitude" string.
+    
+    Args:
+        value (str): Text to parse
+    
+    Returns:
+        Optional[Tuple[float, float]]: Latitude and longitude, or None if the text is not a pair of numbers
+    
+    Raises:
+        ValueError: If the numbers are out of range
+    """
+    parts = value.split(',')
+    if len(parts) != 2:
+        return None
+    try:
+        latitude, longitude = float(parts[0]), float(parts[1])
+    except ValueError:
+        return None
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise ValueError(f"Coordinates out of range: {value}")
+    return latitude, longitude
+
+
+def haversine_km(
+    latitude: np.ndarray,
+    longitude: np.ndarray,
+    center_latitude: float,
+    center_longitude: float
+) -> np.ndarray:
+    """
+    Compute great-circle distances to a center point.
+    
+    Args:
+        latitude (np.ndarray): Latitudes in degrees
+        longitude (np.ndarray): Longitudes in degrees
+        center_latitude (float): Latitude of the center in degrees
+        center_longitude (float): Longitude of the center in degrees
+    
+    Returns:
+        np.ndarray: Distances in kilometres
+    """
+    lat1 = np.radians(latitude)
+    lat2 = math.radians(center_latitude)
+    half_dlat = (lat1 - lat2) / 2
+    half_dlng = np.radians(longitude - center_longitude) / 2
+    a = np.sin(half_dlat) ** 2 + np.cos(lat1) * math.cos(lat2) * np.sin(half_dlng) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class GeoIndex:
+    """
+    Immutable spatial index over the located rows of a snapshot.
+    
+    Points are bucketed into a lat/lng grid and sorted by cell, row-major,
+    so the cells a query circle overlaps in one grid row form a single
+    contiguous slice found with two binary searches. A radius query
+    therefore touches only the rows in nearby cells, and exact distances
+    are computed for those candidates alone.
+    """
+    
+    def __init__(
+        self,
+        latitude: np.ndarray,
+        longitude: np.ndarray,
+        cell_degrees: float = CELL_DEGREES
+    ):
+        """
+        Build the index.
+        
+        Args:
+            latitude (np.ndarray): Latitude per row (NaN if unknown)
+            longitude (np.ndarray): Longitude per row (NaN if unknown)
+            cell_degrees (float): Side of the grid cells in degrees
+        """
+        self.latitude = latitude
+        self.longitude = longitude
+        self.cell_degrees = cell_degrees
+        self._rows = math.ceil(180 / cell_degrees)
+        self._columns = math.ceil(360 / cell_degrees)
+        
+        located = np.flatnonzero(~np.isnan(latitude) & ~np.isnan(longitude))
+        keys = (
+            self._grid_row(latitude[located]) * self._columns
+            + self._grid_column(longitude[located])
+        )
+        order = np.argsort(keys, kind='stable')
+        self._indices = located[order]
+        self._keys = keys[order]
+    
+    def __len__(self) -> int:
+        return len(self._indices)
+    
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the index arrays, in bytes."""
+        return self._indices.nbytes + self._keys.nbytes
+    
+    def within(self, latitude: float, longitude: float, radius_km: float) -> np.ndarray:
+        """
+        Find the rows within a distance of a point.
+        
+        Args:
+            latitude (float): Latitude of the center in degrees
+            longitude (float): Longitude of the center in degrees
+            radius_km (float): Search radius in kilometres
+        
+        Returns:
+            np.ndarray: Matching row indices in ascending order
+        """
+        candidates = self._candidates(latitude, longitude, radius_km)
+        if not len(candidates):
+            return candidates
+        
+        distances = haversine_km(self.latitude[candidates], self.longitude[candidates], latitude, longitude)
+        return np.sort(candidates[distances <= radius_km])
+    
+    def distances(self, indices: np.ndarray, latitude: float, longitude: float) -> np.ndarray:
+        """
+        Compute the distance of rows to a point.
+        
+        Args:
+            indices (np.ndarray): Row indices
+            latitude (float): Latitude of the point in degrees
+            longitude (float): Longitude of the point in degrees
+        
+        Returns:
+            np.ndarray: Distances in kilometres (NaN for rows without coordinates)
+        """
+        return haversine_km(self.latitude[indices], self.longitude[indices], latitude, longitude)
+    
+    def _candidates(self, latitude: float, longitude: float, radius_km: float) -> np.ndarray:
+        """
+        Get the rows in grid cells overlapping a query circle.
+        
+        Args:
+            latitude (float): Latitude of the center in degrees
+            longitude (float): Longitude of the center in degrees
+            radius_km (float): Search radius in kilometres
+        
+        Returns:
+            np.ndarray: Candidate row indices
+        """
+        delta_latitude = radius_km / KM_PER_DEGREE
+        low_latitude = latitude - delta_latitude
+        high_latitude = latitude + delta_latitude
+        grid_rows = np.arange(
+            self._grid_row(np.array([max(low_latitude, -90.0)]))[0],
+            self._grid_row(np.array([min(high_latitude, 90.0)]))[0] + 1
+        )
+        
+        # Meridians converge towards the poles, so widen by the band's highest latitude
+        widest = max(abs(low_latitude), abs(high_latitude))
+        if widest >= 90:
+            column_ranges = [(0, self._columns - 1)]
+        else:
+            delta_longitude = delta_latitude / math.cos(math.radians(widest))
+            low_column = math.floor((longitude - delta_longitude + 180) / self.cell_degrees)
+            high_column = math.floor((longitude + delta_longitude + 180) / self.cell_degrees)
+            column_ranges = self._wrap_columns(low_column, high_column)
+        
+        slices = []
+        for low_column, high_column in column_ranges:
+            starts = np.searchsorted(self._keys, grid_rows * self._columns + low_column, side='left')
+            ends = np.searchsorted(self._keys, grid_rows * self._columns + high_column, side='right')
+            slices.extend(self._indices[start:end] for start, end in zip(starts, ends) if end > start)
+        
+        if not slices:
+            return np.empty(0, dtype=np.intp)
+        return np.concatenate(slices)
+    
+    def _wrap_columns(self, low_column: int, high_column: int) -> List[Tuple[int, int]]:
+        """
+        Split a column range crossing the antimeridian into in-grid ranges.
+        
+        Args:
+            low_column (int): First column, possibly negative
+            high_column (int): Last column, possibly past the last one
+        
+        Returns:
+            List[Tuple[int, int]]: Inclusive (low, high) column ranges
+        """
+        if high_column - low_column + 1 >= self._columns:
+            return [(0, self._columns - 1)]
+        if low_column < 0:
+            return [(0, high_column), (low_column + self._columns, self._columns - 1)]
+        if high_column >= self._columns:
+            return [(low_column, self._columns - 1), (0, high_column - self._columns)]
+        return [(low_column, high_column)]
+    
+    def _grid_row(self, latitude: np.ndarray) -> np.ndarray:
+        """Get the grid row of latitudes."""
+        rows = np.floor((latitude + 90) / self.cell_degrees).astype(np.int64)
+        return np.clip(rows, 0, self._rows - 1)
+    
+    def _grid_column(self, longitude: np.ndarray) -> np.ndarray:
+        """Get the grid column of longitudes."""
+        return np.floor((longitude + 180) / self.cell_degrees).astype(np.int64) % self._columns
@@ -0,0 +1,179 @@
+"""
+Pluggable geocoding of addresses and place names into coordinates.
+"""
+import importlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Protocol, Tuple
+
+import httpx
+
+
+# Point as (latitude, longitude) in degrees
+Point = Tuple[float, float]
+
+# Results (including misses) remembered by CachingGeocoder
+GEOCODE_CACHE_SIZE = 10000
+
+# Nominatim's usage policy allows at most one request per second
+NOMINATIM_MIN_INTERVAL = 1.0
+
+
+class Geocoder(Protocol):
+    """Anything that turns a free-text location into coordinates."""
+    
+    def geocode(self, query: str) -> Optional[Point]:
+        """
+        Look up a location.
+        
+        Args:
+            query (str): Address or place name
+        
+        Returns:
+            Optional[Point]: Latitude and longitude, or None if not found
+        """
+        ...
+
+
+class NullGeocoder:
+    """Geocoder that finds nothing, for offline deployments and tests."""
+    
+    def geocode(self, query: str) -> Optional[Point]:
+        """Return None for every query."""
+        return None
+
+
+class NominatimGeocoder:
+    """
+    Geocoder backed by an OpenStreetMap Nominatim server.
+    
+    Requests are spaced NOMINATIM_MIN_INTERVAL apart, as required by the
+    public server's usage policy.
+    """
+    
+    def __init__(self, url: str, user_agent: str, timeout: float = 10.0):
+        """
+        Initialize the geocoder.
+        
+        Args:
+            url (str): Base URL of the Nominatim server
+            user_agent (str): User-Agent identifying the application
+            timeout (float): Request timeout in seconds
+        """
+        self._client = httpx.Client(
+            base_url=url,
+            headers={'User-Agent': user_agent},
+            timeout=timeout
+        )
+        self._lock = threading.Lock()
+        self._last_request = 0.0
+    
+    def geocode(self, query: str) -> Optional[Point]:
+        """
+        Look up a location.
+        
+        Args:
+            query (str): Address or place name
+        
+        Returns:
+            Optional[Point]: Latitude and longitude, or None if not found
+        
+        Raises:
+            httpx.HTTPError: If the server cannot be reached
+        """
+        with self._lock:
+            wait = self._last_request + NOMINATIM_MIN_INTERVAL - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                response = self._client.get('/search', params={'q': query, 'format': 'jsonv2', 'limit': 1})
+            finally:
+                self._last_request = time.monotonic()
+        
+        response.raise_for_status()
+        results = response.json()
+        if not results:
+            return None
+        return float(results[0]['lat']), float(results[0]['lon'])
+
+
+class CachingGeocoder:
+    """
+    LRU cache in front of another geocoder.
+    
+    Misses are cached too, so an unknown address is not looked up again on
+    every pass. Errors are not cached.
+    """
+    
+    def __init__(self, geocoder: Geocoder, max_size: int = GEOCODE_CACHE_SIZE):
+        """
+        Initialize the cache.
+        
+        Args:
+            geocoder (Geocoder): Geocoder to delegate lookups to
+            max_size (int): Number of queries remembered
+        """
+        self.geocoder = geocoder
+        self.max_size = max_size
+        self._results: "OrderedDict[str, Optional[Point]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def geocode(self, query: str) -> Optional[Point]:
+        """
+        Look up a location, from the cache if it was seen before.
+        
+        Args:
+            query (str): Address or place name
+        
+        Returns:
+            Optional[Point]: Latitude and longitude, or None if not found
+        """
+        key = ' '.join(query.lower().split())
+        with self._lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                return self._results[key]
+        
+        point = self.geocoder.geocode(query)
+        with self._lock:
+            self._results[key] = point
+            if len(self._results) > self.max_size:
+                self._results.popitem(last=False)
+        return point
+
+
+def load_geocoder(spec: str) -> Geocoder:
+    """
+    Create the geocoder named by a GEOCODER setting.
+    
+    Args:
+        spec (str): 'none' (or empty), 'nominatim', or 'package.module:factory'
+            for a custom geocoder built by calling factory()
+    
+    Returns:
+        Geocoder: The geocoder, cached unless it is the null geocoder
+    
+    Raises:
+        ValueError: If the spec is not recognized
+    """
+    spec = spec.strip()
+    if spec in ('', 'none'):
+        return NullGeocoder()
+    
+    if spec == 'nominatim':
+        geocoder: Geocoder = NominatimGeocoder(
+            os.getenv('NOMINATIM_URL', 'https://nominatim.openstreetmap.org'),
+            os.getenv('GEOCODER_USER_AGENT', 'activity-selector')
+        )
+    elif ':' in spec:
+        module_name, _, factory_name = spec.partition(':')
+        geocoder = getattr(importlib.import_module(module_name), factory_name)()
+    else:
+        raise ValueError(f"Unknown geocoder: {spec}")
+    return CachingGeocoder(geocoder)
+
+
+# Global geocoder, configured by GEOCODER
+geocoder = load_geocoder(os.getenv('GEOCODER', ''))
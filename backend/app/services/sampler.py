@@ -0,0 +1,192 @@
+"""
+Weighted random sampling over category snapshots.
+"""
+import random
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+
+# Days after a visit at which an activity gets half of its full weight back
+RECENCY_HALF_LIFE_DAYS = 30.0
+
+# Smallest weight an activity can have, so recent visits stay possible
+MIN_RECENCY_WEIGHT = 0.05
+
+# Weight multiplier applied to favoured price levels
+FAVOR_BOOST = 3.0
+
+
+def recency_weights(last_visit_day: np.ndarray, today_ordinal: int) -> np.ndarray:
+    """
+    Compute sampling weights that down-weight recently visited activities.
+    
+    Never-visited activities get the full weight of 1.0. A visit N days ago
+    gives ``1 - 0.5 ** (N / RECENCY_HALF_LIFE_DAYS)``, floored at
+    MIN_RECENCY_WEIGHT.
+    
+    Args:
+        last_visit_day (np.ndarray): Visit day ordinals (NaN if never visited)
+        today_ordinal (int): Day ordinal the weights are computed for
+    
+    Returns:
+        np.ndarray: Weight per activity
+    """
+    days_since = np.clip(today_ordinal - last_visit_day, 0, None)
+    weights = 1.0 - np.power(0.5, days_since / RECENCY_HALF_LIFE_DAYS)
+    weights = np.where(np.isnan(last_visit_day), 1.0, weights)
+    return np.maximum(weights, MIN_RECENCY_WEIGHT)
+
+
+class WeightedSampler:
+    """
+    Sampler over fixed per-activity weights grouped by price rank.
+    
+    Activities are ordered by price rank and a cumulative weight array is
+    built once, so each draw is a binary search: picking k activities
+    from a price band costs O(k log n) regardless of the sheet size.
+    """
+    
+    def __init__(self, price_ranks: np.ndarray, weights: np.ndarray, rank_count: int):
+        """
+        Precompute the cumulative weights.
+        
+        Args:
+            price_ranks (np.ndarray): Price rank per activity
+            weights (np.ndarray): Non-negative weight per activity
+            rank_count (int): Number of distinct price ranks
+        """
+        self.weights = weights
+        self._order = np.argsort(price_ranks, kind='stable')
+        self._cumulative = np.cumsum(weights[self._order])
+        # Positions in the ordered arrays where each price rank starts/ends
+        self._bounds = np.searchsorted(price_ranks[self._order], np.arange(rank_count + 1))
+        self._rank_count = rank_count
+    
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the sampler's arrays, in bytes."""
+        return self.weights.nbytes + self._order.nbytes + self._cumulative.nbytes + self._bounds.nbytes
+    
+    def sample(
+        self,
+        limit: int,
+        ranks: Optional[Iterable[int]] = None,
+        favored_ranks: Optional[Iterable[int]] = None
+    ) -> List[int]:
+        """
+        Draw distinct activity indices proportionally to their weights.
+        
+        Sparse draws pick rows by binary search and reject repeats. If
+        skewed weights keep redrawing the same rows, the remainder is drawn
+        without replacement from the rows not yet picked, so the result
+        always holds min(limit, eligible) indices.
+        
+        Args:
+            limit (int): Number of indices to draw
+            ranks (Optional[Iterable[int]]): Eligible price ranks (all if None)
+            favored_ranks (Optional[Iterable[int]]): Price ranks whose weight is boosted
+        
+        Returns:
+            List[int]: Indices into the snapshot's activities
+        """
+        eligible = range(self._rank_count) if ranks is None else sorted(set(ranks))
+        favored = set(favored_ranks or ())
+        
+        groups = []
+        group_weights = []
+        eligible_count = 0
+        for rank in eligible:
+            start, end = int(self._bounds[rank]), int(self._bounds[rank + 1])
+            if start == end:
+                continue
+            base = float(self._cumulative[start - 1]) if start else 0.0
+            total = float(self._cumulative[end - 1]) - base
+            if total <= 0:
+                continue
+            groups.append((start, end, base, total))
+            group_weights.append(total * (FAVOR_BOOST if rank in favored else 1.0))
+            eligible_count += end - start
+        
+        if not groups or limit <= 0:
+            return []
+        
+        # Rejection of repeats only stays cheap while the draw is sparse
+        if limit * 2 > eligible_count:
+            indices, weights = self._candidates(groups, group_weights)
+            return weighted_sample_without_replacement(indices, weights, limit)
+        
+        group_cumulative = np.cumsum(group_weights)
+        picked: List[int] = []
+        seen = set()
+        attempts = 0
+        while len(picked) < limit and attempts < limit * 16:
+            attempts += 1
+            group = int(np.searchsorted(group_cumulative, random.random() * group_cumulative[-1], side='right'))
+            start, end, base, total = groups[min(group, len(groups) - 1)]
+            target = base + random.random() * total
+            position = int(np.searchsorted(self._cumulative[start:end], target, side='right')) + start
+            index = int(self._order[min(position, end - 1)])
+            if index not in seen:
+                seen.add(index)
+                picked.append(index)
+        
+        if len(picked) < limit:
+            indices, weights = self._candidates(groups, group_weights)
+            remaining = ~np.isin(indices, picked)
+            picked.extend(weighted_sample_without_replacement(
+                indices[remaining],
+                weights[remaining],
+                limit - len(picked)
+            ))
+        return picked
+    
+    def _candidates(self, groups: List[tuple], group_weights: List[float]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get every row of the eligible price groups with its boosted weight.
+        
+        Args:
+            groups (List[tuple]): (start, end, base, total) per eligible price group
+            group_weights (List[float]): Boosted total weight per group
+        
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Activity indices and their weights
+        """
+        positions = np.concatenate([np.arange(start, end) for start, end, _, _ in groups])
+        boosts = np.concatenate([
+            np.full(end - start, weight / total)
+            for (start, end, _, total), weight in zip(groups, group_weights)
+        ])
+        indices = self._order[positions]
+        return indices, self.weights[indices] * boosts
+
+
+def weighted_sample_without_replacement(
+    indices: np.ndarray,
+    weights: np.ndarray,
+    limit: int
+) -> List[int]:
+    """
+    Draw distinct indices proportionally to weights in one vectorized pass.
+    
+    Uses the Efraimidis-Spirakis key ``u ** (1 / w)`` and keeps the largest
+    keys, which is O(n) and used when the candidate set is already filtered.
+    
+    Args:
+        indices (np.ndarray): Candidate activity indices
+        weights (np.ndarray): Positive weight per candidate
+        limit (int): Number of indices to draw
+    
+    Returns:
+        List[int]: Drawn indices, highest key first
+    """
+    if len(indices) == 0 or limit <= 0:
+        return []
+    
+    keys = np.power(np.random.random(len(indices)), 1.0 / np.maximum(weights, 1e-12))
+    if limit >= len(indices):
+        top = np.argsort(-keys)
+    else:
+        top = np.argpartition(-keys, limit)[:limit]
+        top = top[np.argsort(-keys[top])]
+    return [int(indices[i]) for i in top]
@@ -2,25 +2,137 @@
 Google Sheets service for fetching activity data.
 """
 import os
-import random
-from typing import List, Dict, Optional, Any
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import date
+from typing import Callable, Iterator, List, Dict, Optional, Any, Set, Tuple
 from google.oauth2.service_account import Credentials
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 
-from ..models import Activity, PriceLevel, Category
+from ..models import Activity, ActivityFilter, PriceLevel, Category, CategoryStats
+from .admission import QuotaBudget
 from .cache_service import cache_service
+from .geocoding import Geocoder, geocoder as shared_geocoder
+from .sheets_transport import SheetsClientPool
+from .snapshot import CategorySnapshot, parse_visit_day
+from .snapshot_events import SnapshotEventBus, snapshot_events
+from .visit_log import UpdateKey, VisitLog, visit_log
+
+
+# Rows requested per range read when a worksheet is fetched in blocks
+ROW_BLOCK_SIZE = int(os.getenv('SHEETS_ROW_BLOCK_SIZE', '5000'))
+
+# Number of row blocks fetched concurrently
+FETCH_WORKERS = int(os.getenv('SHEETS_FETCH_WORKERS', '4'))
+
+# Socket timeout for Sheets API connections, in seconds
+HTTP_TIMEOUT = float(os.getenv('SHEETS_HTTP_TIMEOUT', '30'))
+
+# Last worksheet column holding activity data
+LAST_COLUMN = 'M'
+
+# Base snapshot time-to-live in seconds (30 minutes), adapted per category
+SNAPSHOT_TTL = 1800
+
+# Number of most requested snapshots kept warm by warm_popular_snapshots
+WARM_LIMIT = int(os.getenv('CACHE_WARM_LIMIT', '5'))
+
+# Popular snapshots are refreshed once they are this close to expiring
+WARM_AHEAD_SECONDS = 120
+
+# How expired snapshots are revalidated before a full refetch: drive, checksum or none
+CHANGE_PROBE = os.getenv('SHEETS_CHANGE_PROBE', 'drive').lower()
+
+# Cell holding a per-worksheet checksum when CHANGE_PROBE is 'checksum'
+CHECKSUM_CELL = os.getenv('SHEETS_CHECKSUM_CELL', 'Z1')
+
+# Worksheet columns written back when visits and orders are recorded
+WRITABLE_COLUMNS = {
+    'past_orders': 'G',
+    'last_bill_price': 'H',
+    'last_visit_date': 'K',
+    'latitude': 'L',
+    'longitude': 'M'
+}
+
+# Activities geocoded per category in one geocode_activities() pass
+GEOCODE_BATCH_SIZE = int(os.getenv('GEOCODE_BATCH_SIZE', '50'))
+
+# Tenant served from GOOGLE_SHEETS_SPREADSHEET_ID
+DEFAULT_TENANT = 'default'
+
+# Sustained Sheets API requests per minute allowed per tenant (0 for unlimited)
+SHEETS_REQUESTS_PER_MINUTE = float(os.getenv('SHEETS_REQUESTS_PER_MINUTE', '0')) or None
+
+# Thread pool for concurrent row block reads, shared by all tenants
+_fetch_executor: Optional[ThreadPoolExecutor] = None
+_fetch_executor_lock = threading.Lock()
+
+# Sheets API client pools by service account key file, shared by all tenants
+_client_pools: Dict[str, SheetsClientPool] = {}
+_client_pools_lock = threading.Lock()
+
+
+class UnknownCategory(KeyError):
+    """Raised when requested categories are not worksheets of the spreadsheet."""
+    
+    def __init__(self, categories: List[str]):
+        """
+        Initialize the error.
+        
+        Args:
+            categories (List[str]): Category names that were not found
+        """
+        super().__init__(f"Unknown categories: {', '.join(categories)}")
+        self.categories = categories
 
 
 class GoogleSheetsService:
-    """Service for interacting with Google Sheets API."""
+    """
+    Service for interacting with Google Sheets API.
+    
+    One instance serves one tenant's spreadsheet. Its cache keys are
+    namespaced by tenant id, and it has its own Sheets API quota, visit
+    journal and snapshot event stream.
+    """
     
-    def __init__(self):
-        """Initialize the Google Sheets service."""
-        self.credentials_file = os.getenv('GOOGLE_SHEETS_CREDENTIALS_FILE')
-        self.spreadsheet_id = os.getenv('GOOGLE_SHEETS_SPREADSHEET_ID')
-        self.service = None
+    def __init__(
+        self,
+        tenant_id: str = DEFAULT_TENANT,
+        spreadsheet_id: Optional[str] = None,
+        credentials_file: Optional[str] = None,
+        quota: Optional[QuotaBudget] = None,
+        journal: Optional[VisitLog] = None,
+        events: Optional[SnapshotEventBus] = None,
+        geocoder: Optional[Geocoder] = None
+    ):
+        """
+        Initialize the Google Sheets service.
+        
+        Args:
+            tenant_id (str): Tenant served by this instance
+            spreadsheet_id (Optional[str]): Spreadsheet to read (the default tenant falls back to the environment)
+            credentials_file (Optional[str]): Service account key file (defaults to the environment)
+            quota (Optional[QuotaBudget]): Sheets API request budget (defaults to SHEETS_REQUESTS_PER_MINUTE)
+            journal (Optional[VisitLog]): Visit log (defaults to the global one)
+            events (Optional[SnapshotEventBus]): Snapshot event bus (defaults to the global one)
+            geocoder (Optional[Geocoder]): Geocoder for activities without coordinates (defaults to the global one)
+        """
+        self.tenant_id = tenant_id
+        self.credentials_file = credentials_file or os.getenv('GOOGLE_SHEETS_CREDENTIALS_FILE')
+        self.spreadsheet_id = spreadsheet_id
+        if spreadsheet_id is None and tenant_id == DEFAULT_TENANT:
+            self.spreadsheet_id = os.getenv('GOOGLE_SHEETS_SPREADSHEET_ID')
+        self.quota = quota or QuotaBudget(tenant_id, SHEETS_REQUESTS_PER_MINUTE)
+        self.visit_log = journal if journal is not None else visit_log
+        self.events = events if events is not None else snapshot_events
+        self.geocoder = geocoder if geocoder is not None else shared_geocoder
+        # Activities whose address could not be geocoded, keyed by (category, name, address)
+        self._geocode_misses: Set[Tuple[str, str, str]] = set()
+        self._clients: Optional[SheetsClientPool] = None
         self._initialized = False
+        # Serializes snapshot replacement so recorded visits are never lost
+        self._snapshot_lock = threading.Lock()
         
         if not self.credentials_file or not self.spreadsheet_id:
             print("⚠️  Google Sheets credentials not configured. Using mock data for development.")
@@ -34,10 +146,35 @@ class GoogleSheetsService:
             print("   Using mock data for development.")
     
     def _initialize_service(self) -> None:
-        """Initialize the Google Sheets API service."""
+        """
+        Initialize the Google Sheets API service.
+        
+        Tenants using the same key file share one client pool, so they
+        share its token refreshes and each thread holds one client per
+        service account rather than one per tenant.
+        """
+        key_file = os.path.abspath(self.credentials_file)
+        with _client_pools_lock:
+            self._clients = _client_pools.get(key_file)
+            if self._clients is None:
+                self._clients = _client_pools[key_file] = self._create_client_pool()
+    
+    def _create_client_pool(self) -> SheetsClientPool:
+        """
+        Build a Sheets API client pool from the service account key file.
+        
+        Returns:
+            SheetsClientPool: Pool of per-thread clients sharing one token
+        
+        Raises:
+            RuntimeError: If the credentials cannot be loaded
+        """
         try:
-            # Define the scope for Google Sheets API
-            scope = ['https://www.googleapis.com/auth/spreadsheets.readonly']
+            # Define the scope for Google Sheets API (read/write for visit logging)
+            scope = ['https://www.googleapis.com/auth/spreadsheets']
+            if CHANGE_PROBE == 'drive':
+                # Needed to read the spreadsheet's file version for change probes
+                scope.append('https://www.googleapis.com/auth/drive.metadata.readonly')
             
             # Load credentials from service account file
             credentials = Credentials.from_service_account_file(
@@ -45,12 +182,24 @@ class GoogleSheetsService:
                 scopes=scope
             )
             
-            # Build the service
-            self.service = build('sheets', 'v4', credentials=credentials)
+            # Per-thread clients over keep-alive transports sharing one token
+            return SheetsClientPool(credentials, timeout=HTTP_TIMEOUT)
             
         except Exception as e:
             raise RuntimeError(f"Failed to initialize Google Sheets service: {str(e)}")
     
+    @property
+    def service(self) -> Any:
+        """
+        Get the Sheets API client for the calling thread.
+        
+        Returns:
+            Any: Sheets API resource, or None if not initialized
+        """
+        if self._clients is None:
+            return None
+        return self._clients.client()
+    
     def get_categories(self) -> List[Category]:
         """
         Get available categories from the spreadsheet.
@@ -61,106 +210,681 @@ class GoogleSheetsService:
         if not self._initialized:
             return self._get_mock_categories()
         
-        cache_key = "categories"
-        cached_categories = cache_service.get(cache_key)
+        cache_key = self._cache_key("categories")
+        cached_categories, fresh = cache_service.peek(cache_key)
         
-        if cached_categories:
+        if cached_categories and fresh:
             return cached_categories
         
+        categories = []
+        for sheet_name, _ in self._fetch_sheet_properties():
+            # Skip system sheets that start with underscore
+            if not sheet_name.startswith('_'):
+                category = Category(
+                    name=sheet_name,
+                    description=f"Activities in the {sheet_name} category",
+                    sheet_name=sheet_name
+                )
+                categories.append(category)
+        
+        if cached_categories is not None:
+            cache_service.record_refresh(cache_key, changed=(categories != cached_categories))
+        
+        # Cache the categories for about 1 hour, adapted to how often they change
+        cache_service.set(cache_key, categories, ttl=cache_service.adaptive_ttl(cache_key, 3600))
+        return categories
+    
+    def _fetch_sheet_properties(self) -> List[Tuple[str, int]]:
+        """
+        Fetch worksheet titles and grid row counts.
+        
+        The row counts are cached as well so that range reads can be split
+        into bounded row blocks.
+        
+        Returns:
+            List[Tuple[str, int]]: (title, row count) per worksheet
+        """
+        self.quota.consume()
         try:
-            # Get all worksheet names (categories)
+            # Get all worksheet names (categories), masked to the fields we use
             spreadsheet = self.service.spreadsheets().get(
-                spreadsheetId=self.spreadsheet_id
+                spreadsheetId=self.spreadsheet_id,
+                fields='sheets.properties(title,gridProperties.rowCount)'
             ).execute()
+        except HttpError as e:
+            raise RuntimeError(f"Failed to fetch categories from Google Sheets: {str(e)}")
+        
+        properties = []
+        for sheet in spreadsheet.get('sheets', []):
+            sheet_properties = sheet['properties']
+            row_count = sheet_properties.get('gridProperties', {}).get('rowCount', 0)
+            properties.append((sheet_properties['title'], row_count))
+        
+        cache_service.set(self._cache_key("sheet_row_counts"), dict(properties), ttl=3600)
+        return properties
+    
+    def _get_row_count(self, category: str) -> Optional[int]:
+        """
+        Get the grid row count of a worksheet.
+        
+        Args:
+            category (str): Category name (worksheet name)
+            
+        Returns:
+            Optional[int]: Row count, or None if the worksheet is unknown
+        """
+        row_counts = cache_service.get(self._cache_key("sheet_row_counts"))
+        if row_counts is None:
+            row_counts = dict(self._fetch_sheet_properties())
+        return row_counts.get(category)
+    
+    def get_category_snapshot(self, category: str) -> CategorySnapshot:
+        """
+        Get the cached column-oriented snapshot of a category.
+        
+        Args:
+            category (str): Category name (worksheet name)
             
-            categories = []
-            for sheet in spreadsheet['sheets']:
-                sheet_name = sheet['properties']['title']
-                # Skip system sheets that start with underscore
-                if not sheet_name.startswith('_'):
-                    category = Category(
-                        name=sheet_name,
-                        description=f"Activities in the {sheet_name} category",
-                        sheet_name=sheet_name
+        Returns:
+            CategorySnapshot: Snapshot of every valid activity in the category
+        """
+        return self.get_category_snapshots([category])[category]
+    
+    def get_category_snapshots(
+        self,
+        categories: List[str],
+        revalidate: bool = False
+    ) -> Dict[str, CategorySnapshot]:
+        """
+        Get snapshots for several categories, loading cold ones together.
+        
+        Categories that need loading are first checked against the
+        worksheet list, so a misspelled name fails before any data is read.
+        Expired snapshots are revalidated with a cheap change probe and
+        kept if their worksheet has not changed (rebuilt from the same rows
+        once the day they were built has passed). All categories that still
+        need data are fetched in a single batchGet call instead of one round
+        trip per category.
+        
+        Args:
+            categories (List[str]): Category names (duplicates are ignored)
+            revalidate (bool): Treat fresh snapshots as expired (used for warming)
+        
+        Returns:
+            Dict[str, CategorySnapshot]: Snapshot per category name
+        
+        Raises:
+            UnknownCategory: If any category that needs loading is not a worksheet
+        """
+        # Visits flushed while the rows are read are not in them yet
+        generation = self.visit_log.generation
+        snapshots: Dict[str, CategorySnapshot] = {}
+        stale_snapshots: Dict[str, CategorySnapshot] = {}
+        for category in dict.fromkeys(categories):
+            cached_snapshot, fresh = cache_service.peek(
+                self._snapshot_key(category),
+                count_access=not revalidate
+            )
+            if cached_snapshot is not None and fresh and not revalidate:
+                snapshots[category] = cached_snapshot
+            elif cached_snapshot is not None:
+                stale_snapshots[category] = cached_snapshot
+            else:
+                snapshots[category] = None
+        
+        cold_categories = [c for c, snapshot in snapshots.items() if snapshot is None]
+        cold_categories.extend(stale_snapshots)
+        if not cold_categories:
+            return snapshots
+        
+        unknown = self.unknown_categories(cold_categories)
+        if unknown:
+            raise UnknownCategory(unknown)
+
+        if not self._initialized:
+            for category in cold_categories:
+                snapshots[category] = self._store_snapshot(
+                    category,
+                    self._get_mock_activities(category),
+                    generation=generation
+                )
+            return snapshots
+        
+        # Probe before reading so a change made mid-read is caught next time
+        versions = self._probe_versions(cold_categories)
+        for category, stale_snapshot in stale_snapshots.items():
+            if versions[category] is not None and versions[category] == stale_snapshot.version:
+                if stale_snapshot.built_at.date() == date.today():
+                    cache_key = self._snapshot_key(category)
+                    cache_service.record_refresh(cache_key, changed=False)
+                    cache_service.touch(cache_key, ttl=cache_service.adaptive_ttl(cache_key, SNAPSHOT_TTL))
+                    snapshots[category] = stale_snapshot
+                else:
+                    # Recency weights and not-visited stats are relative to the day
+                    # the snapshot was built, so rebuild them from the same rows
+                    snapshots[category] = self._store_snapshot(
+                        category,
+                        list(stale_snapshot.activities),
+                        stale_snapshot.version,
+                        generation
                     )
-                    categories.append(category)
+                cold_categories.remove(category)
+        
+        # Large worksheets are read in row blocks; the rest share one batchGet
+        row_counts = {category: self._get_row_count(category) for category in cold_categories}
+        large_categories = [c for c in cold_categories if (row_counts[c] or 0) > ROW_BLOCK_SIZE]
+        small_categories = [c for c in cold_categories if c not in large_categories]
+        
+        if small_categories:
+            self.quota.consume()
+            try:
+                result = self.service.spreadsheets().values().batchGet(
+                    spreadsheetId=self.spreadsheet_id,
+                    ranges=[self._category_range(c, 1, None) for c in small_categories],
+                    majorDimension='ROWS',
+                    valueRenderOption='FORMATTED_VALUE',
+                    fields='valueRanges.values'
+                ).execute()
+            except HttpError as e:
+                raise RuntimeError(f"Failed to fetch activities from Google Sheets: {str(e)}")
+            
+            value_ranges = result.get('valueRanges', [])
+            if len(value_ranges) != len(small_categories):
+                raise RuntimeError(
+                    f"Google Sheets returned {len(value_ranges)} ranges for {len(small_categories)} categories"
+                )
+            
+            # Value ranges come back in the order they were requested
+            for category, value_range in zip(small_categories, value_ranges):
+                activities = self._parse_rows(value_range.get('values', []), category)
+                snapshots[category] = self._store_snapshot(category, activities, versions[category], generation)
+        
+        for category in large_categories:
+            activities = self._fetch_category_activities(category)
+            snapshots[category] = self._store_snapshot(category, activities, versions[category], generation)
+        
+        return snapshots
+    
+    def unknown_categories(self, categories: List[str]) -> List[str]:
+        """
+        Find the names that are not categories of the spreadsheet.
+        
+        Args:
+            categories (List[str]): Category names
+        
+        Returns:
+            List[str]: Names without a matching worksheet, in the given order
+        """
+        known = {category.sheet_name for category in self.get_categories()}
+        return [category for category in dict.fromkeys(categories) if category not in known]
+    
+    def cached_snapshots(
+        self,
+        categories: List[str],
+        allow_stale: bool = False
+    ) -> Optional[Dict[str, CategorySnapshot]]:
+        """
+        Get snapshots from the cache only, never calling the Sheets API.
+        
+        Args:
+            categories (List[str]): Category names
+            allow_stale (bool): Accept expired snapshots (used when shedding load)
+        
+        Returns:
+            Optional[Dict[str, CategorySnapshot]]: Snapshot per category, or None
+            if any of them would need a fetch
+        """
+        snapshots: Dict[str, CategorySnapshot] = {}
+        for category in dict.fromkeys(categories):
+            cached_snapshot, fresh = cache_service.peek(
+                self._snapshot_key(category),
+                count_access=not allow_stale
+            )
+            if cached_snapshot is None or not (fresh or allow_stale):
+                return None
+            snapshots[category] = cached_snapshot
+        return snapshots
+    
+    def cached_categories(self, allow_stale: bool = False) -> Optional[List[Category]]:
+        """
+        Get the categories from the cache only, never calling the Sheets API.
+        
+        Args:
+            allow_stale (bool): Accept an expired category list
+        
+        Returns:
+            Optional[List[Category]]: Categories, or None if they would need a fetch
+        """
+        if not self._initialized:
+            return self._get_mock_categories()
+        
+        cached_categories, fresh = cache_service.peek(
+            self._cache_key("categories"),
+            count_access=not allow_stale
+        )
+        if cached_categories is None or not (fresh or allow_stale):
+            return None
+        return cached_categories
+    
+    def warm_popular_snapshots(self, limit: int = WARM_LIMIT) -> List[str]:
+        """
+        Refresh the most requested snapshots before they expire.
+        
+        Only snapshots that are expired or within WARM_AHEAD_SECONDS of
+        expiring are revalidated, so warming costs a change probe for
+        unchanged worksheets and a refetch only for edited ones. Snapshots
+        of worksheets that no longer exist are dropped instead.
+        
+        Args:
+            limit (int): Number of popular snapshots to consider
+        
+        Returns:
+            List[str]: Categories that were revalidated
+        """
+        prefix = self._snapshot_key("")
+        due_categories = []
+        for cache_key in cache_service.popular_keys(limit, prefix=prefix):
+            time_to_live = cache_service.time_to_live(cache_key)
+            if time_to_live is None or time_to_live < WARM_AHEAD_SECONDS:
+                due_categories.append(cache_key[len(prefix):])
+        
+        if due_categories:
+            # A deleted worksheet would fail the whole batch on every run
+            removed = set(self.unknown_categories(due_categories))
+            for category in removed:
+                cache_service.delete(self._snapshot_key(category))
+            due_categories = [category for category in due_categories if category not in removed]
+        
+        if due_categories:
+            self.get_category_snapshots(due_categories, revalidate=True)
+        return due_categories
+    
+    def _probe_versions(self, categories: List[str]) -> Dict[str, Optional[str]]:
+        """
+        Get a cheap change token for each category's worksheet.
+        
+        With the 'drive' probe the token is the spreadsheet's Drive file
+        version, which increases on every edit. With the 'checksum' probe it
+        is the value of CHECKSUM_CELL in each worksheet (e.g. a formula over
+        the data range). A None token means "unknown" and forces a refetch.
+        
+        Args:
+            categories (List[str]): Category names
             
-            # Cache the categories for 1 hour
-            cache_service.set(cache_key, categories, ttl=3600)
-            return categories
+        Returns:
+            Dict[str, Optional[str]]: Token per category
+        """
+        versions: Dict[str, Optional[str]] = {category: None for category in categories}
+        if CHANGE_PROBE not in ('drive', 'checksum'):
+            return versions
+        
+        self.quota.consume()
+        try:
+            if CHANGE_PROBE == 'drive':
+                result = self._clients.client('drive', 'v3').files().get(
+                    fileId=self.spreadsheet_id,
+                    fields='version',
+                    supportsAllDrives=True
+                ).execute()
+                version = result.get('version')
+                versions = {category: version for category in categories}
             
+            elif CHANGE_PROBE == 'checksum':
+                result = self.service.spreadsheets().values().batchGet(
+                    spreadsheetId=self.spreadsheet_id,
+                    ranges=[f"{category}!{CHECKSUM_CELL}" for category in categories],
+                    fields='valueRanges.values'
+                ).execute()
+                for category, value_range in zip(categories, result.get('valueRanges', [])):
+                    values = value_range.get('values', [])
+                    versions[category] = str(values[0][0]) if values and values[0] else None
+        
         except HttpError as e:
-            raise RuntimeError(f"Failed to fetch categories from Google Sheets: {str(e)}")
+            print(f"Warning: Change probe failed, refetching data: {e}")
+        
+        return versions
     
-    def get_activities_by_category(
-        self, 
-        category: str, 
-        price_level: Optional[PriceLevel] = None
-    ) -> List[Activity]:
+    def _cache_key(self, name: str) -> str:
+        """Get a cache key namespaced to this service's tenant."""
+        return f"{self.tenant_id}:{name}"
+    
+    def _snapshot_key(self, category: str) -> str:
+        """Get the cache key of a category snapshot."""
+        return self._cache_key(f"snapshot_{category}")
+    
+    def _category_range(
+        self,
+        category: str,
+        start_row: Optional[int] = None,
+        end_row: Optional[int] = None
+    ) -> str:
         """
-        Get activities from a specific category and optionally filter by price level.
+        Get the A1 range holding a category's activities.
+        
+        Columns A-M: Name, Price, Description, Location, Address, Phone,
+        Past Orders, Last Bill, URL, Notes, Last Visit Date, Latitude,
+        Longitude.
+        
+        Args:
+            category (str): Category name (worksheet name)
+            start_row (Optional[int]): First row (1-based), whole columns if None
+            end_row (Optional[int]): Last row (1-based, inclusive), to the end of the sheet if None
+        
+        Returns:
+            str: A1 notation range
+        """
+        if start_row is None:
+            return f"{category}!A:{LAST_COLUMN}"
+        if end_row is None:
+            return f"{category}!A{start_row}:{LAST_COLUMN}"
+        return f"{category}!A{start_row}:{LAST_COLUMN}{end_row}"
+    
+    def _store_snapshot(
+        self,
+        category: str,
+        activities: List[Activity],
+        version: Optional[str] = None,
+        generation: Optional[int] = None
+    ) -> CategorySnapshot:
+        """
+        Build a snapshot from parsed activities and cache it.
+        
+        Args:
+            category (str): Category name
+            activities (List[Activity]): Parsed activities in sheet order
+            version (Optional[str]): Change-probe token observed before the read
+            generation (Optional[int]): Visit log generation observed before the read
+        
+        Returns:
+            CategorySnapshot: The cached snapshot
+        """
+        # Visits not yet in the rows that were read are re-applied to fresh data
+        snapshot = CategorySnapshot(category, activities, version)
+        cache_key = self._snapshot_key(category)
+        
+        with self._snapshot_lock:
+            snapshot = snapshot.with_updates(self.visit_log.pending_for(category, since=generation))
+            previous_snapshot, _ = cache_service.peek(cache_key, count_access=False)
+            if previous_snapshot is not None:
+                changed = previous_snapshot.activities != snapshot.activities
+                cache_service.record_refresh(cache_key, changed=changed)
+            
+            # Expired snapshots stay in the cache so they can be revalidated
+            cache_service.set(
+                cache_key,
+                snapshot,
+                ttl=cache_service.adaptive_ttl(cache_key, SNAPSHOT_TTL),
+                size=snapshot.size_bytes
+            )
+            
+            # A first load has nothing clients could have seen, so only changes are announced
+            if previous_snapshot is not None and changed:
+                changed_names, removed_names = snapshot.diff(previous_snapshot)
+                self.events.publish(category, snapshot.version, changed_names, removed_names)
+            
+            if generation is not None:
+                self.visit_log.settle(category, generation)
+        return snapshot
+    
+    def _fetch_category_activities(self, category: str) -> List[Activity]:
+        """
+        Fetch and parse every activity row of a worksheet.
+        
+        Worksheets larger than ROW_BLOCK_SIZE rows are read in row blocks
+        fetched concurrently and parsed as each block arrives, so the whole
+        sheet is never buffered as one response. Grids are often much larger
+        than their data, so the blocks are planned from a read of the name
+        column instead of the grid row count: blocks without any named row
+        are skipped (blank rows inside the sheet do not end the read), and
+        once a block returns fewer rows than the name column promised, the
+        sheet has shrunk and no further blocks are requested. The first
+        block is read alongside the name column, so planning costs no extra
+        round trip. The last block is open-ended, so rows added since the
+        name column was read are not cut off.
         
         Args:
             category (str): Category name (worksheet name)
-            price_level (Optional[PriceLevel]): Price level filter
             
         Returns:
-            List[Activity]: List of activities matching the criteria
+            List[Activity]: Parsed activities in sheet order
         """
-        if not self._initialized:
-            activities = self._get_mock_activities(category)
-            if price_level:
-                activities = [a for a in activities if a.price_level == price_level]
-            return activities
+        row_count = self._get_row_count(category)
+        if not row_count or row_count <= ROW_BLOCK_SIZE:
+            values = self._fetch_row_block(category, 1, None)
+            return self._parse_rows(values, category)
+        
+        executor = self._get_executor()
+        first_block = executor.submit(self._fetch_row_block, category, 1, ROW_BLOCK_SIZE)
+        named_rows = self._fetch_named_rows(category)
+        if not named_rows or named_rows[-1] <= ROW_BLOCK_SIZE:
+            return self._parse_rows(first_block.result(), category)
+        
+        # Last named row of each block that has one, keyed by the block's first row
+        last_named: Dict[int, int] = {}
+        for row in named_rows:
+            start = row - (row - 1) % ROW_BLOCK_SIZE
+            last_named[start] = row
+        # (first row, last row, last named row) of the blocks to read
+        blocks = [(start, start + ROW_BLOCK_SIZE - 1, last) for start, last in last_named.items()]
+        blocks[-1] = (blocks[-1][0], None, blocks[-1][2])
+        parsed: Dict[int, List[Activity]] = {}
+        pending = {}
+        next_block = 0
+        if blocks[0][0] == 1:
+            pending[first_block] = 0
+            next_block = 1
+        
+        while pending or next_block < len(blocks):
+            # Keep up to FETCH_WORKERS blocks in flight
+            while len(pending) < FETCH_WORKERS and next_block < len(blocks):
+                start, end, _ = blocks[next_block]
+                future = executor.submit(self._fetch_row_block, category, start, end)
+                pending[future] = next_block
+                next_block += 1
+            
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = pending.pop(future)
+                values = future.result()
+                start, _, last = blocks[index]
+                if len(values) < last - start + 1:
+                    # Rows were deleted since the name column was read
+                    next_block = len(blocks)
+                parsed[index] = self._parse_rows(values, category, has_header=(index == 0))
+        
+        activities = []
+        for index in sorted(parsed):
+            activities.extend(parsed[index])
+        return activities
+    
+    def _fetch_named_rows(self, category: str) -> List[int]:
+        """
+        Find the rows that have an activity name, reading only the name column.
+        
+        Args:
+            category (str): Category name (worksheet name)
+        
+        Returns:
+            List[int]: Row numbers (1-based, ascending) with a non-blank name
+        """
+        self.quota.consume()
+        try:
+            result = self.service.spreadsheets().values().get(
+                spreadsheetId=self.spreadsheet_id,
+                range=f"{category}!A:A",
+                majorDimension='ROWS',
+                valueRenderOption='FORMATTED_VALUE',
+                fields='values'
+            ).execute()
+        except HttpError as e:
+            raise RuntimeError(f"Failed to fetch activities from Google Sheets: {str(e)}")
         
-        cache_key = f"activities_{category}_{price_level or 'all'}"
-        cached_activities = cache_service.get(cache_key)
+        return [row for row, cells in enumerate(result.get('values', []), start=1) if cells and cells[0].strip()]
+    
+    def _fetch_row_block(
+        self,
+        category: str,
+        start_row: Optional[int],
+        end_row: Optional[int]
+    ) -> List[List[str]]:
+        """
+        Read one block of rows, masked to the cell values only.
         
-        if cached_activities:
-            return cached_activities
+        Safe to call from worker threads: each thread uses its own client.
         
+        Args:
+            category (str): Category name (worksheet name)
+            start_row (Optional[int]): First row (1-based), whole columns if None
+            end_row (Optional[int]): Last row (1-based, inclusive), to the end of the sheet if None
+        
+        Returns:
+            List[List[str]]: Raw rows; trailing empty rows are omitted by the API
+        """
+        self.quota.consume()
         try:
-            # Get all data from the worksheet
-            range_name = f"{category}!A:K"  # Columns A-K: Name, Price, Description, Location, Address, Phone, Past Orders, Last Bill, URL, Notes, Last Visit Date
             result = self.service.spreadsheets().values().get(
                 spreadsheetId=self.spreadsheet_id,
-                range=range_name
+                range=self._category_range(category, start_row, end_row),
+                majorDimension='ROWS',
+                valueRenderOption='FORMATTED_VALUE',
+                fields='values'
             ).execute()
+        except HttpError as e:
+            raise RuntimeError(f"Failed to fetch activities from Google Sheets: {str(e)}")
+        
+        return result.get('values', [])
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Get the thread pool used for concurrent range reads."""
+        global _fetch_executor
+        with _fetch_executor_lock:
+            if _fetch_executor is None:
+                _fetch_executor = ThreadPoolExecutor(
+                    max_workers=FETCH_WORKERS,
+                    thread_name_prefix='sheets-fetch'
+                )
+        return _fetch_executor
+    
+    def _parse_rows(
+        self,
+        values: List[List[str]],
+        category: str,
+        has_header: bool = True
+    ) -> List[Activity]:
+        """
+        Parse worksheet rows into activities, skipping the header and invalid rows.
+        
+        Args:
+            values (List[List[str]]): Raw rows from Google Sheets
+            category (str): Category name
+            has_header (bool): Whether the rows start at the top of the sheet
             
-            values = result.get('values', [])
-            if not values:
-                return []
+        Returns:
+            List[Activity]: Parsed activities in sheet order
+        """
+        if not values:
+            return []
+        
+        # Skip header row if it exists
+        if has_header and len(values) > 1 and self._is_header_row(values[0]):
+            data_rows = values[1:]
+        else:
+            data_rows = values
+        
+        activities = []
+        for row in data_rows:
+            if len(row) >= 3:  # At minimum: name, price, category
+                try:
+                    activities.append(self._parse_activity_row(row, category))
+                except ValueError as e:
+                    # Skip invalid rows
+                    print(f"Warning: Skipping invalid activity row: {row}, Error: {e}")
+                    continue
+        
+        return activities
+    
+    def get_activities_by_category(
+        self, 
+        category: str, 
+        price_level: Optional[PriceLevel] = None,
+        filters: Optional[ActivityFilter] = None
+    ) -> List[Activity]:
+        """
+        Get activities from a specific category and optionally filter them.
+        
+        Args:
+            category (str): Category name (worksheet name)
+            price_level (Optional[PriceLevel]): Price level filter
+            filters (Optional[ActivityFilter]): Additional price, bill and visit filters
             
-            # Skip header row if it exists
-            data_rows = values[1:] if len(values) > 1 and self._is_header_row(values[0]) else values
+        Returns:
+            List[Activity]: List of activities matching the criteria
+        """
+        return self.get_category_snapshot(category).select(price_level, filters)
+    
+    def count_activities(
+        self, 
+        category: str, 
+        price_level: Optional[PriceLevel] = None,
+        filters: Optional[ActivityFilter] = None
+    ) -> int:
+        """
+        Count activities in a category matching the given filters.
+        
+        Args:
+            category (str): Category name
+            price_level (Optional[PriceLevel]): Price level filter
+            filters (Optional[ActivityFilter]): Additional price, bill and visit filters
             
-            activities = []
-            for row in data_rows:
-                if len(row) >= 3:  # At minimum: name, price, category
-                    try:
-                        activity = self._parse_activity_row(row, category)
-                        
-                        # Filter by price level if specified
-                        if price_level is None or activity.price_level == price_level:
-                            activities.append(activity)
-                            
-                    except ValueError as e:
-                        # Skip invalid rows
-                        print(f"Warning: Skipping invalid activity row: {row}, Error: {e}")
-                        continue
+        Returns:
+            int: Number of matching activities
+        """
+        return self.get_category_snapshot(category).count(price_level, filters)
+    
+    def iter_activities(self, categories: Optional[List[str]] = None) -> Iterator[Activity]:
+        """
+        Iterate over activities one category at a time.
+        
+        Categories are loaded lazily as the iteration reaches them, so a
+        consumer streaming the output only needs one snapshot at a time.
+        
+        Args:
+            categories (Optional[List[str]]): Category names (all categories if None)
             
-            # Cache the activities for 30 minutes
-            cache_service.set(cache_key, activities, ttl=1800)
-            return activities
+        Yields:
+            Activity: Activities in category order, then sheet order
+        """
+        if categories is None:
+            categories = [c.sheet_name for c in self.get_categories()]
+        
+        for category in categories:
+            yield from self.get_category_snapshot(category).activities
+    
+    def get_category_stats(self, category: Optional[str] = None) -> List[CategoryStats]:
+        """
+        Get the aggregate statistics precomputed for category snapshots.
+        
+        Args:
+            category (Optional[str]): Single category to report (all if None)
             
-        except HttpError as e:
-            raise RuntimeError(f"Failed to fetch activities from Google Sheets: {str(e)}")
+        Returns:
+            List[CategoryStats]: Statistics per category
+        """
+        if category is not None:
+            categories = [category]
+        else:
+            categories = [c.sheet_name for c in self.get_categories()]
+        
+        return [self.get_category_snapshot(name).stats for name in categories]
     
     def get_random_activities(
         self, 
         category: str, 
         price_level: Optional[PriceLevel] = None,
-        limit: int = 5
+        limit: int = 5,
+        filters: Optional[ActivityFilter] = None,
+        recency_weighted: bool = True,
+        favor_price_levels: Optional[List[PriceLevel]] = None
     ) -> List[Activity]:
         """
         Get random activities from a category.
@@ -169,17 +893,247 @@ class GoogleSheetsService:
             category (str): Category name
             price_level (Optional[PriceLevel]): Price level filter
             limit (int): Number of activities to return
+            filters (Optional[ActivityFilter]): Additional price, bill and visit filters
+            recency_weighted (bool): Down-weight recently visited activities
+            favor_price_levels (Optional[List[PriceLevel]]): Price levels to favour
             
         Returns:
             List[Activity]: Random list of activities
         """
-        activities = self.get_activities_by_category(category, price_level)
+        snapshot = self.get_category_snapshot(category)
+        return snapshot.sample(
+            limit,
+            price_level=price_level,
+            filters=filters,
+            recency_weighted=recency_weighted,
+            favor_price_levels=favor_price_levels
+        )
+    
+    def record_visit(
+        self,
+        category: str,
+        name: str,
+        visit_date: Optional[date] = None,
+        bill_price: Optional[float] = None,
+        orders: Optional[List[str]] = None
+    ) -> Activity:
+        """
+        Record a visit to an activity.
         
-        if not activities:
-            return []
+        The visit is journaled and applied to the cached snapshot right
+        away; the sheet itself is updated by the next flush_visits(). A visit
+        older than the last recorded one only adds its orders.
+        
+        Args:
+            category (str): Category name
+            name (str): Activity name
+            visit_date (Optional[date]): Date of the visit (defaults to today)
+            bill_price (Optional[float]): Bill amount of the visit
+            orders (Optional[List[str]]): Items ordered during the visit
+            
+        Returns:
+            Activity: The updated activity
+            
+        Raises:
+            KeyError: If the activity does not exist
+        """
+        visit_date = visit_date or date.today()
+        
+        def visit_fields(activity: Activity) -> Dict[str, Any]:
+            fields: Dict[str, Any] = {}
+            # NaN compares False, so a missing or unreadable date is overwritten
+            if not parse_visit_day(activity.last_visit_date) > visit_date.toordinal():
+                fields['last_visit_date'] = visit_date.isoformat()
+                if bill_price is not None:
+                    fields['last_bill_price'] = bill_price
+            if orders:
+                fields['past_orders'] = list(activity.past_orders or []) + orders
+            return fields
+        
+        return self._update_activity(category, name, visit_fields)
+    
+    def record_orders(self, category: str, name: str, orders: List[str]) -> Activity:
+        """
+        Add items to the past orders of an activity.
+        
+        Args:
+            category (str): Category name
+            name (str): Activity name
+            orders (List[str]): Items to add
+            
+        Returns:
+            Activity: The updated activity
+            
+        Raises:
+            KeyError: If the activity does not exist
+        """
+        return self._update_activity(
+            category,
+            name,
+            lambda activity: {'past_orders': list(activity.past_orders or []) + orders}
+        )
+    
+    def flush_visits(self) -> int:
+        """
+        Write the queued visit and order updates to the sheet.
+        
+        All updates are sent in one batchUpdate call. If it fails they stay
+        queued (and journaled) for the next flush.
+        
+        Returns:
+            int: Number of activities written
+        """
+        return self.visit_log.flush(self._write_activity_updates)
+    
+    def geocode_activities(self, limit: int = GEOCODE_BATCH_SIZE) -> int:
+        """
+        Add coordinates to cached activities that only have an address.
+        
+        Coordinates are applied like recorded visits: visible in proximity
+        queries right away and written to the Latitude/Longitude columns by
+        the next flush_visits(), so each address is geocoded once.
+        
+        Args:
+            limit (int): Activities geocoded per category in this pass
         
-        # Return random selection
-        return random.sample(activities, min(limit, len(activities)))
+        Returns:
+            int: Number of activities geocoded
+        """
+        geocoded = 0
+        for category in [c.sheet_name for c in self.cached_categories(allow_stale=True) or []]:
+            # Only categories someone has loaded; geocoding never triggers a fetch
+            snapshot, _ = cache_service.peek(self._snapshot_key(category), count_access=False)
+            if snapshot is None:
+                continue
+            
+            pending = [
+                activity for activity in snapshot.activities
+                if activity.latitude is None and activity.address
+                and (category, activity.name, activity.address) not in self._geocode_misses
+            ][:limit]
+            for activity in pending:
+                point = self.geocoder.geocode(activity.address)
+                if point is None:
+                    self._geocode_misses.add((category, activity.name, activity.address))
+                    continue
+                
+                latitude, longitude = point
+                try:
+                    self._update_activity(
+                        category,
+                        activity.name,
+                        lambda current: {} if current.latitude is not None else {
+                            'latitude': latitude,
+                            'longitude': longitude
+                        }
+                    )
+                except KeyError:
+                    # Removed from the sheet since the snapshot was read
+                    continue
+                geocoded += 1
+        return geocoded
+    
+    def _update_activity(
+        self,
+        category: str,
+        name: str,
+        build_fields: Callable[[Activity], Dict[str, Any]]
+    ) -> Activity:
+        """
+        Apply field updates to a cached activity and queue them for writing.
+        
+        Args:
+            category (str): Category name
+            name (str): Activity name
+            build_fields (Callable[[Activity], Dict[str, Any]]): Computes the new field values
+            
+        Returns:
+            Activity: The updated activity
+            
+        Raises:
+            KeyError: If the activity does not exist
+        """
+        snapshot = self.get_category_snapshot(category)
+        cache_key = self._snapshot_key(category)
+        
+        with self._snapshot_lock:
+            # Re-read under the lock: a refresh may have replaced the snapshot
+            cached_snapshot, _ = cache_service.peek(cache_key, count_access=False)
+            snapshot = cached_snapshot or snapshot
+            activity = snapshot.find(name)
+            if activity is None:
+                raise KeyError(f"Activity '{name}' not found in category '{category}'")
+            
+            fields = build_fields(activity)
+            if fields:
+                self.visit_log.record(category, activity.name, fields)
+                snapshot = snapshot.with_updates({activity.name: fields})
+                ttl = cache_service.time_to_live(cache_key)
+                cache_service.set(cache_key, snapshot, ttl=max(int(ttl or 0), 1), size=snapshot.size_bytes)
+                self.events.publish(category, snapshot.version, [activity.name])
+        
+        return snapshot.find(name)
+    
+    def _write_activity_updates(self, updates: Dict[UpdateKey, Dict[str, Any]]) -> None:
+        """
+        Write coalesced activity updates to the sheet in one batchUpdate.
+        
+        Rows are located by name at write time, so rows inserted or sorted
+        since the snapshot was read do not misplace the update. Updates for
+        activities no longer in the sheet are dropped.
+        
+        Args:
+            updates (Dict[UpdateKey, Dict[str, Any]]): Field values per (category, name)
+        """
+        if not self._initialized:
+            # Mock data lives in memory only
+            return
+        
+        categories = list(dict.fromkeys(category for category, _ in updates))
+        self.quota.consume()
+        try:
+            result = self.service.spreadsheets().values().batchGet(
+                spreadsheetId=self.spreadsheet_id,
+                ranges=[f"{category}!A:A" for category in categories],
+                majorDimension='COLUMNS',
+                fields='valueRanges.values'
+            ).execute()
+        except HttpError as e:
+            raise RuntimeError(f"Failed to locate activities in Google Sheets: {str(e)}")
+        
+        row_numbers: Dict[UpdateKey, int] = {}
+        for category, value_range in zip(categories, result.get('valueRanges', [])):
+            names = (value_range.get('values') or [[]])[0]
+            for row_index, cell in enumerate(names):
+                row_numbers.setdefault((category, str(cell).strip()), row_index + 1)
+        
+        data = []
+        for (category, name), fields in updates.items():
+            row = row_numbers.get((category, name))
+            if row is None:
+                print(f"Warning: Dropping update for missing activity '{name}' in '{category}'")
+                continue
+            for field, value in fields.items():
+                if field == 'past_orders':
+                    value = ', '.join(value or [])
+                data.append({
+                    'range': f"{category}!{WRITABLE_COLUMNS[field]}{row}",
+                    'values': [['' if value is None else value]]
+                })
+        
+        if not data:
+            return
+        
+        self.quota.consume()
+        try:
+            # RAW keeps dates as YYYY-MM-DD text instead of locale-formatted dates
+            self.service.spreadsheets().values().batchUpdate(
+                spreadsheetId=self.spreadsheet_id,
+                body={'valueInputOption': 'RAW', 'data': data},
+                fields='totalUpdatedCells'
+            ).execute()
+        except HttpError as e:
+            raise RuntimeError(f"Failed to write activity updates to Google Sheets: {str(e)}")
     
     def _parse_activity_row(self, row: List[str], category: str) -> Activity:
         """
@@ -244,6 +1198,15 @@ class GoogleSheetsService:
         notes = row[9].strip() if len(row) > 9 and row[9] else None
         # Parse Last Visit Date
         last_visit_date = row[10].strip() if len(row) > 10 and row[10] else None
+        # Parse coordinates, kept only if both are valid
+        latitude = longitude = None
+        if len(row) > 12 and row[11] and row[12]:
+            try:
+                latitude, longitude = float(row[11]), float(row[12])
+            except ValueError:
+                pass
+            if latitude is not None and not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+                latitude = longitude = None
         return Activity(
             name=name,
             description=description,
@@ -256,7 +1219,9 @@ class GoogleSheetsService:
             last_bill_price=last_bill_price,
             url=url,
             notes=notes,
-            last_visit_date=last_visit_date
+            last_visit_date=last_visit_date,
+            latitude=latitude,
+            longitude=longitude
         )
     
     def _is_header_row(self, row: List[str]) -> bool:
@@ -0,0 +1,162 @@
+"""
+Thread-safe HTTP transport for the Google Sheets API client.
+"""
+import json
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import httplib2
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient import discovery_cache
+from googleapiclient.discovery import build_from_document
+
+
+# A refresh finished this recently is reused instead of refreshing again
+REFRESH_REUSE_SECONDS = 5.0
+
+_discovery_lock = threading.Lock()
+_discovery_documents: Dict[str, Dict[str, Any]] = {}
+
+
+def get_discovery_document(service_name: str, version: str) -> Dict[str, Any]:
+    """
+    Get a parsed discovery document bundled with google-api-python-client.
+    
+    Documents are loaded from the library's static copies once per process,
+    so building clients never performs network I/O.
+    
+    Args:
+        service_name (str): API name, e.g. 'sheets'
+        version (str): API version, e.g. 'v4'
+    
+    Returns:
+        Dict[str, Any]: Parsed discovery document
+    
+    Raises:
+        RuntimeError: If no static document is bundled for the API
+    """
+    key = f"{service_name}/{version}"
+    document = _discovery_documents.get(key)
+    if document is not None:
+        return document
+    
+    with _discovery_lock:
+        if key not in _discovery_documents:
+            content = discovery_cache.get_static_doc(service_name, version)
+            if content is None:
+                raise RuntimeError(f"No bundled discovery document for {key}")
+            _discovery_documents[key] = json.loads(content)
+        return _discovery_documents[key]
+
+
+class SharedCredentials:
+    """
+    Credentials wrapper that serializes token refreshes across threads.
+    
+    Every per-thread transport holds the same wrapper, so an expired token
+    is refreshed once and the new token is picked up by all connections.
+    """
+    
+    def __init__(self, credentials: Any):
+        """
+        Wrap google-auth credentials.
+        
+        Args:
+            credentials (Any): google-auth credentials to share
+        """
+        self._credentials = credentials
+        self._lock = threading.Lock()
+        self._last_refresh = 0.0
+    
+    @property
+    def token(self) -> Optional[str]:
+        """Current access token."""
+        return self._credentials.token
+    
+    @property
+    def valid(self) -> bool:
+        """Whether the current token can be used."""
+        return self._credentials.valid
+    
+    def refresh(self, request: Any) -> None:
+        """
+        Refresh the token unless another thread just did.
+        
+        Args:
+            request (Any): google-auth transport request
+        """
+        with self._lock:
+            recently_refreshed = time.monotonic() - self._last_refresh < REFRESH_REUSE_SECONDS
+            if self._credentials.valid and recently_refreshed:
+                return
+            self._credentials.refresh(request)
+            self._last_refresh = time.monotonic()
+    
+    def before_request(self, request: Any, method: str, url: str, headers: Dict[str, str]) -> None:
+        """
+        Ensure a valid token and add the authorization headers.
+        
+        Args:
+            request (Any): google-auth transport request
+            method (str): HTTP method
+            url (str): Request URL
+            headers (Dict[str, str]): Headers to update
+        """
+        if not self._credentials.valid:
+            self.refresh(request)
+        self._credentials.apply(headers)
+
+
+class SheetsClientPool:
+    """
+    Pool of Google API clients, one per thread and API.
+    
+    httplib2 connections are not thread-safe, so each thread gets its own
+    keep-alive transport and client, built from the cached discovery
+    document. All clients share one SharedCredentials instance.
+    """
+    
+    def __init__(self, credentials: Any, timeout: Optional[float] = None):
+        """
+        Initialize the pool.
+        
+        Args:
+            credentials (Any): google-auth credentials
+            timeout (Optional[float]): Socket timeout in seconds
+        """
+        self.credentials = SharedCredentials(credentials)
+        self._timeout = timeout
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._client_count = 0
+    
+    def client(self, service_name: str = 'sheets', version: str = 'v4') -> Any:
+        """
+        Get the API client owned by the calling thread.
+        
+        Args:
+            service_name (str): API name (Sheets by default)
+            version (str): API version
+        
+        Returns:
+            Any: API resource
+        """
+        clients = getattr(self._local, 'clients', None)
+        if clients is None:
+            clients = self._local.clients = {}
+        
+        key = f"{service_name}/{version}"
+        client = clients.get(key)
+        if client is None:
+            http = AuthorizedHttp(self.credentials, http=httplib2.Http(timeout=self._timeout))
+            client = build_from_document(get_discovery_document(service_name, version), http=http)
+            clients[key] = client
+            with self._lock:
+                self._client_count += 1
+        return client
+    
+    @property
+    def client_count(self) -> int:
+        """Number of clients built so far (one per thread and API used)."""
+        return self._client_count
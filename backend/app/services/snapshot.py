@@ -0,0 +1,495 @@
+"""
+Column-oriented category snapshots for fast activity filtering.
+"""
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from ..models import Activity, ActivityFilter, CategoryStats, PriceLevel, PriceLevelStats
+from .geo_index import DEFAULT_RADIUS_KM, GeoIndex, parse_point
+from .sampler import FAVOR_BOOST, WeightedSampler, recency_weights, weighted_sample_without_replacement
+
+
+# Price levels ordered from cheapest to most expensive
+PRICE_LEVEL_ORDER: List[PriceLevel] = list(PriceLevel)
+PRICE_RANKS = {level.value: rank for rank, level in enumerate(PRICE_LEVEL_ORDER)}
+
+# "Not visited in N days" windows precomputed for every snapshot
+STATS_VISIT_WINDOWS = (30, 90, 180, 365)
+
+FILTER_FIELDS = tuple(ActivityFilter.model_fields)
+
+# Filters that cannot be answered by restricting price ranks alone
+ROW_FILTER_FIELDS = ('min_bill_price', 'max_bill_price', 'last_visit_before', 'last_visit_after', 'near', 'radius')
+
+# Rough per-activity object overhead used when estimating snapshot sizes
+ACTIVITY_OVERHEAD_BYTES = 600
+
+
+def price_rank(price_level: PriceLevel) -> int:
+    """
+    Get the ordinal rank of a price level (Free is 0).
+    
+    Args:
+        price_level (PriceLevel): Price level or its string value
+    
+    Returns:
+        int: Rank of the price level
+    """
+    return PRICE_RANKS[PriceLevel(price_level).value]
+
+
+def parse_visit_day(value: Optional[str]) -> float:
+    """
+    Convert a YYYY-MM-DD visit date into a day ordinal.
+    
+    Args:
+        value (Optional[str]): Date string from the sheet
+    
+    Returns:
+        float: Proleptic Gregorian ordinal, or NaN if missing/invalid
+    """
+    if not value:
+        return np.nan
+    try:
+        return float(date.fromisoformat(value.strip()).toordinal())
+    except ValueError:
+        return np.nan
+
+
+class CategorySnapshot:
+    """
+    Immutable view over one category's activities.
+    
+    Alongside the parsed activities, the snapshot keeps NumPy columns for
+    the fields that queries filter on, so multi-predicate filters become a
+    handful of vectorized boolean masks instead of Python loops. Aggregate
+    statistics and sampling weights are computed once when the snapshot is
+    built.
+    """
+    
+    def __init__(
+        self,
+        category: str,
+        activities: Iterable[Activity],
+        version: Optional[str] = None
+    ):
+        """
+        Build the snapshot and its columns.
+        
+        Args:
+            category (str): Category name
+            activities (Iterable[Activity]): Parsed activities in sheet order
+            version (Optional[str]): Change-probe token observed before the data was read
+        """
+        self.category = category
+        self.version = version
+        self.activities = tuple(activities)
+        
+        count = len(self.activities)
+        self.price_ranks = np.fromiter(
+            (PRICE_RANKS[a.price_level] for a in self.activities),
+            dtype=np.int8,
+            count=count
+        )
+        self.last_bill_price = np.fromiter(
+            (np.nan if a.last_bill_price is None else a.last_bill_price for a in self.activities),
+            dtype=np.float64,
+            count=count
+        )
+        self.last_visit_day = np.fromiter(
+            (parse_visit_day(a.last_visit_date) for a in self.activities),
+            dtype=np.float64,
+            count=count
+        )
+        self.latitude = np.fromiter(
+            (np.nan if a.latitude is None else a.latitude for a in self.activities),
+            dtype=np.float64,
+            count=count
+        )
+        self.longitude = np.fromiter(
+            (np.nan if a.longitude is None else a.longitude for a in self.activities),
+            dtype=np.float64,
+            count=count
+        )
+        self.geo_index = GeoIndex(self.latitude, self.longitude)
+        
+        self.built_at = datetime.now()
+        visit_days = self.last_visit_day[~np.isnan(self.last_visit_day)]
+        self._sorted_visit_days = np.sort(visit_days)
+        self._price_counts = np.bincount(self.price_ranks, minlength=len(PRICE_LEVEL_ORDER))
+        self.stats = self._build_stats()
+        
+        rank_count = len(PRICE_LEVEL_ORDER)
+        self._recency_sampler = WeightedSampler(
+            self.price_ranks,
+            recency_weights(self.last_visit_day, self.built_at.date().toordinal()),
+            rank_count
+        )
+        self._uniform_sampler = WeightedSampler(self.price_ranks, np.ones(count), rank_count)
+        self.size_bytes = self._estimate_size()
+    
+    def __len__(self) -> int:
+        return len(self.activities)
+    
+    def find(self, name: str) -> Optional[Activity]:
+        """
+        Get the first activity with the given name.
+        
+        Args:
+            name (str): Activity name
+        
+        Returns:
+            Optional[Activity]: Matching activity, or None if there is none
+        """
+        name = name.strip()
+        return next((a for a in self.activities if a.name == name), None)
+    
+    def with_updates(self, updates: Dict[str, Dict[str, Any]]) -> "CategorySnapshot":
+        """
+        Build a new snapshot with field updates applied to named activities.
+        
+        The snapshot itself is never modified, so readers holding it keep a
+        consistent view. Names without a matching activity are ignored.
+        
+        Args:
+            updates (Dict[str, Dict[str, Any]]): Field values per activity name
+        
+        Returns:
+            CategorySnapshot: Updated snapshot with the same version
+        """
+        if not updates:
+            return self
+        
+        # Like find(), only the first activity with a given name is updated
+        remaining = dict(updates)
+        activities = []
+        for activity in self.activities:
+            fields = remaining.pop(activity.name, None)
+            activities.append(activity if fields is None else activity.model_copy(update=fields))
+        return CategorySnapshot(self.category, activities, self.version)
+    
+    def diff(self, previous: "CategorySnapshot") -> Tuple[List[str], List[str]]:
+        """
+        Compare with an older snapshot of the same category.
+        
+        Activities are identified by name, the same key used for updates.
+        
+        Args:
+            previous (CategorySnapshot): Snapshot this one replaces
+        
+        Returns:
+            Tuple[List[str], List[str]]: Names of added or modified activities, and of removed ones
+        """
+        old = {a.name: a for a in previous.activities}
+        new = {a.name: a for a in self.activities}
+        changed = [name for name, activity in new.items() if old.get(name) != activity]
+        removed = [name for name in old if name not in new]
+        return changed, removed
+
+    def mask(
+        self,
+        price_level: Optional[PriceLevel] = None,
+        filters: Optional[ActivityFilter] = None
+    ) -> Optional[np.ndarray]:
+        """
+        Build a boolean mask of the activities matching all predicates.
+        
+        Args:
+            price_level (Optional[PriceLevel]): Exact price level filter
+            filters (Optional[ActivityFilter]): Additional range filters
+        
+        Returns:
+            Optional[np.ndarray]: Boolean mask, or None if nothing filters
+        """
+        predicates = []
+        
+        if price_level is not None:
+            predicates.append(self.price_ranks == price_rank(price_level))
+        
+        if filters is not None:
+            if filters.min_price_level is not None:
+                predicates.append(self.price_ranks >= price_rank(filters.min_price_level))
+            if filters.max_price_level is not None:
+                predicates.append(self.price_ranks <= price_rank(filters.max_price_level))
+            # NaN compares False, so activities without a bill never match a bill bound
+            if filters.min_bill_price is not None:
+                predicates.append(self.last_bill_price >= filters.min_bill_price)
+            if filters.max_bill_price is not None:
+                predicates.append(self.last_bill_price <= filters.max_bill_price)
+            if filters.last_visit_before is not None:
+                # Negated so never-visited (NaN) activities are kept
+                predicates.append(~(self.last_visit_day >= filters.last_visit_before.toordinal()))
+            if filters.last_visit_after is not None:
+                predicates.append(self.last_visit_day > filters.last_visit_after.toordinal())
+            if filters.near is not None or filters.radius is not None:
+                predicates.append(self._near_mask(filters))
+        
+        if not predicates:
+            return None
+        
+        mask = predicates[0]
+        for predicate in predicates[1:]:
+            mask &= predicate
+        return mask
+    
+    def select(
+        self,
+        price_level: Optional[PriceLevel] = None,
+        filters: Optional[ActivityFilter] = None
+    ) -> List[Activity]:
+        """
+        Get the activities matching the given filters.
+        
+        Args:
+            price_level (Optional[PriceLevel]): Exact price level filter
+            filters (Optional[ActivityFilter]): Additional range filters
+        
+        Returns:
+            List[Activity]: Matching activities in sheet order, or nearest first when filtering by distance
+        """
+        mask = self.mask(price_level, filters)
+        if mask is None:
+            return list(self.activities)
+        
+        indices = np.flatnonzero(mask)
+        if filters is not None and filters.near is not None:
+            latitude, longitude = self._near_point(filters)
+            distances = self.geo_index.distances(indices, latitude, longitude)
+            indices = indices[np.argsort(distances, kind='stable')]
+        return [self.activities[i] for i in indices]
+    
+    def count(
+        self,
+        price_level: Optional[PriceLevel] = None,
+        filters: Optional[ActivityFilter] = None
+    ) -> int:
+        """
+        Count the activities matching the given filters.
+        
+        Args:
+            price_level (Optional[PriceLevel]): Exact price level filter
+            filters (Optional[ActivityFilter]): Additional range filters
+        
+        Returns:
+            int: Number of matching activities
+        """
+        if not has_filters(filters):
+            # Served from the counts precomputed at build time
+            if price_level is None:
+                return len(self.activities)
+            return int(self._price_counts[price_rank(price_level)])
+        
+        return int(np.count_nonzero(self.mask(price_level, filters)))
+    
+    def sample(
+        self,
+        limit: int,
+        price_level: Optional[PriceLevel] = None,
+        filters: Optional[ActivityFilter] = None,
+        recency_weighted: bool = True,
+        favor_price_levels: Optional[List[PriceLevel]] = None
+    ) -> List[Activity]:
+        """
+        Draw distinct random activities matching the given filters.
+        
+        Price filters are answered from the precomputed cumulative weights in
+        O(limit log n); bill and visit filters fall back to one vectorized
+        pass over the matching rows.
+        
+        Args:
+            limit (int): Number of activities to return
+            price_level (Optional[PriceLevel]): Exact price level filter
+            filters (Optional[ActivityFilter]): Additional range filters
+            recency_weighted (bool): Down-weight recently visited activities
+            favor_price_levels (Optional[List[PriceLevel]]): Price levels to favour
+        
+        Returns:
+            List[Activity]: Randomly drawn activities
+        """
+        sampler = self._recency_sampler if recency_weighted else self._uniform_sampler
+        favored_ranks = {price_rank(level) for level in favor_price_levels or ()}
+        
+        if filters is not None and any(getattr(filters, f) is not None for f in ROW_FILTER_FIELDS):
+            indices = np.flatnonzero(self.mask(price_level, filters))
+            weights = sampler.weights[indices]
+            if favored_ranks:
+                boosted = np.isin(self.price_ranks[indices], list(favored_ranks))
+                weights = np.where(boosted, weights * FAVOR_BOOST, weights)
+            picked = weighted_sample_without_replacement(indices, weights, limit)
+        else:
+            picked = sampler.sample(limit, self._eligible_ranks(price_level, filters), favored_ranks)
+        
+        return [self.activities[i] for i in picked]
+    
+    def _eligible_ranks(
+        self,
+        price_level: Optional[PriceLevel],
+        filters: Optional[ActivityFilter]
+    ) -> Optional[List[int]]:
+        """
+        Get the price ranks allowed by the price filters.
+        
+        Args:
+            price_level (Optional[PriceLevel]): Exact price level filter
+            filters (Optional[ActivityFilter]): Filters with optional price range
+        
+        Returns:
+            Optional[List[int]]: Allowed ranks, or None if every rank is allowed
+        """
+        low, high = 0, len(PRICE_LEVEL_ORDER) - 1
+        restricted = False
+        if price_level is not None:
+            low = high = price_rank(price_level)
+            restricted = True
+        if filters is not None and filters.min_price_level is not None:
+            low = max(low, price_rank(filters.min_price_level))
+            restricted = True
+        if filters is not None and filters.max_price_level is not None:
+            high = min(high, price_rank(filters.max_price_level))
+            restricted = True
+        return list(range(low, high + 1)) if restricted else None
+    
+    def count_not_visited_in(self, days: int, today: Optional[date] = None) -> int:
+        """
+        Count activities not visited within the last N days.
+        
+        Never-visited activities are included in the count.
+        
+        Args:
+            days (int): Size of the window in days
+            today (Optional[date]): Reference date (defaults to today)
+        
+        Returns:
+            int: Number of activities not visited within the window
+        """
+        cutoff = (today or date.today()).toordinal() - days
+        visited_before = np.searchsorted(self._sorted_visit_days, cutoff, side='left')
+        never_visited = len(self.activities) - len(self._sorted_visit_days)
+        return int(visited_before) + never_visited
+    
+    def _near_mask(self, filters: ActivityFilter) -> np.ndarray:
+        """
+        Build the mask of activities within the radius of filters.near.
+        
+        Args:
+            filters (ActivityFilter): Filters with a proximity predicate
+        
+        Returns:
+            np.ndarray: Boolean mask (activities without coordinates never match)
+        """
+        latitude, longitude = self._near_point(filters)
+        mask = np.zeros(len(self.activities), dtype=bool)
+        mask[self.geo_index.within(latitude, longitude, filters.radius or DEFAULT_RADIUS_KM)] = True
+        return mask
+    
+    def _near_point(self, filters: ActivityFilter) -> Tuple[float, float]:
+        """
+        Get the coordinates of a proximity filter.
+        
+        Place names must be geocoded into coordinates before filtering.
+        
+        Args:
+            filters (ActivityFilter): Filters with a proximity predicate
+        
+        Returns:
+            Tuple[float, float]: Latitude and longitude
+        
+        Raises:
+            ValueError: If near is missing or not a coordinate pair
+        """
+        if filters.near is None:
+            raise ValueError("radius requires near")
+        point = parse_point(filters.near)
+        if point is None:
+            raise ValueError(f"near must be 'latitude,longitude': {filters.near}")
+        return point
+    
+    def _estimate_size(self) -> int:
+        """
+        Estimate the memory held by the snapshot, for cache budgets.
+        
+        Returns:
+            int: Approximate size in bytes
+        """
+        text_bytes = 0
+        for activity in self.activities:
+            for value in (
+                activity.name, activity.description, activity.location, activity.address,
+                activity.phone, activity.url, activity.notes, activity.last_visit_date
+            ):
+                if value:
+                    text_bytes += len(value)
+            for order in activity.past_orders or ():
+                text_bytes += len(order)
+        
+        columns = (
+            self.price_ranks, self.last_bill_price, self.last_visit_day, self._sorted_visit_days,
+            self.latitude, self.longitude
+        )
+        column_bytes = sum(column.nbytes for column in columns)
+        column_bytes += self._recency_sampler.nbytes + self._uniform_sampler.nbytes + self.geo_index.nbytes
+        return text_bytes + column_bytes + len(self.activities) * ACTIVITY_OVERHEAD_BYTES
+    
+    def _build_stats(self) -> CategoryStats:
+        """
+        Compute the aggregate statistics of the snapshot.
+        
+        Returns:
+            CategoryStats: Per-category and per-price-level aggregates
+        """
+        has_bill = ~np.isnan(self.last_bill_price)
+        bill_counts = np.bincount(
+            self.price_ranks[has_bill],
+            minlength=len(PRICE_LEVEL_ORDER)
+        )
+        bill_sums = np.bincount(
+            self.price_ranks[has_bill],
+            weights=self.last_bill_price[has_bill],
+            minlength=len(PRICE_LEVEL_ORDER)
+        )
+        
+        by_price_level = {}
+        for rank, level in enumerate(PRICE_LEVEL_ORDER):
+            by_price_level[level.value] = PriceLevelStats(
+                count=int(self._price_counts[rank]),
+                avg_last_bill_price=_average(bill_sums[rank], bill_counts[rank])
+            )
+        
+        today = self.built_at.date()
+        visited_count = len(self._sorted_visit_days)
+        return CategoryStats(
+            category=self.category,
+            total_found=len(self.activities),
+            by_price_level=by_price_level,
+            avg_last_bill_price=_average(bill_sums.sum(), bill_counts.sum()),
+            visited_count=visited_count,
+            never_visited_count=len(self.activities) - visited_count,
+            not_visited_in_days={
+                days: self.count_not_visited_in(days, today) for days in STATS_VISIT_WINDOWS
+            },
+            computed_at=self.built_at
+        )
+
+
+def has_filters(filters: Optional[ActivityFilter]) -> bool:
+    """
+    Check whether any filter predicate is set.
+    
+    Args:
+        filters (Optional[ActivityFilter]): Filters to check
+    
+    Returns:
+        bool: True if at least one predicate is set
+    """
+    if filters is None:
+        return False
+    return any(getattr(filters, field) is not None for field in FILTER_FIELDS)
+
+
+def _average(total: float, count: int) -> Optional[float]:
+    """Average a sum over a count, or None if there is nothing to average."""
+    if not count:
+        return None
+    return round(float(total) / int(count), 2)
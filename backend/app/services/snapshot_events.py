@@ -0,0 +1,161 @@
+"""
+Publish/subscribe of category snapshot changes for Server-Sent Events.
+"""
+import asyncio
+import threading
+from collections import deque
+from typing import Deque, List, Optional, Set, Tuple
+
+from ..models import SnapshotEvent
+
+
+# Events kept for clients that reconnect with Last-Event-ID
+HISTORY_SIZE = 256
+
+# Events buffered per subscriber before it is told to resynchronize
+SUBSCRIBER_QUEUE_SIZE = 64
+
+# Above this many changed activities an event asks for a full category reload
+MAX_CHANGED_NAMES = 100
+
+
+class Subscription:
+    """
+    Event queue of one connected client.
+    
+    Events are delivered on the subscriber's event loop. A client that
+    falls behind by more than SUBSCRIBER_QUEUE_SIZE events is flagged as
+    overflowed instead of blocking publishers, and should refetch everything.
+    """
+    
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        """
+        Initialize the subscription.
+        
+        Args:
+            loop (asyncio.AbstractEventLoop): Loop the client is served on
+        """
+        self.loop = loop
+        self.queue: "asyncio.Queue[SnapshotEvent]" = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.overflowed = False
+    
+    def deliver(self, event: SnapshotEvent) -> None:
+        """Queue an event; must run on the subscriber's loop."""
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class SnapshotEventBus:
+    """
+    Fan-out of snapshot change events to connected clients.
+    
+    publish() is called from whichever thread stored the snapshot and
+    hands events to each subscriber's loop thread-safely, so storing a
+    snapshot never waits on slow clients.
+    """
+    
+    def __init__(self, history_size: int = HISTORY_SIZE):
+        """
+        Initialize the event bus.
+        
+        Args:
+            history_size (int): Number of recent events kept for replay
+        """
+        self._lock = threading.Lock()
+        self._subscriptions: Set[Subscription] = set()
+        self._history: Deque[SnapshotEvent] = deque(maxlen=history_size)
+        self._last_id = 0
+    
+    @property
+    def last_id(self) -> int:
+        """Sequence number of the latest event (0 if none yet)."""
+        return self._last_id
+    
+    @property
+    def subscriber_count(self) -> int:
+        """Number of connected clients."""
+        return len(self._subscriptions)
+    
+    def publish(
+        self,
+        category: str,
+        version: Optional[str],
+        changed: Optional[List[str]],
+        removed: Optional[List[str]] = None
+    ) -> SnapshotEvent:
+        """
+        Notify subscribers that a category snapshot was replaced.
+        
+        Args:
+            category (str): Category name
+            version (Optional[str]): Change-probe token of the new snapshot
+            changed (Optional[List[str]]): Added or modified activity names (None if unknown)
+            removed (Optional[List[str]]): Removed activity names
+        
+        Returns:
+            SnapshotEvent: The published event
+        """
+        if changed is not None and len(changed) > MAX_CHANGED_NAMES:
+            changed = None
+        
+        with self._lock:
+            self._last_id += 1
+            event = SnapshotEvent(
+                id=self._last_id,
+                category=category,
+                version=version,
+                changed=changed,
+                removed=removed or []
+            )
+            self._history.append(event)
+            subscriptions = list(self._subscriptions)
+        
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+            except RuntimeError:
+                # The client's loop has shut down
+                self.unsubscribe(subscription)
+        return event
+    
+    def subscribe(
+        self,
+        last_event_id: Optional[int] = None
+    ) -> Tuple[Subscription, Optional[List[SnapshotEvent]]]:
+        """
+        Register a client on the running event loop.
+        
+        Args:
+            last_event_id (Optional[int]): Last event the client saw before reconnecting
+        
+        Returns:
+            Tuple[Subscription, Optional[List[SnapshotEvent]]]: The subscription and
+            the missed events to replay (None if the client must resynchronize)
+        """
+        subscription = Subscription(asyncio.get_running_loop())
+        with self._lock:
+            self._subscriptions.add(subscription)
+            if last_event_id is None or last_event_id == self._last_id:
+                return subscription, []
+            
+            missed = [event for event in self._history if event.id > last_event_id]
+            # Ids from before a restart, or older than the history, cannot be replayed
+            if last_event_id > self._last_id or not missed or missed[0].id != last_event_id + 1:
+                return subscription, None
+            return subscription, missed
+    
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """
+        Remove a client.
+        
+        Args:
+            subscription (Subscription): Subscription returned by subscribe()
+        """
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+
+# Global snapshot event bus
+snapshot_events = SnapshotEventBus()
@@ -0,0 +1,236 @@
+"""
+Registry of tenants, each served from its own Google Sheets spreadsheet.
+"""
+import hmac
+import json
+import os
+import threading
+from typing import Dict, List, Optional
+
+from ..models import TenantConfig
+from .admission import QuotaBudget
+from .cache_service import cache_service
+from .sheets_service import (
+    DEFAULT_TENANT,
+    SHEETS_REQUESTS_PER_MINUTE,
+    GoogleSheetsService,
+    sheets_service
+)
+from .snapshot_events import SnapshotEventBus
+from .visit_log import VisitLog, data_path
+
+
+def tenant_journal_path(tenant_id: str) -> Optional[str]:
+    """
+    Get the visit journal file of a tenant.
+    
+    Derived from VISIT_JOURNAL_FILE, e.g. "visit_journal.jsonl" becomes
+    "visit_journal.<tenant_id>.jsonl", in DATA_DIR unless it is absolute.
+    
+    Args:
+        tenant_id (str): Tenant identifier
+    
+    Returns:
+        Optional[str]: Journal path, or None if journaling is disabled
+    """
+    base_path = os.getenv('VISIT_JOURNAL_FILE', 'visit_journal.jsonl')
+    if not base_path:
+        return None
+    root, extension = os.path.splitext(base_path)
+    return data_path(f"{root}.{tenant_id}{extension}")
+
+
+class TenantRegistry:
+    """
+    Registered tenants and their Sheets services.
+    
+    A tenant's service, with its visit journal and event bus, is created on
+    the tenant's first request, so idle tenants cost only their
+    configuration. Each tenant gets its own cache namespace (and optional
+    budget) and Sheets API quota, so one busy tenant cannot evict another's
+    snapshots or use up the shared service account's rate limit.
+    """
+    
+    def __init__(self, default_service: GoogleSheetsService):
+        """
+        Initialize the registry.
+        
+        Args:
+            default_service (GoogleSheetsService): Service of the default tenant
+        """
+        self._lock = threading.Lock()
+        self._configs: Dict[str, TenantConfig] = {}
+        self._services: Dict[str, GoogleSheetsService] = {DEFAULT_TENANT: default_service}
+    
+    def register(self, config: TenantConfig) -> None:
+        """
+        Add a tenant.
+        
+        Args:
+            config (TenantConfig): Tenant configuration
+        
+        Raises:
+            ValueError: If the tenant is already registered
+        """
+        self.register_all([config])
+    
+    def register_all(self, configs: List[TenantConfig]) -> None:
+        """
+        Add several tenants, all or none.
+        
+        Tenants with writes left in their journal by a previous run are
+        started right away so the writes get flushed.
+        
+        Args:
+            configs (List[TenantConfig]): Tenant configurations
+        
+        Raises:
+            ValueError: If a tenant is already registered or listed twice
+        """
+        with self._lock:
+            seen = set()
+            for config in configs:
+                if config.tenant_id in seen or self.is_registered(config.tenant_id):
+                    raise ValueError(f"Tenant '{config.tenant_id}' is already registered")
+                seen.add(config.tenant_id)
+            self._configs.update((config.tenant_id, config) for config in configs)
+        
+        for config in configs:
+            if config.cache_bytes is not None:
+                cache_service.set_budget(config.tenant_id, config.cache_bytes)
+            
+            journal_path = tenant_journal_path(config.tenant_id)
+            if journal_path and os.path.exists(journal_path) and os.path.getsize(journal_path):
+                self.get(config.tenant_id)
+    
+    def load_file(self, path: str) -> int:
+        """
+        Register the tenants listed in a JSON file.
+        
+        The whole file is validated first, so an invalid or duplicate entry
+        registers none of the tenants rather than only those before it.
+        
+        Args:
+            path (str): File holding a list of tenant configurations
+        
+        Returns:
+            int: Number of tenants registered
+        
+        Raises:
+            ValueError: If the file is not a list of valid, new tenants
+        """
+        with open(path, encoding='utf-8') as tenants_file:
+            entries = json.load(tenants_file)
+        if not isinstance(entries, list):
+            raise ValueError("Tenants file must hold a list of tenants")
+        
+        configs = []
+        for index, entry in enumerate(entries):
+            try:
+                configs.append(TenantConfig.model_validate(entry))
+            except ValueError as e:
+                raise ValueError(f"Invalid tenant at index {index}: {e}") from e
+        
+        self.register_all(configs)
+        return len(configs)
+    
+    def is_registered(self, tenant_id: str) -> bool:
+        """Check whether a tenant exists (the default tenant always does)."""
+        return tenant_id == DEFAULT_TENANT or tenant_id in self._configs
+    
+    def check_api_key(self, tenant_id: str, api_key: Optional[str]) -> bool:
+        """
+        Check the API key presented for a tenant.
+        
+        Registered tenants need the key from their configuration. The
+        default tenant needs DEFAULT_TENANT_API_KEY if it is set, and is
+        open otherwise, as in a single-household deployment.
+        
+        Args:
+            tenant_id (str): Tenant identifier
+            api_key (Optional[str]): Key sent by the client
+        
+        Returns:
+            bool: True if the key grants access to the tenant
+        """
+        if tenant_id == DEFAULT_TENANT:
+            expected = os.getenv('DEFAULT_TENANT_API_KEY')
+            if not expected:
+                return True
+        else:
+            config = self._configs.get(tenant_id)
+            if config is None:
+                return False
+            expected = config.api_key
+        return hmac.compare_digest((api_key or '').encode(), expected.encode())
+    
+    def started(self, tenant_id: str) -> Optional[GoogleSheetsService]:
+        """
+        Get the service of a tenant if it has been created already.
+        
+        Args:
+            tenant_id (str): Tenant identifier
+        
+        Returns:
+            Optional[GoogleSheetsService]: The tenant's service, or None if not started or unknown
+        """
+        return self._services.get(tenant_id)
+    
+    def get(self, tenant_id: str) -> Optional[GoogleSheetsService]:
+        """
+        Get the service of a tenant, creating it on first use.
+        
+        Args:
+            tenant_id (str): Tenant identifier
+        
+        Returns:
+            Optional[GoogleSheetsService]: The tenant's service, or None if unknown
+        """
+        service = self._services.get(tenant_id)
+        if service is not None:
+            return service
+        
+        with self._lock:
+            service = self._services.get(tenant_id)
+            if service is None:
+                config = self._configs.get(tenant_id)
+                if config is None:
+                    return None
+                service = self._create_service(config)
+                self._services = {**self._services, tenant_id: service}
+        return service
+    
+    def tenant_ids(self) -> List[str]:
+        """Get the identifiers of all registered tenants."""
+        return [DEFAULT_TENANT, *self._configs]
+    
+    def active_services(self) -> List[GoogleSheetsService]:
+        """Get the services created so far, for background maintenance."""
+        return list(self._services.values())
+    
+    def _create_service(self, config: TenantConfig) -> GoogleSheetsService:
+        """
+        Build the Sheets service of a tenant.
+        
+        Args:
+            config (TenantConfig): Tenant configuration
+        
+        Returns:
+            GoogleSheetsService: Service with its own quota, journal and event bus, sharing
+                the Sheets client pool of its key file with other tenants
+        """
+        return GoogleSheetsService(
+            tenant_id=config.tenant_id,
+            spreadsheet_id=config.spreadsheet_id,
+            credentials_file=config.credentials_file,
+            quota=QuotaBudget(
+                config.tenant_id,
+                config.requests_per_minute or SHEETS_REQUESTS_PER_MINUTE
+            ),
+            journal=VisitLog(tenant_journal_path(config.tenant_id)),
+            events=SnapshotEventBus()
+        )
+
+
+# Global tenant registry, loaded from TENANTS_FILE in main.py
+tenant_registry = TenantRegistry(sheets_service)
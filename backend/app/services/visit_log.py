@@ -0,0 +1,233 @@
+"""
+Write-behind log of activity updates waiting to be written to Google Sheets.
+"""
+import json
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+# Pending updates are keyed by (category, activity name)
+UpdateKey = Tuple[str, str]
+
+# Directory for local state such as visit journals (default: backend/data)
+DATA_DIR = os.path.abspath(
+    os.getenv('DATA_DIR') or os.path.join(os.path.dirname(__file__), '..', '..', 'data')
+)
+
+
+def data_path(path: str) -> str:
+    """
+    Resolve a local state file against DATA_DIR.
+    
+    Relative paths would otherwise depend on the working directory the
+    server happens to be started from, and queued writes journaled there
+    would be missed after a restart from elsewhere.
+    
+    Args:
+        path (str): File name, relative to DATA_DIR, or an absolute path
+    
+    Returns:
+        str: Absolute path of the file
+    """
+    return os.path.join(DATA_DIR, path)
+
+
+class VisitLog:
+    """
+    Durable queue of activity field updates.
+    
+    Updates are appended to a local JSON-lines journal (and fsynced) before
+    they are acknowledged, then coalesced in memory per activity so that
+    several visits recorded between two flushes become one cell write.
+    flush() hands the coalesced updates to a writer and compacts the journal
+    once they are stored, so queued writes survive restarts and failed
+    flushes are simply retried on the next one.
+    
+    Written updates are kept, tagged with the flush generation, until a
+    snapshot read after that flush is stored: rows read before the write
+    landed do not contain them yet.
+    """
+    
+    def __init__(self, journal_path: Optional[str] = None):
+        """
+        Initialize the log and replay any journaled updates.
+        
+        Args:
+            journal_path (Optional[str]): Journal file, or None to keep updates in memory only
+        """
+        self.journal_path = journal_path
+        self._pending: Dict[UpdateKey, Dict[str, Any]] = {}
+        # Written updates per activity, with the generation of their flush
+        self._written: Dict[UpdateKey, List[Tuple[int, Dict[str, Any]]]] = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+        # Serializes flushes so two writers never send the same updates
+        self._flush_lock = threading.Lock()
+        self._replay()
+    
+    @property
+    def pending_count(self) -> int:
+        """Number of activities with updates not yet written."""
+        return len(self._pending)
+    
+    @property
+    def generation(self) -> int:
+        """Number of completed flushes; read it before reading rows from the sheet."""
+        return self._generation
+    
+    def record(self, category: str, name: str, fields: Dict[str, Any]) -> None:
+        """
+        Durably queue field updates for an activity.
+        
+        Args:
+            category (str): Category name
+            name (str): Activity name
+            fields (Dict[str, Any]): New field values (JSON-serializable)
+        """
+        line = json.dumps({'category': category, 'name': name, 'fields': fields})
+        with self._lock:
+            self._append(line)
+            key = (category, name)
+            # Copy-on-write: readers iterate the mapping without the lock, and
+            # flush() tells changed entries apart by identity
+            self._pending = {**self._pending, key: {**self._pending.get(key, {}), **fields}}
+    
+    def pending_for(self, category: str, since: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Get the queued updates of one category.
+        
+        Args:
+            category (str): Category name
+            since (Optional[int]): Generation at which the rows were read; updates
+                written by later flushes are included too
+        
+        Returns:
+            Dict[str, Dict[str, Any]]: Field values per activity name
+        """
+        if since is None:
+            pending = self._pending
+            return {name: fields for (c, name), fields in pending.items() if c == category}
+        
+        with self._lock:
+            pending = self._pending
+            written = self._written
+        updates: Dict[str, Dict[str, Any]] = {}
+        for (c, name), flushes in written.items():
+            if c == category:
+                for generation, fields in flushes:
+                    if generation > since:
+                        updates[name] = {**updates.get(name, {}), **fields}
+        for (c, name), fields in pending.items():
+            if c == category:
+                updates[name] = {**updates.get(name, {}), **fields}
+        return updates
+    
+    def settle(self, category: str, generation: int) -> None:
+        """
+        Forget written updates of a category that newly stored rows contain.
+        
+        Args:
+            category (str): Category name
+            generation (int): Generation at which the stored rows were read
+        """
+        with self._lock:
+            written = {}
+            for key, flushes in self._written.items():
+                if key[0] == category:
+                    flushes = [(g, fields) for g, fields in flushes if g > generation]
+                if flushes:
+                    written[key] = flushes
+            self._written = written
+    
+    def flush(self, writer: Callable[[Dict[UpdateKey, Dict[str, Any]]], None]) -> int:
+        """
+        Write all queued updates and drop them from the queue.
+        
+        Updates recorded while the writer runs stay queued for the next
+        flush. If the writer raises, nothing is dropped.
+        
+        Args:
+            writer (Callable): Function storing the coalesced updates
+        
+        Returns:
+            int: Number of activities written
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch = dict(self._pending)
+            if not batch:
+                return 0
+            
+            writer(batch)
+            
+            with self._lock:
+                self._generation += 1
+                pending = dict(self._pending)
+                written = dict(self._written)
+                for key, fields in batch.items():
+                    if pending.get(key) is fields:
+                        del pending[key]
+                    written[key] = written.get(key, []) + [(self._generation, fields)]
+                self._pending = pending
+                self._written = written
+                self._compact()
+            return len(batch)
+    
+    def _replay(self) -> None:
+        """Rebuild the queue from the journal left by a previous run."""
+        if not self.journal_path or not os.path.exists(self.journal_path):
+            return
+        
+        with open(self.journal_path, encoding='utf-8') as journal:
+            for line in journal:
+                try:
+                    entry = json.loads(line)
+                    key = (entry['category'], entry['name'])
+                    self._pending[key] = {**self._pending.get(key, {}), **entry['fields']}
+                except (ValueError, KeyError, TypeError):
+                    # A torn last line from a crash mid-append
+                    print(f"Warning: Skipping unreadable visit journal line: {line!r}")
+    
+    def _append(self, line: str) -> None:
+        """
+        Append one entry to the journal and force it to disk.
+        
+        Must be called with the lock held.
+        
+        Args:
+            line (str): Serialized journal entry
+        """
+        if not self.journal_path:
+            return
+        
+        # Created on first use, so importing the module never touches the disk
+        os.makedirs(os.path.dirname(self.journal_path), exist_ok=True)
+        with open(self.journal_path, 'a', encoding='utf-8') as journal:
+            journal.write(line + '\n')
+            journal.flush()
+            os.fsync(journal.fileno())
+    
+    def _compact(self) -> None:
+        """
+        Rewrite the journal to hold only the still-pending updates.
+        
+        Must be called with the lock held. The new journal replaces the old
+        one atomically, so a crash leaves either of them intact.
+        """
+        if not self.journal_path:
+            return
+        
+        os.makedirs(os.path.dirname(self.journal_path), exist_ok=True)
+        temp_path = f"{self.journal_path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as journal:
+            for (category, name), fields in self._pending.items():
+                journal.write(json.dumps({'category': category, 'name': name, 'fields': fields}) + '\n')
+            journal.flush()
+            os.fsync(journal.fileno())
+        os.replace(temp_path, self.journal_path)
+
+
+# Global visit log instance, journaling to VISIT_JOURNAL_FILE (disabled if empty)
+_journal_file = os.getenv('VISIT_JOURNAL_FILE', 'visit_journal.jsonl')
+visit_log = VisitLog(data_path(_journal_file) if _journal_file else None)
@@ -0,0 +1,349 @@
+"""
+Micro-benchmarks with regression gates for the cache and parser hot paths.
+
+Run from the repository root:
+    
+    python -m benchmarks.bench_hot_paths            # report ops/sec and allocations
+    python -m benchmarks.bench_hot_paths --check    # also fail on regressions
+    python -m benchmarks.bench_hot_paths --save     # record new baselines
+
+Results are compared with benchmarks/baselines.json. A benchmark regresses
+when its throughput, scaled by the calibration workload, drops by more
+than the threshold, or when it allocates that much more per call.
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+from datetime import date, timedelta
+from types import SimpleNamespace
+from typing import Any, Callable, Iterator, List, Sequence, Tuple
+
+from backend.app.models import ActivityFilter, PriceLevel
+from backend.app.services.cache_service import CacheService, cache_service
+from backend.app.services.sheets_service import GoogleSheetsService
+from backend.app.services.snapshot import CategorySnapshot
+from benchmarks.harness import (
+    BenchmarkResult,
+    calibrate,
+    expected_ops_per_sec,
+    find_regressions,
+    load_baselines,
+    measure,
+    save_baselines
+)
+
+
+# Rows per synthetic sheet
+SIZES = (1_000, 10_000, 50_000)
+
+# Allowed slowdown or allocation growth before --check fails; timings on
+# shared machines easily vary by 20%, while the regressions worth catching
+# are several-fold
+DEFAULT_THRESHOLD = 0.5
+
+BASELINES_FILE = os.path.join(os.path.dirname(__file__), 'baselines.json')
+
+# Simulated Sheets API round trip and transfer time per row, in seconds
+SIMULATED_ROUND_TRIP = 0.02
+SIMULATED_SECONDS_PER_ROW = 2e-6
+
+HEADER = [
+    'Name', 'Price', 'Description', 'Location', 'Address', 'Phone', 'Past Orders',
+    'Last Bill', 'URL', 'Notes', 'Last Visit Date', 'Latitude', 'Longitude'
+]
+
+# A benchmark case: name, function, operations per call
+Case = Tuple[str, Callable[[], Any], int]
+
+
+def build_rows(size: int) -> List[List[str]]:
+    """
+    Build a synthetic worksheet as returned by the Sheets API.
+    
+    Rows vary like real sheets do: trailing empty cells are omitted and
+    optional columns are often blank.
+    
+    Args:
+        size (int): Number of activity rows
+    
+    Returns:
+        List[List[str]]: Header row followed by activity rows
+    """
+    rng = random.Random(size)
+    prices = ['Free', '$', '$$', '$$$', '$$$$', 'medium', 'low']
+    today = date.today()
+    rows = [HEADER]
+    for i in range(size):
+        row = [
+            f"Activity {i}",
+            rng.choice(prices),
+            f"Description of activity {i}" if rng.random() < 0.8 else '',
+            rng.choice(['Downtown', 'West Side', 'Harbor', '']),
+            f"{rng.randint(1, 9999)} Main St" if rng.random() < 0.7 else '',
+            '555-0100' if rng.random() < 0.3 else '',
+            'Soup, Salad, Bread' if rng.random() < 0.4 else '',
+            f"${rng.uniform(5, 200):,.2f}" if rng.random() < 0.7 else '',
+            '',
+            'Good for groups' if rng.random() < 0.2 else '',
+            (today - timedelta(days=rng.randint(0, 720))).isoformat() if rng.random() < 0.6 else '',
+        ]
+        if rng.random() < 0.5:
+            row += [f"{rng.uniform(47.4, 47.8):.5f}", f"{rng.uniform(-122.5, -122.1):.5f}"]
+        while row and not row[-1]:
+            row.pop()
+        rows.append(row)
+    return rows
+
+
+class SimulatedSheetsApi:
+    """
+    Sheets API stand-in serving one worksheet with network-like costs.
+    
+    Each read sleeps for a round trip plus a per-row transfer time and
+    decodes its rows from JSON like the real client, so the benchmarks see
+    both the latency of reads and the memory of buffered responses.
+    """
+    
+    def __init__(self, rows: List[List[str]]):
+        """
+        Initialize the API.
+        
+        Args:
+            rows (List[List[str]]): Worksheet served for every title
+        """
+        self.rows = rows
+        self._payloads: dict = {}
+    
+    def client(self, service_name: str = 'sheets', version: str = 'v4') -> "SimulatedSheetsApi":
+        return self
+    
+    def spreadsheets(self) -> "SimulatedSheetsApi":
+        return self
+    
+    def values(self) -> "SimulatedSheetsApi":
+        return self
+    
+    def get(self, spreadsheetId: str, range: str, **kwargs: Any) -> SimpleNamespace:
+        return SimpleNamespace(execute=lambda: self._read(range))
+    
+    def _read(self, a1_range: str) -> dict:
+        """Serve an A1 range such as Bench!A:M, Bench!A1:M5000, Bench!A5001:M or Bench!A:A."""
+        if a1_range not in self._payloads:
+            match = re.fullmatch(r'[^!]+!A(\d*):([A-Z]+)(\d*)', a1_range)
+            start = int(match.group(1) or 1) - 1
+            end = int(match.group(3)) if match.group(3) else None
+            rows = self.rows[start:end]
+            if match.group(2) == 'A':
+                rows = [row[:1] for row in rows]
+            self._payloads[a1_range] = (len(rows), json.dumps({'values': rows}))
+        row_count, payload = self._payloads[a1_range]
+        time.sleep(SIMULATED_ROUND_TRIP + row_count * SIMULATED_SECONDS_PER_ROW)
+        return json.loads(payload)
+
+
+def cache_cases(size: int) -> Iterator[Case]:
+    """
+    Benchmark CacheService reads and writes on a cache holding size keys.
+    
+    Args:
+        size (int): Number of cached keys
+    
+    Yields:
+        Case: Benchmark cases
+    """
+    cache = CacheService(default_ttl=3600)
+    for i in range(size):
+        cache.set(f"bench:snapshot_{i}", i)
+    keys = [f"bench:snapshot_{i}" for i in range(0, size, max(size // 100, 1))]
+    
+    def get_hits() -> None:
+        for key in keys:
+            cache.get(key)
+    
+    def get_misses() -> None:
+        for key in keys:
+            cache.get(key + "_missing")
+    
+    def peeks() -> None:
+        for key in keys:
+            cache.peek(key, count_access=False)
+    
+    yield f"cache.get_hit[{size}]", get_hits, len(keys)
+    yield f"cache.get_miss[{size}]", get_misses, len(keys)
+    yield f"cache.peek[{size}]", peeks, len(keys)
+    yield f"cache.set[{size}]", lambda: cache.set("bench:snapshot_0", 0), 1
+    
+    # The same keys spread over 100 tenants, with budgets to enforce
+    tenants = CacheService(default_ttl=3600, max_bytes=size * 200)
+    for i in range(size):
+        tenants.set(f"tenant_{i % 100}:snapshot_{i}", i, size=100)
+    yield f"cache.set_tenant[{size}]", lambda: tenants.set("tenant_0:snapshot_0", 0, size=100), 1
+
+
+def parser_cases(size: int, service: GoogleSheetsService, rows: List[List[str]]) -> Iterator[Case]:
+    """
+    Benchmark parsing a synthetic worksheet.
+    
+    Args:
+        size (int): Number of activity rows
+        service (GoogleSheetsService): Service providing the parser
+        rows (List[List[str]]): Synthetic worksheet
+    
+    Yields:
+        Case: Benchmark cases
+    """
+    data_rows = rows[1:]
+    
+    def parse_rows() -> None:
+        for row in data_rows:
+            service._parse_activity_row(row, "Bench")
+    
+    def check_headers() -> None:
+        for row in data_rows:
+            service._is_header_row(row)
+    
+    yield f"parser.parse_activity_row[{size}]", parse_rows, len(data_rows)
+    yield f"parser.is_header_row[{size}]", check_headers, len(data_rows)
+
+
+def loader_cases(size: int, service: GoogleSheetsService, rows: List[List[str]]) -> Iterator[Case]:
+    """
+    Benchmark reading a worksheet over a simulated Sheets API.
+    
+    Compares one whole-sheet read with concurrent row blocks, which
+    overlap round trips and never buffer the whole sheet at once.
+    
+    Args:
+        size (int): Number of activity rows
+        service (GoogleSheetsService): Service reading the worksheet
+        rows (List[List[str]]): Synthetic worksheet
+    
+    Yields:
+        Case: Benchmark cases
+    """
+    service._clients = SimulatedSheetsApi(rows)
+    cache_service.set(service._cache_key("sheet_row_counts"), {"Bench": len(rows)}, ttl=3600)
+    
+    def read_whole_sheet() -> None:
+        service._parse_rows(service._fetch_row_block("Bench", None, None), "Bench")
+    
+    yield f"loader.read_whole_sheet[{size}]", read_whole_sheet, size
+    yield f"loader.read_row_blocks[{size}]", lambda: service._fetch_category_activities("Bench"), size
+
+
+def suggestion_cases(size: int, service: GoogleSheetsService, rows: List[List[str]]) -> Iterator[Case]:
+    """
+    Benchmark suggestions served from a cached snapshot.
+    
+    Args:
+        size (int): Number of activity rows
+        service (GoogleSheetsService): Service serving the suggestions
+        rows (List[List[str]]): Synthetic worksheet
+    
+    Yields:
+        Case: Benchmark cases
+    """
+    snapshot = CategorySnapshot("Bench", service._parse_rows(rows, "Bench"))
+    cache_service.set(service._snapshot_key("Bench"), snapshot, ttl=3600, size=snapshot.size_bytes)
+    bill_filter = ActivityFilter(max_bill_price=50)
+    near_filter = ActivityFilter(near="47.6,-122.3", radius=2)
+    
+    yield f"suggest.random[{size}]", lambda: service.get_random_activities("Bench"), 1
+    yield f"suggest.random_price[{size}]", lambda: service.get_random_activities("Bench", PriceLevel.MEDIUM), 1
+    yield f"suggest.random_bill_filter[{size}]", lambda: service.get_random_activities("Bench", filters=bill_filter), 1
+    yield f"suggest.select_near[{size}]", lambda: snapshot.select(filters=near_filter), 1
+
+
+def run(
+    sizes: Sequence[int] = SIZES,
+    name_filter: str = "",
+    min_time: float = 0.1
+) -> List[BenchmarkResult]:
+    """
+    Run the benchmarks.
+    
+    Args:
+        sizes (Sequence[int]): Synthetic sheet sizes
+        name_filter (str): Only run benchmarks whose name contains this text
+        min_time (float): Minimum duration of each timed repeat, in seconds
+    
+    Returns:
+        List[BenchmarkResult]: Result per benchmark
+    """
+    service = GoogleSheetsService(tenant_id="bench")
+    results = []
+    try:
+        for size in sizes:
+            rows = build_rows(size)
+            cases = [
+                *cache_cases(size),
+                *parser_cases(size, service, rows),
+                *loader_cases(size, service, rows),
+                *suggestion_cases(size, service, rows)
+            ]
+            for name, func, ops_per_call in cases:
+                if name_filter in name:
+                    results.append(measure(name, func, ops_per_call, min_time=min_time))
+    finally:
+        cache_service.clear("bench")
+    return results
+
+
+def main(argv: Sequence[str] = ()) -> int:
+    """
+    Run the benchmarks from the command line.
+    
+    Args:
+        argv (Sequence[str]): Command-line arguments
+    
+    Returns:
+        int: Exit status (1 if --check found regressions)
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(SIZES), help="Synthetic sheet sizes")
+    parser.add_argument('--filter', default="", help="Only run benchmarks whose name contains this text")
+    parser.add_argument('--check', action='store_true', help="Exit with status 1 on regressions")
+    parser.add_argument('--save', action='store_true', help="Store the results as the new baselines")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help="Allowed regression, e.g. 0.5")
+    parser.add_argument('--baselines', default=BASELINES_FILE, help="Baselines JSON file")
+    args = parser.parse_args(argv)
+    
+    # Calibrating on both sides of the run evens out CPU frequency changes
+    calibration = calibrate()
+    results = run(args.sizes, args.filter)
+    calibration = max(calibration, calibrate())
+    baselines = load_baselines(args.baselines)
+    
+    print(f"{'benchmark':<40} {'ops/sec':>14} {'alloc KiB':>10} {'baseline':>14} {'change':>8}")
+    for result in results:
+        expected = expected_ops_per_sec(baselines, result.name, calibration) if baselines else None
+        baseline_text = f"{expected:>14,.0f}" if expected else f"{'-':>14}"
+        change_text = f"{result.ops_per_sec / expected - 1:>+8.0%}" if expected else f"{'-':>8}"
+        print(f"{result.name:<40} {result.ops_per_sec:>14,.0f} {result.peak_bytes / 1024:>10.1f} "
+              f"{baseline_text} {change_text}")
+    
+    if args.save:
+        save_baselines(args.baselines, calibration, results)
+        print(f"\nSaved {len(results)} baselines to {args.baselines}")
+        return 0
+    
+    if args.check:
+        if baselines is None:
+            print(f"\nNo baselines in {args.baselines}; run with --save first")
+            return 1
+        regressions = find_regressions(results, baselines, calibration, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regressions beyond {args.threshold:.0%}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print(f"\nNo regressions beyond {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
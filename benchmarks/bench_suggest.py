@@ -0,0 +1,80 @@
+"""
+Benchmark for per-request suggestion cost as category sheets grow.
+
+Run from the repository root:
+    
+    python -m benchmarks.bench_suggest
+
+Snapshot build (refresh) cost grows with the sheet, but the per-request
+cost of weighted sampling should stay roughly flat.
+"""
+import random
+import time
+from datetime import date, timedelta
+
+from backend.app.models import Activity, ActivityFilter, PriceLevel
+from backend.app.services.snapshot import CategorySnapshot
+
+
+SIZES = (1_000, 10_000, 100_000)
+REQUESTS = 2_000
+
+
+def build_activities(size: int):
+    """Build a synthetic category with mixed prices and visit dates."""
+    rng = random.Random(size)
+    levels = list(PriceLevel)
+    today = date.today()
+    activities = []
+    for i in range(size):
+        visited = rng.random() < 0.6
+        activities.append(Activity(
+            name=f"Activity {i}",
+            price_level=rng.choice(levels),
+            category="Bench",
+            last_bill_price=round(rng.uniform(5, 200), 2) if rng.random() < 0.7 else None,
+            last_visit_date=(today - timedelta(days=rng.randint(0, 720))).isoformat() if visited else None
+        ))
+    return activities
+
+
+def time_per_call(func, calls: int = REQUESTS) -> float:
+    """Return the mean wall-clock time per call in microseconds."""
+    start = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main():
+    """Print per-request timings for each sheet size."""
+    print(f"{'rows':>8} {'build ms':>10} {'weighted us':>12} {'price us':>10} "
+          f"{'favor us':>10} {'bill filter us':>15} {'list+sample us':>15}")
+    for size in SIZES:
+        activities = build_activities(size)
+        
+        start = time.perf_counter()
+        snapshot = CategorySnapshot("Bench", activities)
+        build_ms = (time.perf_counter() - start) * 1e3
+        
+        weighted = time_per_call(lambda: snapshot.sample(5))
+        by_price = time_per_call(lambda: snapshot.sample(5, PriceLevel.MEDIUM))
+        favored = time_per_call(
+            lambda: snapshot.sample(5, favor_price_levels=[PriceLevel.LOW, PriceLevel.MEDIUM])
+        )
+        bill_filter = time_per_call(
+            lambda: snapshot.sample(5, filters=ActivityFilter(max_bill_price=50)),
+            calls=200
+        )
+        # Previous approach: materialize the filtered list, then sample uniformly
+        baseline = time_per_call(
+            lambda: random.sample(snapshot.select(PriceLevel.MEDIUM), 5),
+            calls=200
+        )
+        
+        print(f"{size:>8} {build_ms:>10.1f} {weighted:>12.1f} {by_price:>10.1f} "
+              f"{favored:>10.1f} {bill_filter:>15.1f} {baseline:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
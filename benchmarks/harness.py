@@ -0,0 +1,202 @@
+"""
+Timing, allocation tracking and baseline comparison for micro-benchmarks.
+
+Throughput is reported relative to a fixed calibration workload measured
+in the same run, so baselines recorded on one machine remain meaningful
+on a faster or slower one.
+"""
+import gc
+import json
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+
+# Each repeat runs the benchmark for at least this long, in seconds
+MIN_REPEAT_TIME = 0.1
+
+# Repeats per benchmark; the fastest is kept, as slower ones measure noise
+REPEATS = 5
+
+# Peak allocations below this many bytes are not gated, as they are mostly noise
+ALLOCATION_SLACK_BYTES = 1024
+
+
+class BenchmarkResult(NamedTuple):
+    """Measurements of one benchmark."""
+    name: str
+    ops_per_sec: float
+    peak_bytes: int
+
+
+def measure(
+    name: str,
+    func: Callable[[], Any],
+    ops_per_call: int = 1,
+    min_time: float = MIN_REPEAT_TIME,
+    repeats: int = REPEATS
+) -> BenchmarkResult:
+    """
+    Measure the throughput and peak allocations of a function.
+    
+    Args:
+        name (str): Benchmark name
+        func (Callable[[], Any]): Function to benchmark
+        ops_per_call (int): Operations performed by one call (e.g. rows parsed)
+        min_time (float): Minimum duration of each repeat, in seconds
+        repeats (int): Number of timed repeats
+    
+    Returns:
+        BenchmarkResult: Best throughput and peak bytes allocated by one call
+    """
+    # Warm up, then find a batch size that runs for at least min_time
+    func()
+    calls = 1
+    while True:
+        elapsed = _time_calls(func, calls)
+        if elapsed >= min_time:
+            break
+        calls *= 2 if elapsed == 0 else max(2, min(10, int(min_time / elapsed) + 1))
+    
+    best = min([elapsed] + [_time_calls(func, calls) for _ in range(repeats - 1)])
+    
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        baseline_bytes, _ = tracemalloc.get_traced_memory()
+        func()
+        _, peak_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    
+    return BenchmarkResult(name, calls * ops_per_call / best, max(peak_bytes - baseline_bytes, 0))
+
+
+def calibrate(min_time: float = MIN_REPEAT_TIME) -> float:
+    """
+    Measure the throughput of a fixed reference workload.
+    
+    Args:
+        min_time (float): Minimum duration of each repeat, in seconds
+    
+    Returns:
+        float: Reference operations per second on this machine
+    """
+    def reference() -> None:
+        values = [(i * 7919) % 1009 for i in range(2000)]
+        index = {value: position for position, value in enumerate(values)}
+        sorted(values)
+        sum(index.get(value, 0) for value in values)
+    
+    return measure("calibration", reference, min_time=min_time).ops_per_sec
+
+
+def load_baselines(path: str) -> Optional[Dict[str, Any]]:
+    """
+    Load stored baselines.
+    
+    Args:
+        path (str): Baselines JSON file
+    
+    Returns:
+        Optional[Dict[str, Any]]: Calibration and results, or None if no file exists
+    """
+    try:
+        with open(path, encoding='utf-8') as baselines_file:
+            return json.load(baselines_file)
+    except FileNotFoundError:
+        return None
+
+
+def save_baselines(path: str, calibration: float, results: List[BenchmarkResult]) -> None:
+    """
+    Store results as the new baselines.
+    
+    Args:
+        path (str): Baselines JSON file
+        calibration (float): Calibration throughput of this run
+        results (List[BenchmarkResult]): Results to store
+    """
+    baselines = {
+        'calibration': round(calibration, 1),
+        'results': {
+            result.name: {
+                'ops_per_sec': round(result.ops_per_sec, 1),
+                'peak_bytes': result.peak_bytes
+            }
+            for result in sorted(results)
+        }
+    }
+    with open(path, 'w', encoding='utf-8') as baselines_file:
+        json.dump(baselines, baselines_file, indent=2)
+        baselines_file.write('\n')
+
+
+def expected_ops_per_sec(baselines: Dict[str, Any], name: str, calibration: float) -> Optional[float]:
+    """
+    Get a baseline's throughput scaled to this machine's speed.
+    
+    Args:
+        baselines (Dict[str, Any]): Stored baselines
+        name (str): Benchmark name
+        calibration (float): Calibration throughput of this run
+    
+    Returns:
+        Optional[float]: Expected operations per second, or None if there is no baseline
+    """
+    baseline = baselines['results'].get(name)
+    if baseline is None:
+        return None
+    return baseline['ops_per_sec'] * calibration / baselines['calibration']
+
+
+def find_regressions(
+    results: List[BenchmarkResult],
+    baselines: Dict[str, Any],
+    calibration: float,
+    threshold: float
+) -> List[str]:
+    """
+    Compare results with the baselines.
+    
+    Args:
+        results (List[BenchmarkResult]): Results of this run
+        baselines (Dict[str, Any]): Stored baselines
+        calibration (float): Calibration throughput of this run
+        threshold (float): Allowed slowdown or allocation growth, e.g. 0.3 for 30%
+    
+    Returns:
+        List[str]: Description of each regression (empty if none)
+    """
+    regressions = []
+    for result in results:
+        expected = expected_ops_per_sec(baselines, result.name, calibration)
+        if expected is None:
+            continue
+        if result.ops_per_sec < expected * (1 - threshold):
+            regressions.append(
+                f"{result.name}: {result.ops_per_sec:,.0f} ops/s, "
+                f"expected at least {expected * (1 - threshold):,.0f}"
+            )
+        
+        allowed_bytes = baselines['results'][result.name]['peak_bytes'] * (1 + threshold) + ALLOCATION_SLACK_BYTES
+        if result.peak_bytes > allowed_bytes:
+            regressions.append(
+                f"{result.name}: allocates {result.peak_bytes:,} bytes per call, "
+                f"expected at most {allowed_bytes:,.0f}"
+            )
+    return regressions
+
+
+def _time_calls(func: Callable[[], Any], calls: int) -> float:
+    """Time a number of consecutive calls with the garbage collector off, in seconds."""
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        for _ in range(calls):
+            func()
+        return time.perf_counter() - start
+    finally:
+        if gc_enabled:
+            gc.enable()
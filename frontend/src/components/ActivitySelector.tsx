@@ -2,13 +2,13 @@
  * Main ActivitySelector component that orchestrates the entire application.
  */
 
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { Header } from './Header';
 import { CategoryDropdown } from './CategoryDropdown';
 import { PriceSelector } from './PriceSelector';
 import { ActivityList } from './ActivityList';
 import { apiService } from '../services/api';
-import type { Category, Activity, PriceLevelType } from '../types/types';
+import type { Category, Activity, PriceLevelType, SnapshotUpdate } from '../types/types';
 
 export const ActivitySelector: React.FC = () => {
   // State management
@@ -20,16 +20,63 @@ export const ActivitySelector: React.FC = () => {
   const [error, setError] = useState<string>('');
   const [categoriesLoading, setCategoriesLoading] = useState(true);
 
+  // Latest values for the snapshot listener, which is registered once
+  const selectedCategoryRef = useRef(selectedCategory);
+  const activitiesRef = useRef(activities);
+  selectedCategoryRef.current = selectedCategory;
+  activitiesRef.current = activities;
+
   // Load categories on component mount
   useEffect(() => {
     loadCategories();
   }, []);
 
+  // Keep shown suggestions current when their category changes on the server
+  useEffect(() => {
+    return apiService.subscribeToSnapshotUpdates(handleSnapshotUpdate);
+  }, []);
+
+  const handleSnapshotUpdate = async (update: SnapshotUpdate) => {
+    const category = selectedCategoryRef.current;
+    const shown = activitiesRef.current;
+    if (!category || shown.length === 0) {
+      return;
+    }
+
+    const removed = new Set(update.type === 'snapshot' ? update.event.removed : []);
+    if (update.type === 'snapshot') {
+      const { event } = update;
+      if (event.category !== category) {
+        return;
+      }
+      const affected = new Set([...(event.changed ?? []), ...event.removed]);
+      if (event.changed && !shown.some((activity) => affected.has(activity.name))) {
+        return;
+      }
+    }
+
+    try {
+      const latest = await apiService.getActivities(category);
+      if (selectedCategoryRef.current !== category) {
+        return;
+      }
+      const latestByName = new Map(latest.map((activity) => [activity.name, activity]));
+      setActivities((current) =>
+        current
+          .filter((activity) => !removed.has(activity.name))
+          .map((activity) => latestByName.get(activity.name) ?? activity)
+      );
+    } catch (err) {
+      console.error('Error refreshing activities:', err);
+    }
+  };
+
   const loadCategories = async () => {
     try {
       setCategoriesLoading(true);
       setError('');
-      const categoriesData = await apiService.getCategories();
+      // Cached categories show at once; changed ones replace them when they arrive
+      const categoriesData = await apiService.getCategories(setCategories);
       setCategories(categoriesData);
     } catch (err) {
       setError('Failed to load categories. Please try again.');
@@ -2,10 +2,30 @@
  * API service for communicating with the Activity Selector backend.
  */
 
-import type { Category, Activity, ActivityRequest, ActivityResponse } from '../types/types';
+import type {
+  Category,
+  Activity,
+  ActivityRequest,
+  ActivityResponse,
+  SnapshotEvent,
+  SnapshotUpdate,
+} from '../types/types';
+import { SwrCache, whenIdle, type Revalidator } from './swrCache';
 
 const API_BASE_URL = import.meta.env.VITE_API_URL || 'http://localhost:8001';
 
+// Tenant whose spreadsheet to use (the server's default tenant if empty)
+const TENANT_ID: string = import.meta.env.VITE_TENANT_ID || '';
+
+// API key of the tenant (only needed if the server requires one)
+const TENANT_API_KEY: string = import.meta.env.VITE_TENANT_API_KEY || '';
+
+// Cached responses younger than this are used without asking the server
+const CACHE_FRESH_MS = 30_000;
+
+// Persisted responses older than this are discarded instead of shown
+const CACHE_MAX_AGE_MS = 24 * 60 * 60 * 1000;
+
 // Mock data for fallback
 const mockCategories: Category[] = [
   { name: "Food", description: "Restaurants and dining options", sheet_name: "Food" },
@@ -21,48 +41,103 @@ const mockActivities: Activity[] = [
   { name: "Art Museum", description: "Contemporary art exhibits", price_level: "$$", location: "Cultural District", category: "Culture" },
 ];
 
+type SnapshotListener = (update: SnapshotUpdate) => void;
+
 class ApiService {
   private baseUrl: string;
+  // Categories and activities, revalidated with their ETags
+  private cache: SwrCache;
+  private eventSource: EventSource | null = null;
+  // While the event stream is open, activities confirmed since it opened
+  // stay fresh until the server reports their category changed
+  private streamOpenedAt: number | null = null;
+  private snapshotListeners = new Set<SnapshotListener>();
+  private prefetching = false;
 
   constructor(baseUrl: string = API_BASE_URL) {
     this.baseUrl = baseUrl;
+    this.cache = new SwrCache(
+      `activity-selector:${baseUrl}:${TENANT_ID}:`,
+      CACHE_FRESH_MS,
+      CACHE_MAX_AGE_MS
+    );
   }
 
-  private async request<T>(
+  private async send(
     endpoint: string,
     options: RequestInit = {}
-  ): Promise<T> {
+  ): Promise<Response> {
     const url = `${this.baseUrl}${endpoint}`;
     
     const config: RequestInit = {
+      ...options,
       headers: {
         'Content-Type': 'application/json',
+        ...(TENANT_ID ? { 'X-Tenant-ID': TENANT_ID } : {}),
+        ...(TENANT_API_KEY ? { 'X-API-Key': TENANT_API_KEY } : {}),
         ...options.headers,
       },
-      ...options,
     };
 
     try {
       const response = await fetch(url, config);
       
-      if (!response.ok) {
+      if (!response.ok && response.status !== 304) {
         const errorData = await response.json().catch(() => ({}));
         throw new Error(errorData.detail || `HTTP error! status: ${response.status}`);
       }
 
-      return await response.json();
+      return response;
     } catch (error) {
       console.error('API request failed:', error);
       throw error;
     }
   }
 
+  private async request<T>(
+    endpoint: string,
+    options: RequestInit = {}
+  ): Promise<T> {
+    const response = await this.send(endpoint, options);
+    return await response.json();
+  }
+
+  /**
+   * GET an endpoint, asking the server to answer 304 if the cached copy
+   * with the given ETag is still current.
+   */
+  private conditionalGet<T>(endpoint: string): Revalidator<T> {
+    return async (etag) => {
+      const response = await this.send(endpoint, etag ? { headers: { 'If-None-Match': etag } } : {});
+      if (response.status === 304) {
+        return null;
+      }
+      return { data: await response.json(), etag: response.headers.get('ETag') };
+    };
+  }
+
   /**
    * Get all available categories.
+   *
+   * Cached categories are returned at once and revalidated in the
+   * background; onUpdate receives them if they changed. Once categories
+   * are known, every category's activities are prefetched while the
+   * browser is idle.
    */
-  async getCategories(): Promise<Category[]> {
+  async getCategories(onUpdate?: (categories: Category[]) => void): Promise<Category[]> {
     try {
-      return await this.request<Category[]>('/api/categories');
+      const categories = await this.cache.get(
+        'categories',
+        this.conditionalGet<Category[]>('/api/categories'),
+        {
+          onUpdate: (updated) => {
+            this.prefetchActivities(updated);
+            onUpdate?.(updated);
+          },
+        }
+      );
+      this.prefetchActivities(categories);
+      return categories;
     } catch (error) {
       console.warn('Using mock categories due to API failure');
       return mockCategories;
@@ -71,18 +146,21 @@ class ApiService {
 
   /**
    * Get activities for a specific category and optional price level.
+   *
+   * Served from the cache like getCategories; concurrent calls for the
+   * same activities share one request.
    */
   async getActivities(
     category: string,
-    priceLevel?: string
+    priceLevel?: string,
+    onUpdate?: (activities: Activity[]) => void
   ): Promise<Activity[]> {
     try {
-      const params = new URLSearchParams({ category });
-      if (priceLevel) {
-        params.append('price_level', priceLevel);
-      }
-      
-      return await this.request<Activity[]>(`/api/activities?${params.toString()}`);
+      return await this.cache.get(
+        activitiesKey(category, priceLevel),
+        this.activitiesRevalidator(category, priceLevel),
+        { onUpdate, trustedSince: this.streamOpenedAt }
+      );
     } catch (error) {
       console.warn('Using mock activities due to API failure');
       return mockActivities.filter(activity => 
@@ -92,6 +170,37 @@ class ApiService {
     }
   }
 
+  private activitiesRevalidator(category: string, priceLevel?: string): Revalidator<Activity[]> {
+    const params = new URLSearchParams({ category });
+    if (priceLevel) {
+      params.append('price_level', priceLevel);
+    }
+    return this.conditionalGet<Activity[]>(`/api/activities?${params.toString()}`);
+  }
+
+  /**
+   * Load the activities of each category into the cache, one category per
+   * idle period, so switching categories rarely waits on the network.
+   */
+  private prefetchActivities(categories: Category[]): void {
+    if (this.prefetching || categories.length === 0) {
+      return;
+    }
+    this.prefetching = true;
+
+    const prefetchFrom = (index: number) => {
+      if (index >= categories.length) {
+        this.prefetching = false;
+        return;
+      }
+      const category = categories[index].name;
+      this.cache
+        .prefetch(activitiesKey(category), this.activitiesRevalidator(category), this.streamOpenedAt)
+        .then(() => whenIdle(() => prefetchFrom(index + 1)));
+    };
+    whenIdle(() => prefetchFrom(0));
+  }
+
   /**
    * Get random activity suggestions.
    */
@@ -117,6 +226,82 @@ class ApiService {
     }
   }
 
+  /**
+   * Subscribe to category snapshot changes pushed by the server.
+   *
+   * All listeners share one EventSource on `/api/events`, opened with the
+   * first listener and closed with the last. The browser reconnects on its
+   * own and resumes from the last event it saw. Cached activities of a
+   * changed category are dropped, so only that category is refetched, and
+   * the others need no revalidation while the stream is open.
+   *
+   * Returns a function that removes the listener.
+   */
+  subscribeToSnapshotUpdates(listener: SnapshotListener): () => void {
+    this.snapshotListeners.add(listener);
+    if (!this.eventSource && typeof EventSource !== 'undefined') {
+      this.openEventSource();
+    }
+
+    return () => {
+      this.snapshotListeners.delete(listener);
+      if (this.snapshotListeners.size === 0 && this.eventSource) {
+        this.eventSource.close();
+        this.eventSource = null;
+        this.streamOpenedAt = null;
+      }
+    };
+  }
+
+  private openEventSource(): void {
+    // EventSource cannot send headers, so the tenant and key go in the query string
+    const params = new URLSearchParams();
+    if (TENANT_ID) {
+      params.set('tenant', TENANT_ID);
+    }
+    if (TENANT_API_KEY) {
+      params.set('api_key', TENANT_API_KEY);
+    }
+    const query = params.toString() ? `?${params}` : '';
+    const source = new EventSource(`${this.baseUrl}/api/events${query}`);
+
+    source.addEventListener('snapshot', (message) => {
+      const event: SnapshotEvent = JSON.parse((message as MessageEvent<string>).data);
+      const prefix = activitiesKey(event.category, undefined, true);
+      this.cache.invalidate((key) => key.startsWith(prefix));
+      this.notifySnapshotListeners({ type: 'snapshot', event });
+    });
+
+    source.addEventListener('reset', () => {
+      this.cache.invalidate((key) => key.startsWith('activities/'));
+      this.notifySnapshotListeners({ type: 'reset' });
+    });
+
+    source.onopen = () => {
+      // Reconnects replay missed events, so trust continues from the first open
+      if (this.streamOpenedAt === null) {
+        this.streamOpenedAt = Date.now();
+      }
+    };
+
+    source.onerror = () => {
+      // Changes made while disconnected are replayed (or reset) on reconnect
+      console.warn('Snapshot event stream interrupted, reconnecting');
+    };
+
+    this.eventSource = source;
+  }
+
+  private notifySnapshotListeners(update: SnapshotUpdate): void {
+    this.snapshotListeners.forEach((listener) => {
+      try {
+        listener(update);
+      } catch (error) {
+        console.error('Snapshot listener failed:', error);
+      }
+    });
+  }
+
   /**
    * Health check endpoint.
    */
@@ -130,5 +315,14 @@ class ApiService {
   }
 }
 
+/**
+ * Cache key of a category's activities; with prefixOnly, the prefix shared
+ * by all price levels of the category.
+ */
+function activitiesKey(category: string, priceLevel?: string, prefixOnly = false): string {
+  const prefix = `activities/${encodeURIComponent(category)}/`;
+  return prefixOnly ? prefix : prefix + encodeURIComponent(priceLevel ?? '');
+}
+
 // Export a singleton instance
 export const apiService = new ApiService(); 
\ No newline at end of file
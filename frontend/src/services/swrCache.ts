@@ -0,0 +1,233 @@
+/**
+ * Stale-while-revalidate cache for API responses, persisted in localStorage.
+ */
+
+export interface CacheEntry<T> {
+  data: T;
+  etag: string | null;
+  // When the server last confirmed the data (request start, in ms since epoch)
+  confirmedAt: number;
+}
+
+/**
+ * Fetch fresh data, sending the cached ETag if there is one. Resolves to
+ * null when the server answers 304 Not Modified.
+ */
+export type Revalidator<T> = (
+  etag: string | null
+) => Promise<{ data: T; etag: string | null } | null>;
+
+export interface CacheOptions<T> {
+  // Called when a background revalidation returns different data
+  onUpdate?: (data: T) => void;
+  // Entries confirmed since this time stay fresh until invalidated
+  trustedSince?: number | null;
+}
+
+export class SwrCache {
+  private entries = new Map<string, CacheEntry<unknown>>();
+  private inFlight = new Map<string, Promise<unknown>>();
+
+  /**
+   * @param storagePrefix Prefix of the localStorage keys holding entries
+   * @param freshMs Age below which entries are served without revalidating
+   * @param maxAgeMs Age beyond which persisted entries are discarded
+   */
+  constructor(
+    private storagePrefix: string,
+    private freshMs: number,
+    private maxAgeMs: number
+  ) {}
+
+  /**
+   * Get data, from the cache if possible.
+   *
+   * Fresh entries are returned as is. Stale entries are returned at once
+   * and revalidated in the background; options.onUpdate receives the new
+   * data if it changed. Without an entry the request is awaited.
+   * Concurrent requests for the same key share one network call.
+   */
+  async get<T>(key: string, revalidate: Revalidator<T>, options: CacheOptions<T> = {}): Promise<T> {
+    const entry = this.lookup<T>(key);
+    if (!entry) {
+      return this.revalidate(key, revalidate);
+    }
+
+    if (!this.isFresh(entry, options.trustedSince)) {
+      this.revalidate(key, revalidate)
+        .then((data) => {
+          if (data !== entry.data) {
+            options.onUpdate?.(data);
+          }
+        })
+        .catch((error) => console.warn(`Revalidating ${key} failed, keeping cached data:`, error));
+    }
+    return entry.data;
+  }
+
+  /**
+   * Load data into the cache ahead of use, unless a fresh copy is there.
+   */
+  prefetch<T>(key: string, revalidate: Revalidator<T>, trustedSince?: number | null): Promise<void> {
+    const entry = this.lookup<T>(key);
+    if (entry && this.isFresh(entry, trustedSince)) {
+      return Promise.resolve();
+    }
+    return this.revalidate(key, revalidate).then(
+      () => undefined,
+      (error) => console.warn(`Prefetching ${key} failed:`, error)
+    );
+  }
+
+  /**
+   * Drop entries whose key matches, including any request in flight for
+   * them, so their next use waits for the server.
+   */
+  invalidate(matches: (key: string) => boolean = () => true): void {
+    for (const key of Array.from(this.entries.keys())) {
+      if (matches(key)) {
+        this.entries.delete(key);
+      }
+    }
+    for (const key of Array.from(this.inFlight.keys())) {
+      if (matches(key)) {
+        this.inFlight.delete(key);
+      }
+    }
+    this.forEachStoredKey((key) => {
+      if (matches(key)) {
+        this.removeStored(key);
+      }
+    });
+  }
+
+  private revalidate<T>(key: string, revalidate: Revalidator<T>): Promise<T> {
+    const pending = this.inFlight.get(key);
+    if (pending) {
+      return pending as Promise<T>;
+    }
+
+    const entry = this.lookup<T>(key);
+    const requestedAt = Date.now();
+    const request: Promise<T> = revalidate(entry?.etag ?? null)
+      .then((result) => {
+        // An invalidation while in flight makes the response untrustworthy
+        const current = this.inFlight.get(key) === request;
+        if (result === null) {
+          if (!entry) {
+            throw new Error(`Not modified, but nothing is cached for ${key}`);
+          }
+          if (current) {
+            this.store(key, { ...entry, confirmedAt: requestedAt });
+          }
+          return entry.data;
+        }
+
+        if (current) {
+          this.store(key, { data: result.data, etag: result.etag, confirmedAt: requestedAt });
+        }
+        return result.data;
+      })
+      .finally(() => {
+        if (this.inFlight.get(key) === request) {
+          this.inFlight.delete(key);
+        }
+      });
+
+    this.inFlight.set(key, request);
+    return request;
+  }
+
+  private isFresh(entry: CacheEntry<unknown>, trustedSince?: number | null): boolean {
+    if (trustedSince != null && entry.confirmedAt >= trustedSince) {
+      return true;
+    }
+    return Date.now() - entry.confirmedAt < this.freshMs;
+  }
+
+  private lookup<T>(key: string): CacheEntry<T> | undefined {
+    const entry = this.entries.get(key);
+    if (entry) {
+      return entry as CacheEntry<T>;
+    }
+
+    const stored = this.readStored<T>(key);
+    if (stored) {
+      this.entries.set(key, stored);
+    }
+    return stored;
+  }
+
+  private store<T>(key: string, entry: CacheEntry<T>): void {
+    this.entries.set(key, entry);
+    const storage = getStorage();
+    if (!storage) {
+      return;
+    }
+    try {
+      storage.setItem(this.storagePrefix + key, JSON.stringify(entry));
+    } catch (error) {
+      // Over quota: keep the entry in memory only
+      console.warn(`Could not persist ${key}:`, error);
+      this.removeStored(key);
+    }
+  }
+
+  private readStored<T>(key: string): CacheEntry<T> | undefined {
+    const storage = getStorage();
+    const raw = storage?.getItem(this.storagePrefix + key);
+    if (!raw) {
+      return undefined;
+    }
+    try {
+      const entry: CacheEntry<T> = JSON.parse(raw);
+      if (Date.now() - entry.confirmedAt <= this.maxAgeMs) {
+        return entry;
+      }
+    } catch {
+      // Unreadable entries are discarded below
+    }
+    this.removeStored(key);
+    return undefined;
+  }
+
+  private removeStored(key: string): void {
+    getStorage()?.removeItem(this.storagePrefix + key);
+  }
+
+  private forEachStoredKey(callback: (key: string) => void): void {
+    const storage = getStorage();
+    if (!storage) {
+      return;
+    }
+    const keys: string[] = [];
+    for (let i = 0; i < storage.length; i++) {
+      const storageKey = storage.key(i);
+      if (storageKey?.startsWith(this.storagePrefix)) {
+        keys.push(storageKey.slice(this.storagePrefix.length));
+      }
+    }
+    keys.forEach(callback);
+  }
+}
+
+function getStorage(): Storage | null {
+  try {
+    return typeof localStorage === 'undefined' ? null : localStorage;
+  } catch {
+    // Access throws when storage is disabled (e.g. some private modes)
+    return null;
+  }
+}
+
+/**
+ * Run a task when the browser is idle, or soon where idle callbacks are
+ * not supported.
+ */
+export function whenIdle(task: () => void): void {
+  if (typeof requestIdleCallback === 'function') {
+    requestIdleCallback(() => task(), { timeout: 5000 });
+  } else {
+    setTimeout(task, 200);
+  }
+}
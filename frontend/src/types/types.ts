@@ -26,6 +26,8 @@ export interface Activity {
   url?: string;
   notes?: string;
   last_visit_date?: string;
+  latitude?: number;
+  longitude?: number;
 }
 
 export interface Category {
@@ -38,6 +40,8 @@ export interface ActivityRequest {
   category: string;
   price_level?: PriceLevelType;
   limit?: number;
+  near?: string; // "latitude,longitude" or a place name
+  radius?: number; // kilometres
 }
 
 export interface ActivityResponse {
@@ -47,6 +51,22 @@ export interface ActivityResponse {
   price_level?: PriceLevelType;
 }
 
+export interface SnapshotEvent {
+  id: number;
+  category: string;
+  version?: string | null;
+  changed?: string[] | null;
+  removed: string[];
+}
+
+/**
+ * Notification delivered to snapshot update listeners: either one category
+ * changed, or events were missed and every category should be refetched.
+ */
+export type SnapshotUpdate =
+  | { type: 'snapshot'; event: SnapshotEvent }
+  | { type: 'reset' };
+
 export interface ErrorResponse {
   error: string;
   detail?: string;
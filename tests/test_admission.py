@@ -0,0 +1,183 @@
+"""
+Unit tests for admission control and load shedding.
+"""
+import asyncio
+import time
+import pytest
+from fastapi.testclient import TestClient
+from backend.app.api import routes
+from backend.app.main import app
+from backend.app.services.admission import (
+    AdmissionLimiter,
+    Overloaded,
+    admission,
+    parse_route_limits
+)
+from backend.app.services.cache_service import cache_service
+from backend.app.services.sheets_service import sheets_service
+
+
+class TestAdmissionLimiter:
+    """Test cases for AdmissionLimiter."""
+    
+    def test_waiters_get_slots_in_order(self):
+        """Test that released slots go to waiters first-in, first-out."""
+        limiter = AdmissionLimiter("test", max_concurrent=1, max_queue=4, queue_timeout=1.0)
+        order = []
+        
+        async def worker(name):
+            async with limiter.admit():
+                order.append(name)
+                await asyncio.sleep(0.01)
+        
+        async def scenario():
+            await asyncio.gather(*(worker(name) for name in "abc"))
+        
+        asyncio.run(scenario())
+        assert order == ["a", "b", "c"]
+        assert limiter.active == 0
+        assert limiter.admitted == 3
+    
+    def test_full_queue_rejects_immediately(self):
+        """Test that requests beyond the wait queue are shed at once."""
+        limiter = AdmissionLimiter("test", max_concurrent=1, max_queue=1, queue_timeout=5.0)
+        
+        async def scenario():
+            await limiter.acquire()
+            waiter = asyncio.ensure_future(limiter.acquire())
+            await asyncio.sleep(0)
+            with pytest.raises(Overloaded):
+                await limiter.acquire()
+            limiter.release()
+            await waiter
+            limiter.release()
+        
+        asyncio.run(scenario())
+        assert limiter.rejected == 1
+        assert limiter.active == 0
+    
+    def test_deadline_bounds_the_wait(self):
+        """Test that a waiter gives up at its deadline and frees its place."""
+        limiter = AdmissionLimiter("test", max_concurrent=1, max_queue=4, queue_timeout=5.0)
+        
+        async def scenario():
+            await limiter.acquire()
+            with pytest.raises(Overloaded) as error:
+                await limiter.acquire(timeout=0.01)
+            assert error.value.retry_after >= 1
+            limiter.release()
+        
+        asyncio.run(scenario())
+        assert limiter.stats()["waiting"] == 0
+        assert limiter.active == 0
+    
+    def test_expected_wait_fails_fast(self):
+        """Test that a request is rejected when it could not be served in time."""
+        limiter = AdmissionLimiter("test", max_concurrent=1, max_queue=4, queue_timeout=5.0)
+        limiter.service_time = 10.0
+        
+        async def scenario():
+            await limiter.acquire()
+            with pytest.raises(Overloaded):
+                await limiter.acquire(timeout=1.0)
+        
+        asyncio.run(scenario())
+        assert limiter.stats()["waiting"] == 0
+    
+    def test_parse_route_limits(self):
+        """Test parsing per-route overrides."""
+        assert parse_route_limits("") == {}
+        assert parse_route_limits("suggest=16, export=2") == {"suggest": 16, "export": 2}
+        with pytest.raises(ValueError):
+            parse_route_limits("suggest=many")
+
+
+class TestLoadShedding:
+    """Test cases for admission-controlled routes."""
+    
+    def setup_method(self):
+        """Reject every request that needs the Sheets API."""
+        cache_service.clear()
+        admission.configure(max_concurrent=0, max_queue=0)
+        self.client = TestClient(app)
+    
+    def teardown_method(self):
+        """Restore the default limits and an empty cache."""
+        admission.configure()
+        cache_service.clear()
+    
+    def test_cold_request_is_shed(self):
+        """Test that an uncached request gets a fast 503."""
+        response = self.client.post("/api/suggest", json={"category": "Food"})
+        assert response.status_code == 503
+        assert "Retry-After" in response.headers
+    
+    def test_cached_request_takes_priority_lane(self):
+        """Test that fresh cached snapshots are served without admission."""
+        sheets_service.get_category_snapshots(["Food", "Fun"])
+        response = self.client.post("/api/suggest/batch", json=[{"category": "Food"}, {"category": "Fun"}])
+        assert response.status_code == 200
+        assert "Warning" not in response.headers
+        assert "suggest" not in admission.stats()
+    
+    def test_stale_snapshot_served_under_overload(self):
+        """Test that an expired snapshot is served, marked stale, when overloaded."""
+        snapshot = sheets_service.get_category_snapshot("Food")
+        cache_service.set(sheets_service._snapshot_key("Food"), snapshot, ttl=1)
+        cache_service.touch(sheets_service._snapshot_key("Food"), ttl=-1)
+        
+        response = self.client.get("/api/activities", params={"category": "Food"})
+        assert response.status_code == 200
+        assert response.headers["Warning"].startswith("110")
+        assert len(response.json()) == len(snapshot)
+    
+    def test_health_is_never_shed(self):
+        """Test that the health check bypasses admission control."""
+        response = self.client.get("/api/health")
+        assert response.status_code == 200
+    
+    def test_stats_steps_share_one_deadline(self, monkeypatch):
+        """Test that the snapshot load only gets the time left after loading categories."""
+        admission.configure()
+        monkeypatch.setattr(sheets_service, "cached_categories", lambda allow_stale=False: None)
+        categories = sheets_service._get_mock_categories()
+        
+        def slow_categories():
+            time.sleep(0.3)
+            return categories
+        monkeypatch.setattr(sheets_service, "get_categories", slow_categories)
+        
+        timeouts = []
+        load_snapshots = routes._load_snapshots
+        
+        async def recording_load(route, service, names, timeout, response):
+            timeouts.append(timeout)
+            return await load_snapshots(route, service, names, timeout, response)
+        monkeypatch.setattr(routes, "_load_snapshots", recording_load)
+        
+        response = self.client.get("/api/stats", headers={"X-Request-Timeout": "1"})
+        assert response.status_code == 200
+        assert timeouts[0] <= 0.71
+    
+    def test_stream_slot_is_released_if_never_streamed(self):
+        """Test that an export response frees its slot when sending fails before the body starts."""
+        limiter = AdmissionLimiter("stream-test", max_concurrent=1, max_queue=0, queue_timeout=1)
+        
+        def chunks():
+            yield "never sent\n"
+        
+        async def scenario():
+            await limiter.acquire()
+            response = routes._AdmittedStreamingResponse(chunks(), limiter, time.monotonic())
+            
+            async def receive():
+                await asyncio.sleep(10)
+            
+            async def send(message):
+                raise OSError("client went away")
+            
+            with pytest.raises(Exception):
+                await response({"type": "http", "asgi": {"spec_version": "2.4"}}, receive, send)
+        
+        asyncio.run(scenario())
+        assert limiter.active == 0
@@ -0,0 +1,51 @@
+"""
+Tests for the micro-benchmark harness and the opt-in regression gate.
+"""
+import os
+import pytest
+from benchmarks import bench_hot_paths
+from benchmarks.harness import BenchmarkResult, find_regressions, load_baselines, measure, save_baselines
+
+
+class TestHarness:
+    """Test cases for measurement and baseline comparison."""
+    
+    def test_measure_reports_throughput_and_allocations(self):
+        """Test that a measurement counts operations and allocated bytes."""
+        result = measure("alloc", lambda: [0] * 10_000, ops_per_call=10, min_time=0.001, repeats=2)
+        assert result.name == "alloc"
+        assert result.ops_per_sec > 0
+        assert result.peak_bytes >= 10_000 * 8
+    
+    def test_regressions_are_scaled_by_calibration(self, tmp_path):
+        """Test that baselines from a faster machine are scaled down before comparing."""
+        path = str(tmp_path / "baselines.json")
+        save_baselines(path, 2000.0, [BenchmarkResult("hot", 1000.0, 100)])
+        baselines = load_baselines(path)
+        
+        # Half as fast on a machine half as fast: not a regression
+        assert find_regressions([BenchmarkResult("hot", 500.0, 100)], baselines, 1000.0, 0.3) == []
+        # Ten times slower on the same machine: a regression
+        assert len(find_regressions([BenchmarkResult("hot", 100.0, 100)], baselines, 2000.0, 0.3)) == 1
+        # Allocating far more per call: a regression
+        assert len(find_regressions([BenchmarkResult("hot", 1000.0, 10_000)], baselines, 2000.0, 0.3)) == 1
+        # Benchmarks without a baseline are not gated
+        assert find_regressions([BenchmarkResult("new", 1.0, 10**9)], baselines, 2000.0, 0.3) == []
+    
+    def test_missing_baselines(self, tmp_path):
+        """Test that a missing baselines file is reported as None."""
+        assert load_baselines(str(tmp_path / "missing.json")) is None
+    
+    def test_suite_runs(self):
+        """Test that every hot-path benchmark runs on a small sheet."""
+        results = bench_hot_paths.run(sizes=[50], min_time=0.001)
+        names = {result.name for result in results}
+        assert "parser.parse_activity_row[50]" in names
+        assert "suggest.random[50]" in names
+        assert all(result.ops_per_sec > 0 for result in results)
+
+
+@pytest.mark.skipif(not os.getenv("RUN_BENCHMARKS"), reason="set RUN_BENCHMARKS=1 to run the regression gate")
+def test_no_hot_path_regressions():
+    """Gate: hot paths must stay within the threshold of the stored baselines."""
+    assert bench_hot_paths.main(["--check"]) == 0
@@ -4,6 +4,7 @@ Unit tests for the cache service.
 import pytest
 import time
 from datetime import datetime, timedelta
+from backend.app.services import cache_service as cache_module
 from backend.app.services.cache_service import CacheService
 
 
@@ -114,4 +115,348 @@ class TestCacheService:
         
         # Check that it's removed from internal cache
         stats = self.cache.get_cache_stats()
-        assert "expire_key" not in stats["keys"] 
\ No newline at end of file
+        assert "expire_key" not in stats["keys"]
+    
+    def test_peek_keeps_expired_entries(self):
+        """Test that peek returns expired values without evicting them."""
+        assert self.cache.peek("missing") == (None, False)
+        
+        self.cache.set("peek_key", "value", ttl=1)
+        assert self.cache.peek("peek_key") == ("value", True)
+        
+        time.sleep(1.1)
+        assert self.cache.peek("peek_key") == ("value", False)
+        assert "peek_key" in self.cache.get_cache_stats()["keys"]
+    
+    def test_touch_extends_expiry(self):
+        """Test that touch revives an expired entry with a new TTL."""
+        self.cache.set("touch_key", "value", ttl=1)
+        time.sleep(1.1)
+        
+        assert self.cache.touch("touch_key", ttl=60) is True
+        assert self.cache.get("touch_key") == "value"
+        
+        # Touching a missing key does nothing
+        assert self.cache.touch("missing") is False
+        assert self.cache.get("missing") is None
+
+
+class TestCacheServiceConcurrency:
+    """Stress tests for concurrent cache access."""
+    
+    def test_concurrent_readers_and_writers(self):
+        """Test that many threads can read and write without races."""
+        import threading
+        
+        cache = CacheService(default_ttl=60)
+        errors = []
+        stop = threading.Event()
+        
+        def writer(worker_id):
+            try:
+                for i in range(2000):
+                    key = f"key{i % 20}"
+                    cache.set(key, (key, worker_id, i))
+                    if i % 7 == 0:
+                        cache.delete(key)
+                    if i % 11 == 0:
+                        cache.touch(key, ttl=30)
+                    if i % 500 == 0:
+                        cache.clear()
+            except Exception as e:  # pragma: no cover - reported below
+                errors.append(e)
+        
+        def reader():
+            try:
+                while not stop.is_set():
+                    for i in range(20):
+                        key = f"key{i}"
+                        value = cache.get(key)
+                        # A value is either absent or a complete entry for this key
+                        assert value is None or value[0] == key
+                        peeked, _ = cache.peek(key)
+                        assert peeked is None or peeked[0] == key
+                    stats = cache.get_cache_stats()
+                    assert stats["total_entries"] == len(stats["keys"])
+            except Exception as e:  # pragma: no cover - reported below
+                errors.append(e)
+        
+        writers = [threading.Thread(target=writer, args=(n,)) for n in range(8)]
+        readers = [threading.Thread(target=reader) for _ in range(8)]
+        for thread in readers + writers:
+            thread.start()
+        for thread in writers:
+            thread.join()
+        stop.set()
+        for thread in readers:
+            thread.join()
+        
+        assert errors == []
+    
+    def test_readers_keep_published_mapping(self):
+        """Test that writes publish a new mapping instead of mutating the old one."""
+        cache = CacheService(default_ttl=60)
+        cache.set("key1", "value1")
+        published = cache._shards[""].entries
+        
+        cache.set("key2", "value2")
+        cache.delete("key1")
+        
+        assert list(published) == ["key1"]
+        assert cache.get("key1") is None
+        assert cache.get("key2") == "value2"
+    
+    def test_expired_eviction_does_not_drop_new_value(self):
+        """Test that evicting an expired entry keeps a value written meanwhile."""
+        cache = CacheService(default_ttl=60)
+        cache.set("key", "old", ttl=1)
+        expired_entry = cache._shards[""].entries["key"]
+        time.sleep(1.1)
+        
+        cache.set("key", "new")
+        cache._evict("key", expired_entry)
+        
+        assert cache.get("key") == "new"
+
+
+class TestAdaptiveTtl:
+    """Test cases for per-key statistics and adaptive TTLs."""
+    
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.cache = CacheService(default_ttl=1000, min_ttl=100, max_ttl=3000)
+    
+    def test_unobserved_key_gets_base_ttl(self):
+        """Test that keys without refresh history use the base TTL."""
+        assert self.cache.adaptive_ttl("new_key") == 1000
+        assert self.cache.adaptive_ttl("new_key", 500) == 500
+        assert self.cache.adaptive_ttl("new_key", 10) == 100
+    
+    def test_stable_keys_get_longer_ttl(self):
+        """Test that keys whose data never changes get longer TTLs."""
+        self.cache.set("stable", "value")
+        for _ in range(10):
+            self.cache.record_refresh("stable", changed=False)
+        
+        ttl = self.cache.adaptive_ttl("stable")
+        assert 1000 < ttl <= 3000
+    
+    def test_changing_keys_get_shorter_ttl(self):
+        """Test that keys whose data keeps changing get shorter TTLs."""
+        self.cache.set("volatile", "value")
+        for _ in range(10):
+            self.cache.record_refresh("volatile", changed=True)
+        
+        ttl = self.cache.adaptive_ttl("volatile")
+        assert 100 <= ttl < 1000
+    
+    def test_hot_changing_keys_stay_fresher(self):
+        """Test that popular changing keys get shorter TTLs than cold ones."""
+        for key in ("hot", "cold"):
+            self.cache.set(key, "value")
+            for changed in (True, False, True, True):
+                self.cache.record_refresh(key, changed=changed)
+        for _ in range(500):
+            self.cache.get("hot")
+        
+        assert self.cache.adaptive_ttl("hot") < self.cache.adaptive_ttl("cold")
+    
+    def test_popular_keys(self):
+        """Test ranking keys by access count."""
+        for key in ("snapshot_a", "snapshot_b", "snapshot_c", "categories"):
+            self.cache.set(key, "value")
+        for _ in range(3):
+            self.cache.get("snapshot_a")
+        self.cache.peek("snapshot_b")
+        self.cache.peek("snapshot_c", count_access=False)
+        for _ in range(5):
+            self.cache.get("categories")
+        
+        assert self.cache.popular_keys(2) == ["categories", "snapshot_a"]
+        assert self.cache.popular_keys(5, prefix="snapshot_") == ["snapshot_a", "snapshot_b", "snapshot_c"]
+        
+        stats = self.cache.get_cache_stats()
+        assert stats["key_stats"]["snapshot_a"]["accesses"] == 3
+    
+    def test_missing_keys_have_no_stats(self):
+        """Test that lookups and refreshes of uncached keys are not tracked."""
+        for i in range(100):
+            self.cache.get(f"missing_{i}")
+            self.cache.peek(f"missing_{i}")
+            self.cache.record_refresh(f"missing_{i}", changed=True)
+        
+        assert self.cache.popular_keys(10) == []
+        assert self.cache.get_cache_stats()["key_stats"] == {}
+    
+    def test_stats_are_dropped_with_their_entry(self):
+        """Test that deleted, expired and cleared keys lose their statistics."""
+        self.cache.set("deleted", "value")
+        self.cache.set("expired", "value", ttl=-1)
+        self.cache.set("kept", "value")
+        self.cache.record_refresh("kept", changed=False)
+        
+        self.cache.delete("deleted")
+        assert self.cache.get("expired") is None
+        self.cache.set("kept", "new value")
+        
+        assert list(self.cache.get_cache_stats()["key_stats"]) == ["kept"]
+        assert self.cache.get_cache_stats()["key_stats"]["kept"]["refreshes"] == 1
+        
+        self.cache.clear()
+        assert self.cache.get_cache_stats()["key_stats"] == {}
+    
+    def test_popularity_decays(self, monkeypatch):
+        """Test that keys that are no longer read drop down the ranking."""
+        clock = [1000.0]
+        monkeypatch.setattr(cache_module.time, "monotonic", lambda: clock[0])
+        self.cache.set("old_favourite", "value")
+        self.cache.set("new_favourite", "value")
+        
+        for _ in range(8):
+            self.cache.get("old_favourite")
+        clock[0] += 3 * cache_module.ACCESS_HALF_LIFE
+        for _ in range(2):
+            self.cache.get("new_favourite")
+        
+        assert self.cache.popular_keys(2) == ["new_favourite", "old_favourite"]
+        assert self.cache.get_cache_stats()["key_stats"]["old_favourite"]["accesses"] == 1
+    
+    def test_time_to_live(self):
+        """Test reporting the remaining lifetime of an entry."""
+        assert self.cache.time_to_live("missing") is None
+        self.cache.set("key", "value", ttl=60)
+        assert 55 < self.cache.time_to_live("key") <= 60
+
+
+class TestCacheBudgets:
+    """Test cases for per-namespace memory budgets."""
+    
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.cache = CacheService(default_ttl=60, max_bytes=1000, namespace_bytes=600)
+    
+    def test_namespace_budget_evicts_own_entries(self):
+        """Test that a namespace over its budget evicts its least used entries."""
+        self.cache.set("a:hot", "value", size=300)
+        self.cache.get("a:hot")
+        self.cache.set("a:cold", "value", size=300)
+        self.cache.set("a:new", "value", size=300)
+        
+        assert self.cache.get("a:hot") == "value"
+        assert self.cache.get("a:cold") is None
+        assert self.cache.get("a:new") == "value"
+        assert self.cache.namespace_usage() == {"a": 600}
+    
+    def test_large_entry_evicts_many_in_order(self):
+        """Test that one write evicting many entries takes expired, then least used, then oldest."""
+        cache = CacheService(default_ttl=60, namespace_bytes=1000)
+        for i in range(100):
+            cache.set(f"a:{i}", i, ttl=-1 if i % 10 == 0 else 60, size=10)
+        # Reading the expired entries 50..90 drops them
+        for i in range(50, 100):
+            cache.get(f"a:{i}")
+        
+        cache.set("a:big", "value", size=500)
+        
+        # 45 entries go: the expired 0..40, then the unread entries oldest first
+        kept = sorted(int(key[2:]) for key in cache.get_cache_stats()["keys"] if key != "a:big")
+        assert kept == [45, 46, 47, 48, 49] + [i for i in range(51, 100) if i % 10]
+        assert cache.namespace_usage() == {"a": 1000}
+    
+    def test_global_limit_evicts_from_heaviest_namespace(self):
+        """Test that a tenant within its budget is not evicted by a busy one."""
+        self.cache.set("small:only", "value", size=200)
+        self.cache.set("big:one", "value", size=400)
+        self.cache.set("big:two", "value", size=200)
+        self.cache.set("other:one", "value", size=300)
+        
+        assert self.cache.get("small:only") == "value"
+        assert self.cache.get("other:one") == "value"
+        assert sum(self.cache.namespace_usage().values()) <= 1000
+    
+    def test_unsized_entries_are_not_counted(self):
+        """Test that entries stored without a size never trigger eviction."""
+        for index in range(10):
+            self.cache.set(f"a:{index}", "value")
+        assert len(self.cache.get_cache_stats()["keys"]) == 10
+    
+    def test_set_budget_overrides_default(self):
+        """Test giving one namespace a budget of its own."""
+        self.cache.set_budget("a", 100)
+        self.cache.set("a:one", "value", size=100)
+        self.cache.set("a:two", "value", size=100)
+        assert self.cache.namespace_usage() == {"a": 100}
+        
+        stats = self.cache.get_cache_stats()
+        assert stats["namespaces"]["a"] == {"bytes": 100, "budget": 100}
+    
+    def test_clear_namespace(self):
+        """Test clearing the entries of one namespace only."""
+        self.cache.set("a:one", "value")
+        self.cache.set("b:one", "value")
+        self.cache.clear("a")
+        
+        assert self.cache.get("a:one") is None
+        assert self.cache.get("b:one") == "value"
+
+
+class TestCacheShards:
+    """Test cases for namespace shards and purging long-expired entries."""
+    
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.cache = CacheService(default_ttl=60, stale_window=1)
+    
+    def test_writes_leave_other_namespaces_alone(self):
+        """Test that a write publishes only its own namespace's shard."""
+        self.cache.set("a:one", "value", size=10)
+        other = self.cache._shards["a"]
+        
+        self.cache.set("b:one", "value", size=20)
+        self.cache.delete("b:one")
+        
+        assert self.cache._shards["a"] is other
+        assert self.cache.namespace_usage() == {"a": 10}
+    
+    def test_byte_counts_follow_writes(self):
+        """Test that namespace sizes are kept up to date without rescans."""
+        self.cache.set("a:one", "value", size=10)
+        self.cache.set("a:two", "value", size=20)
+        self.cache.set("a:one", "value", size=5)
+        self.cache.touch("a:two", 120)
+        assert self.cache.namespace_usage() == {"a": 25}
+        
+        self.cache.delete("a:two")
+        assert self.cache.get_cache_stats("a")["total_bytes"] == 5
+    
+    def test_write_drops_entries_expired_past_stale_window(self):
+        """Test that writing a namespace purges its long-expired entries only."""
+        self.cache.set("a:old", "value", ttl=1)
+        self.cache.set("b:old", "value", ttl=1)
+        time.sleep(2.1)
+        
+        self.cache.set("a:new", "value")
+        
+        assert self.cache.get_cache_stats("a")["keys"] == ["a:new"]
+        assert self.cache.peek("b:old") == ("value", False)
+    
+    def test_recently_expired_entries_stay_for_stale_reads(self):
+        """Test that entries within the stale window survive writes."""
+        cache = CacheService(default_ttl=60, stale_window=60)
+        cache.set("a:old", "value", ttl=1)
+        time.sleep(1.1)
+        
+        cache.set("a:new", "value")
+        
+        assert cache.peek("a:old") == ("value", False)
+    
+    def test_purge_expired_catches_idle_namespaces(self):
+        """Test that purging drops long-expired entries of unwritten namespaces."""
+        self.cache.set("idle:old", "value", ttl=1, size=10)
+        self.cache.set("busy:fresh", "value")
+        time.sleep(2.1)
+        
+        assert self.cache.purge_expired() == 1
+        assert self.cache.purge_expired() == 0
+        assert self.cache.namespace_usage() == {"busy": 0}
+        assert self.cache.peek("idle:old") == (None, False)
@@ -0,0 +1,80 @@
+"""
+Unit tests for ETag revalidation of the read endpoints.
+"""
+from fastapi.testclient import TestClient
+from backend.app.main import app
+from backend.app.services.cache_service import cache_service
+from backend.app.services.sheets_service import sheets_service
+
+
+class TestConditionalRequests:
+    """Test cases for ETag and If-None-Match handling."""
+    
+    def setup_method(self):
+        """Set up a test client."""
+        cache_service.clear()
+        self.client = TestClient(app)
+    
+    def teardown_method(self):
+        """Clean up the cache."""
+        cache_service.clear()
+    
+    def test_responses_carry_etags(self):
+        """Test that categories and activities are tagged and marked for revalidation."""
+        for url in ("/api/categories", "/api/activities?category=Food"):
+            response = self.client.get(url)
+            assert response.status_code == 200
+            assert response.headers["ETag"].startswith('"')
+            assert response.headers["Cache-Control"] == "no-cache"
+    
+    def test_matching_etag_returns_304(self):
+        """Test that a current copy is confirmed without a body."""
+        first = self.client.get("/api/activities", params={"category": "Food"})
+        etag = first.headers["ETag"]
+        
+        response = self.client.get(
+            "/api/activities",
+            params={"category": "Food"},
+            headers={"If-None-Match": f'W/"other", {etag}'}
+        )
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["ETag"] == etag
+        
+        response = self.client.get("/api/categories", headers={"If-None-Match": "*"})
+        assert response.status_code == 304
+    
+    def test_etag_depends_on_content(self):
+        """Test that different results get different tags."""
+        all_food = self.client.get("/api/activities", params={"category": "Food"})
+        cheap_food = self.client.get("/api/activities", params={"category": "Food", "price_level": "$"})
+        assert all_food.json() != cheap_food.json()
+        assert all_food.headers["ETag"] != cheap_food.headers["ETag"]
+        
+        response = self.client.get(
+            "/api/activities",
+            params={"category": "Food", "price_level": "$"},
+            headers={"If-None-Match": all_food.headers["ETag"]}
+        )
+        assert response.status_code == 200
+        assert response.json() == cheap_food.json()
+    
+    def test_changed_snapshot_changes_etag(self):
+        """Test that an update to the category invalidates the old tag."""
+        first = self.client.get("/api/activities", params={"category": "Food"})
+        
+        snapshot = sheets_service.cached_snapshots(["Food"])["Food"]
+        cache_service.set(
+            sheets_service._snapshot_key("Food"),
+            snapshot.with_updates({"Pizza Place": {"notes": "New oven"}}),
+            ttl=3600
+        )
+        
+        response = self.client.get(
+            "/api/activities",
+            params={"category": "Food"},
+            headers={"If-None-Match": first.headers["ETag"]}
+        )
+        assert response.status_code == 200
+        assert "New oven" in [activity["notes"] for activity in response.json()]
+        assert response.headers["ETag"] != first.headers["ETag"]
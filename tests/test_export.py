@@ -0,0 +1,79 @@
+"""
+Unit tests for the NDJSON activity export.
+"""
+import json
+from fastapi.testclient import TestClient
+from backend.app.api import routes
+from backend.app.main import app
+from backend.app.models import Activity, PriceLevel
+from backend.app.services.admission import admission
+from backend.app.services.cache_service import cache_service
+from backend.app.services.sheets_service import sheets_service
+
+
+def parse_ndjson(text):
+    """Parse an NDJSON body into activities."""
+    return [Activity(**json.loads(line)) for line in text.splitlines()]
+
+
+class TestExport:
+    """Test cases for /api/activities/export."""
+    
+    def setup_method(self):
+        """Set up a test client."""
+        cache_service.clear()
+        admission.configure()
+        self.client = TestClient(app)
+    
+    def teardown_method(self):
+        """Clean up the cache."""
+        cache_service.clear()
+    
+    def test_exports_every_category(self):
+        """Test that all categories are exported in category order, then sheet order."""
+        response = self.client.get("/api/activities/export")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        
+        exported = parse_ndjson(response.text)
+        expected = [
+            activity
+            for category in sheets_service.get_categories()
+            for activity in sheets_service.get_category_snapshot(category.sheet_name).activities
+        ]
+        assert exported == expected
+    
+    def test_exports_selected_categories_in_order(self):
+        """Test that repeated category parameters select and order the export."""
+        response = self.client.get("/api/activities/export", params=[("category", "Fun"), ("category", "Food")])
+        assert response.status_code == 200
+        
+        categories = [activity.category for activity in parse_ndjson(response.text)]
+        assert categories == ["Fun"] * 4 + ["Food"] * 4
+    
+    def test_chunks_hold_whole_lines(self, monkeypatch):
+        """Test that chunks split the output on line boundaries."""
+        monkeypatch.setattr(routes, "EXPORT_CHUNK_SIZE", 3)
+        activities = [Activity(name=f"A{i}", price_level=PriceLevel.FREE, category="Food") for i in range(7)]
+        
+        chunks = list(routes._ndjson_chunks(iter(activities)))
+        assert [chunk.count("\n") for chunk in chunks] == [3, 3, 1]
+        assert parse_ndjson("".join(chunks)) == activities
+    
+    def test_unknown_category_is_rejected_before_streaming(self):
+        """Test that an unknown category gets a 404 and frees the admission slot."""
+        response = self.client.get("/api/activities/export", params=[("category", "Food"), ("category", "Fod")])
+        assert response.status_code == 404
+        assert response.json()["detail"] == "Unknown categories: Fod"
+        assert admission.limiter("export").active == 0
+    
+    def test_sheets_failure_is_reported_before_streaming(self, monkeypatch):
+        """Test that a failure loading the first category gets a 500, not a cut-off stream."""
+        def failing(category):
+            raise RuntimeError("Sheets is down")
+        monkeypatch.setattr(sheets_service, "get_category_snapshot", failing)
+        
+        response = self.client.get("/api/activities/export", params={"category": "Food"})
+        assert response.status_code == 500
+        assert "Sheets is down" in response.json()["detail"]
+        assert admission.limiter("export").active == 0
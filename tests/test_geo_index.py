@@ -0,0 +1,236 @@
+"""
+Unit tests for the spatial index, proximity filters and geocoding.
+"""
+import httpx
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from backend.app.main import app
+from backend.app.models import Activity, ActivityFilter, ActivityRequest, PriceLevel
+from backend.app.services.admission import admission
+from backend.app.services.cache_service import cache_service
+from backend.app.services.geo_index import GeoIndex, haversine_km, parse_point
+from backend.app.services.geocoding import CachingGeocoder
+from backend.app.services.sheets_service import GoogleSheetsService, sheets_service
+from backend.app.services.snapshot import CategorySnapshot
+from backend.app.services.visit_log import VisitLog
+
+
+class StubGeocoder:
+    """Offline geocoder answering from a fixed table."""
+    
+    def __init__(self, places):
+        self.places = places
+        self.queries = []
+    
+    def geocode(self, query):
+        self.queries.append(query)
+        return self.places.get(query)
+
+
+def located(name, latitude, longitude, address=None):
+    """Create a test activity with coordinates."""
+    return Activity(
+        name=name,
+        price_level=PriceLevel.MEDIUM,
+        category="Food",
+        address=address,
+        latitude=latitude,
+        longitude=longitude
+    )
+
+
+class TestGeoIndex:
+    """Test cases for GeoIndex."""
+    
+    def test_matches_brute_force(self):
+        """Test that radius queries find exactly the points within the radius."""
+        rng = np.random.default_rng(7)
+        latitude = rng.uniform(-85, 85, 5000)
+        longitude = rng.uniform(-180, 180, 5000)
+        latitude[::10] = np.nan
+        index = GeoIndex(latitude, longitude, cell_degrees=0.5)
+        assert len(index) == 4500
+        
+        for _ in range(200):
+            center = (rng.uniform(-89, 89), rng.uniform(-180, 180))
+            radius = rng.choice([5.0, 100.0, 1000.0, 5000.0])
+            distances = haversine_km(latitude, longitude, *center)
+            expected = np.flatnonzero(distances <= radius)
+            assert np.array_equal(index.within(*center, radius), expected)
+    
+    def test_antimeridian_and_poles(self):
+        """Test queries whose circle wraps around the grid edges."""
+        latitude = np.array([0.0, 0.0, 89.9, -89.9])
+        longitude = np.array([179.99, -179.99, 10.0, -170.0])
+        index = GeoIndex(latitude, longitude)
+        
+        assert list(index.within(0.0, 180.0, 5)) == [0, 1]
+        assert list(index.within(89.95, -170.0, 20)) == [2]
+        assert list(index.within(-90.0, 0.0, 20)) == [3]
+    
+    def test_parse_point(self):
+        """Test parsing coordinate pairs."""
+        assert parse_point("47.6, -122.3") == (47.6, -122.3)
+        assert parse_point("Pike Place Market") is None
+        assert parse_point("Seattle, WA") is None
+        with pytest.raises(ValueError):
+            parse_point("120,0")
+
+
+class TestProximityFilters:
+    """Test cases for near/radius filters on snapshots."""
+    
+    def setup_method(self):
+        """Set up activities around Seattle."""
+        self.snapshot = CategorySnapshot("Food", [
+            located("Far", 47.75, -122.30),
+            located("Nowhere", None, None),
+            located("Near", 47.61, -122.34),
+            located("Nearest", 47.6062, -122.3321),
+        ])
+    
+    def names(self, activities):
+        """Get activity names for easy comparison."""
+        return [activity.name for activity in activities]
+    
+    def test_select_sorts_nearest_first(self):
+        """Test that proximity results exclude far rows and are ordered by distance."""
+        filters = ActivityFilter(near="47.6062,-122.3321", radius=2)
+        assert self.names(self.snapshot.select(filters=filters)) == ["Nearest", "Near"]
+        assert self.snapshot.count(filters=filters) == 2
+    
+    def test_default_radius(self):
+        """Test that near without radius uses the default radius."""
+        filters = ActivityFilter(near="47.6062,-122.3321")
+        assert self.names(self.snapshot.select(filters=filters)) == ["Nearest", "Near"]
+    
+    def test_sample_respects_radius(self):
+        """Test that sampling draws only from activities in range."""
+        request = ActivityRequest(category="Food", near="47.6062,-122.3321", radius=2, limit=5)
+        picked = self.snapshot.sample(5, filters=request)
+        assert sorted(self.names(picked)) == ["Near", "Nearest"]
+    
+    def test_invalid_proximity_filters(self):
+        """Test that place names and a radius alone are rejected by the snapshot."""
+        with pytest.raises(ValueError):
+            self.snapshot.select(filters=ActivityFilter(near="Seattle"))
+        with pytest.raises(ValueError):
+            self.snapshot.select(filters=ActivityFilter(radius=3))
+
+
+class TestGeocoding:
+    """Test cases for coordinate parsing and pluggable geocoding."""
+    
+    def setup_method(self):
+        """Set up a mock-data service with a stub geocoder."""
+        cache_service.clear()
+        self.geocoder = StubGeocoder({"1 Pike St": (47.6097, -122.3422)})
+        self.log = VisitLog()
+        self.service = GoogleSheetsService(journal=self.log, geocoder=self.geocoder)
+    
+    def teardown_method(self):
+        """Clean up the cache."""
+        cache_service.clear()
+    
+    def test_parse_coordinates(self):
+        """Test reading the Latitude and Longitude columns."""
+        row = ["Bistro", "$$"] + [""] * 9 + ["47.6", "-122.3"]
+        activity = self.service._parse_activity_row(row, "Food")
+        assert (activity.latitude, activity.longitude) == (47.6, -122.3)
+        
+        for coordinates in (["47.6", ""], ["north", "-122.3"], ["95", "10"]):
+            activity = self.service._parse_activity_row(row[:11] + coordinates, "Food")
+            assert activity.latitude is None and activity.longitude is None
+    
+    def test_geocode_activities(self):
+        """Test that addresses are geocoded once and queued for writing."""
+        self.service.get_categories()
+        snapshot = self.service.get_category_snapshot("Food")
+        activities = list(snapshot.activities)
+        activities[0] = activities[0].model_copy(update={"address": "1 Pike St"})
+        activities[1] = activities[1].model_copy(update={"address": "Unknown Rd"})
+        cache_service.set(self.service._snapshot_key("Food"), CategorySnapshot("Food", activities))
+        
+        assert self.service.geocode_activities() == 1
+        assert self.service.geocode_activities() == 0
+        assert self.geocoder.queries == ["1 Pike St", "Unknown Rd"]
+        
+        nearby = self.service.get_category_snapshot("Food").select(
+            filters=ActivityFilter(near="47.61,-122.34", radius=1)
+        )
+        assert [a.name for a in nearby] == [activities[0].name]
+        assert self.log.pending_for("Food") == {
+            activities[0].name: {"latitude": 47.6097, "longitude": -122.3422}
+        }
+    
+    def test_caching_geocoder_remembers_misses(self):
+        """Test that the cache normalizes queries and caches misses."""
+        geocoder = CachingGeocoder(self.geocoder, max_size=1)
+        assert geocoder.geocode("1  pike st") is None
+        assert geocoder.geocode("1 PIKE ST") is None
+        assert self.geocoder.queries == ["1  pike st"]
+        
+        assert geocoder.geocode("1 Pike St") is None
+        assert geocoder.geocode("Other") is None
+        assert len(self.geocoder.queries) == 2
+
+
+class TestProximityRoutes:
+    """Test cases for near/radius parameters in the API."""
+    
+    def setup_method(self):
+        """Set up a test client."""
+        cache_service.clear()
+        self.client = TestClient(app)
+    
+    def teardown_method(self):
+        """Clean up the cache."""
+        cache_service.clear()
+    
+    def test_coordinates_are_accepted(self):
+        """Test filtering by coordinates (mock activities have none)."""
+        response = self.client.get("/api/activities", params={"category": "Food", "near": "47.6,-122.3", "radius": 3})
+        assert response.status_code == 200
+        assert response.json() == []
+    
+    def test_unknown_place_is_rejected(self):
+        """Test that a place the geocoder cannot find gives a 400."""
+        response = self.client.post("/api/suggest", json={"category": "Food", "near": "Atlantis"})
+        assert response.status_code == 400
+        
+        response = self.client.get("/api/activities", params={"category": "Food", "near": "95,0"})
+        assert response.status_code == 400
+    
+    def test_geocoder_errors_give_502(self, monkeypatch):
+        """Test that an unreachable geocoder is reported as a bad gateway."""
+        class FailingGeocoder:
+            def geocode(self, query):
+                raise httpx.ConnectError("connection refused")
+        monkeypatch.setattr(sheets_service, "geocoder", FailingGeocoder())
+        
+        response = self.client.post("/api/suggest", json={"category": "Food", "near": "Pike Place"})
+        assert response.status_code == 502
+        assert "connection refused" in response.json()["detail"]
+    
+    def test_geocoding_is_admission_controlled(self, monkeypatch):
+        """Test that place lookups are shed under overload instead of queueing."""
+        geocoder = StubGeocoder({"Pike Place": (47.6097, -122.3422)})
+        monkeypatch.setattr(sheets_service, "geocoder", geocoder)
+        admission.configure(route_limits={"geocode": 0}, max_queue=0)
+        try:
+            response = self.client.get("/api/activities", params={"category": "Food", "near": "Pike Place"})
+            assert response.status_code == 503
+            assert "Retry-After" in response.headers
+            assert geocoder.queries == []
+            
+            # Coordinates need no lookup and are not limited
+            response = self.client.get("/api/activities", params={"category": "Food", "near": "47.6,-122.3"})
+            assert response.status_code == 200
+        finally:
+            admission.configure()
+        
+        response = self.client.get("/api/activities", params={"category": "Food", "near": "Pike Place"})
+        assert response.status_code == 200
+        assert geocoder.queries == ["Pike Place"]
+        assert admission.stats()["geocode"]["active"] == 0
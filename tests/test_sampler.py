@@ -0,0 +1,155 @@
+"""
+Unit tests for the weighted suggestion sampler.
+"""
+import random
+import pytest
+import numpy as np
+from collections import Counter
+from datetime import date, timedelta
+from backend.app.models import Activity, ActivityFilter, PriceLevel
+from backend.app.services.sampler import (
+    MIN_RECENCY_WEIGHT,
+    WeightedSampler,
+    recency_weights,
+    weighted_sample_without_replacement
+)
+from backend.app.services.snapshot import CategorySnapshot
+
+
+def make_activity(name, price_level, last_visit_date=None, last_bill_price=None):
+    """Create a test activity in the Food category."""
+    return Activity(
+        name=name,
+        price_level=price_level,
+        category="Food",
+        last_visit_date=last_visit_date,
+        last_bill_price=last_bill_price
+    )
+
+
+class TestRecencyWeights:
+    """Test cases for recency weights."""
+    
+    def test_never_visited_gets_full_weight(self):
+        """Test that never-visited activities get weight 1."""
+        weights = recency_weights(np.array([np.nan]), 1000)
+        assert weights[0] == 1.0
+    
+    def test_recent_visits_are_down_weighted(self):
+        """Test that weights grow with time since the last visit."""
+        weights = recency_weights(np.array([1000.0, 999.0, 970.0, 600.0]), 1000)
+        assert weights[0] == MIN_RECENCY_WEIGHT
+        assert weights[1] < weights[2] < weights[3] < 1.0
+        assert weights[2] == pytest.approx(0.5)
+
+
+class TestWeightedSampler:
+    """Test cases for WeightedSampler."""
+    
+    def setup_method(self):
+        """Seed both generators the sampler draws from."""
+        random.seed(1)
+        np.random.seed(1)
+
+    def test_draws_are_distinct_and_in_rank(self):
+        """Test that draws never repeat and respect eligible ranks."""
+        ranks = np.array([0, 1, 1, 2, 2, 2, 3, 4] * 10, dtype=np.int8)
+        sampler = WeightedSampler(ranks, np.ones(len(ranks)), 5)
+        
+        picked = sampler.sample(5, ranks=[2])
+        assert len(picked) == len(set(picked)) == 5
+        assert all(ranks[i] == 2 for i in picked)
+    
+    def test_limit_larger_than_candidates(self):
+        """Test asking for more activities than exist in a rank."""
+        ranks = np.array([0, 1, 1, 2], dtype=np.int8)
+        sampler = WeightedSampler(ranks, np.ones(4), 5)
+        assert sorted(sampler.sample(10, ranks=[1])) == [1, 2]
+        assert sampler.sample(3, ranks=[4]) == []
+    
+    def test_sampling_follows_weights(self):
+        """Test that heavier activities are drawn more often."""
+        ranks = np.zeros(100, dtype=np.int8)
+        weights = np.full(100, 0.05)
+        weights[:10] = 1.0
+        sampler = WeightedSampler(ranks, weights, 5)
+        
+        counts = Counter(i for _ in range(500) for i in sampler.sample(1))
+        heavy = sum(counts[i] for i in range(10))
+        assert heavy > 250
+    
+    def test_skewed_weights_still_fill_the_limit(self):
+        """Test that rows that are never redrawn still complete a sparse draw."""
+        ranks = np.zeros(100, dtype=np.int8)
+        weights = np.full(100, 1e-9)
+        weights[0] = 1.0
+        sampler = WeightedSampler(ranks, weights, 5)
+        
+        picked = sampler.sample(10)
+        assert len(picked) == len(set(picked)) == 10
+        assert picked[0] == 0
+    
+    def test_favored_ranks_are_boosted(self):
+        """Test that favoured price ranks are drawn more often."""
+        ranks = np.array([0] * 50 + [1] * 50, dtype=np.int8)
+        sampler = WeightedSampler(ranks, np.ones(100), 5)
+        
+        counts = Counter(ranks[i] for _ in range(500) for i in sampler.sample(1, favored_ranks=[1]))
+        assert counts[1] > counts[0] * 2
+
+
+class TestWeightedSampleWithoutReplacement:
+    """Test cases for the vectorized fallback sampler."""
+    
+    def test_returns_distinct_indices(self):
+        """Test that all drawn indices are distinct candidates."""
+        indices = np.array([3, 5, 7, 9])
+        picked = weighted_sample_without_replacement(indices, np.ones(4), 3)
+        assert len(set(picked)) == 3
+        assert set(picked) <= {3, 5, 7, 9}
+    
+    def test_empty_candidates(self):
+        """Test sampling from no candidates."""
+        assert weighted_sample_without_replacement(np.array([], dtype=int), np.array([]), 3) == []
+
+
+class TestSnapshotSample:
+    """Test cases for CategorySnapshot.sample."""
+    
+    def setup_method(self):
+        """Set up test fixtures and seed the sampler's generators."""
+        random.seed(1)
+        np.random.seed(1)
+        today = date.today()
+        self.snapshot = CategorySnapshot("Food", [
+            make_activity("Yesterday", PriceLevel.LOW, (today - timedelta(days=1)).isoformat(), 20.0),
+            make_activity("Last Year", PriceLevel.LOW, (today - timedelta(days=365)).isoformat(), 25.0),
+            make_activity("Never", PriceLevel.MEDIUM, None, 60.0),
+            make_activity("Picnic", PriceLevel.FREE),
+        ])
+    
+    def test_recency_weighting(self):
+        """Test that recently visited activities come up less often."""
+        counts = Counter(
+            a.name for _ in range(400) for a in self.snapshot.sample(1, PriceLevel.LOW)
+        )
+        assert counts["Last Year"] > counts["Yesterday"] * 3
+    
+    def test_uniform_sampling(self):
+        """Test that recency weighting can be disabled."""
+        counts = Counter(
+            a.name
+            for _ in range(400)
+            for a in self.snapshot.sample(1, PriceLevel.LOW, recency_weighted=False)
+        )
+        assert counts["Yesterday"] > 100
+    
+    def test_price_range_and_row_filters(self):
+        """Test sampling with price range and bill filters applied."""
+        filters = ActivityFilter(min_price_level=PriceLevel.LOW)
+        names = {a.name for a in self.snapshot.sample(10, filters=filters)}
+        assert names == {"Yesterday", "Last Year", "Never"}
+        
+        filters = ActivityFilter(max_bill_price=30)
+        names = {a.name for a in self.snapshot.sample(10, filters=filters)}
+        assert names == {"Yesterday", "Last Year"}
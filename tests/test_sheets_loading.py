@@ -0,0 +1,355 @@
+"""
+Unit tests for loading worksheets through the Sheets API.
+"""
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+from backend.app.services import sheets_service as sheets_module
+from backend.app.services.cache_service import cache_service
+from backend.app.services.sheets_service import GoogleSheetsService, UnknownCategory
+from backend.app.services.snapshot_events import SnapshotEventBus
+from backend.app.services.visit_log import VisitLog
+
+
+HEADER = ['Name', 'Price', 'Description']
+
+
+class FakeCall:
+    """Request object whose execute() runs a function."""
+    
+    def __init__(self, func):
+        self.func = func
+    
+    def execute(self):
+        return self.func()
+
+
+class FakeSheetsApi:
+    """
+    In-memory stand-in for the Sheets and Drive API clients.
+    
+    Worksheets are lists of rows. Like the real API, new worksheets have
+    a 1000-row grid, value reads omit trailing empty rows and unknown
+    worksheets fail the whole request.
+    """
+    
+    def __init__(self, sheets, version="1", grid_rows=None, delay=None):
+        self.sheets = sheets
+        self.version = version
+        self.grid_rows = grid_rows or {}
+        # Seconds a value read of a range takes
+        self.delay = delay or (lambda a1_range: 0)
+        self.calls = []
+        self._lock = threading.Lock()
+    
+    def client(self, service_name='sheets', version='v4'):
+        return self
+    
+    def spreadsheets(self):
+        return self
+    
+    def values(self):
+        return FakeValues(self)
+    
+    def files(self):
+        return FakeFiles(self)
+    
+    def get(self, spreadsheetId, fields):
+        self._record('properties')
+        return FakeCall(lambda: {'sheets': [
+            {'properties': {
+                'title': title,
+                'gridProperties': {'rowCount': self.grid_rows.get(title, max(len(rows), 1000))}
+            }}
+            for title, rows in self.sheets.items()
+        ]})
+    
+    def read(self, a1_range):
+        """Get the values of an A1 range such as Food!A1:M500, Food!A501:M, Food!A:M or Food!A:A."""
+        time.sleep(self.delay(a1_range))
+        title, cells = a1_range.split('!')
+        if title not in self.sheets:
+            raise HttpError(httplib2.Response({'status': 400}), b'Unable to parse range')
+        rows = self.sheets[title]
+        match = re.fullmatch(r'A(\d+):[A-Z]+(\d*)', cells)
+        if match:
+            rows = rows[int(match.group(1)) - 1:int(match.group(2)) if match.group(2) else None]
+        if cells == 'A:A':
+            rows = [row[:1] if row and row[0] else [] for row in rows]
+        rows = list(rows)
+        while rows and not rows[-1]:
+            rows.pop()
+        return rows
+    
+    def _record(self, call):
+        with self._lock:
+            self.calls.append(call)
+
+
+class FakeValues:
+    """Values resource of FakeSheetsApi."""
+    
+    def __init__(self, api):
+        self.api = api
+    
+    def get(self, spreadsheetId, range, **kwargs):
+        self.api._record(('get', range))
+        return FakeCall(lambda: {'values': self.api.read(range)})
+    
+    def batchGet(self, spreadsheetId, ranges, **kwargs):
+        self.api._record(('batchGet', tuple(ranges)))
+        return FakeCall(lambda: {'valueRanges': [{'values': self.api.read(r)} for r in ranges]})
+
+
+class FakeFiles:
+    """Drive files resource of FakeSheetsApi."""
+    
+    def __init__(self, api):
+        self.api = api
+    
+    def get(self, fileId, fields, supportsAllDrives):
+        self.api._record('version')
+        return FakeCall(lambda: {'version': self.api.version})
+
+
+def activity_rows(count, prefix="Activity"):
+    """Build a worksheet with a header and count activity rows."""
+    return [HEADER] + [[f"{prefix} {i}", '$$', f"Description {i}"] for i in range(count)]
+
+
+def connected_service(api):
+    """Create a service reading from a fake API."""
+    service = GoogleSheetsService(
+        tenant_id="loader-test",
+        journal=VisitLog(),
+        events=SnapshotEventBus()
+    )
+    service.spreadsheet_id = "spreadsheet"
+    service._clients = api
+    service._initialized = True
+    return service
+
+
+class TestSnapshotRevalidation:
+    """Test cases for revalidating expired snapshots with the change probe."""
+    
+    def setup_method(self):
+        """Set up a service over one small worksheet."""
+        cache_service.clear()
+        self.api = FakeSheetsApi({'Food': activity_rows(3)})
+        self.service = connected_service(self.api)
+    
+    def teardown_method(self):
+        """Clean up the cache."""
+        cache_service.clear()
+    
+    def expire(self, category):
+        """Expire a cached snapshot."""
+        cache_service.touch(self.service._snapshot_key(category), ttl=-1)
+    
+    def test_unchanged_snapshot_is_kept(self):
+        """Test that an unchanged worksheet built today is not reread."""
+        snapshot = self.service.get_category_snapshot('Food')
+        self.expire('Food')
+        self.api.calls.clear()
+        
+        assert self.service.get_category_snapshot('Food') is snapshot
+        assert self.api.calls == ['version']
+    
+    def test_unchanged_snapshot_is_rebuilt_on_a_new_day(self):
+        """Test that date-dependent values are recomputed without rereading the sheet."""
+        snapshot = self.service.get_category_snapshot('Food')
+        snapshot.built_at = datetime.now() - timedelta(days=1)
+        self.expire('Food')
+        self.api.calls.clear()
+        
+        rebuilt = self.service.get_category_snapshot('Food')
+        assert rebuilt is not snapshot
+        assert rebuilt.built_at.date() == datetime.now().date()
+        assert rebuilt.activities == snapshot.activities
+        assert self.api.calls == ['version']
+        assert self.service.cached_snapshots(['Food'])['Food'] is rebuilt
+    
+    def test_changed_version_rereads_the_sheet(self):
+        """Test that a new file version triggers a refetch."""
+        self.service.get_category_snapshot('Food')
+        self.expire('Food')
+        self.api.version = "2"
+        self.api.sheets['Food'] = activity_rows(4)
+        
+        assert len(self.service.get_category_snapshot('Food')) == 4
+
+
+class TestRowBlocks:
+    """Test cases for reading large worksheets in row blocks."""
+    
+    def setup_method(self):
+        """Clean the cache."""
+        cache_service.clear()
+    
+    def teardown_method(self):
+        """Clean up the cache."""
+        cache_service.clear()
+    
+    def test_category_range(self):
+        """Test A1 ranges for whole, bounded and open-ended reads."""
+        service = connected_service(FakeSheetsApi({}))
+        assert service._category_range('Food') == 'Food!A:M'
+        assert service._category_range('Food', 1, 500) == 'Food!A1:M500'
+        assert service._category_range('Food', 501) == 'Food!A501:M'
+    
+    def test_get_row_count(self):
+        """Test that grid row counts are fetched once and cached."""
+        api = FakeSheetsApi({'Food': activity_rows(3), 'Fun': activity_rows(3)}, grid_rows={'Fun': 5000})
+        service = connected_service(api)
+        
+        assert service._get_row_count('Food') == 1000
+        assert service._get_row_count('Fun') == 5000
+        assert service._get_row_count('Missing') is None
+        assert api.calls == ['properties']
+    
+    def test_fetch_row_block(self):
+        """Test that a block read returns the rows of its range without trailing blanks."""
+        rows = activity_rows(5) + [[], []]
+        service = connected_service(FakeSheetsApi({'Food': rows}))
+        
+        assert service._fetch_row_block('Food', 2, 3) == rows[1:3]
+        assert service._fetch_row_block('Food', 5, None) == rows[4:6]
+        assert service._fetch_row_block('Food', 7, 8) == []
+    
+    def test_blocks_are_merged_in_sheet_order(self, monkeypatch):
+        """Test that blocks finishing out of order are merged in sheet order."""
+        monkeypatch.setattr(sheets_module, 'ROW_BLOCK_SIZE', 10)
+        rows = activity_rows(54)
+        # The first block is the slowest to arrive
+        api = FakeSheetsApi({'Food': rows}, grid_rows={'Food': 55}, delay=lambda r: 0.05 if r == 'Food!A1:M10' else 0)
+        service = connected_service(api)
+        
+        activities = service._fetch_category_activities('Food')
+        assert [a.name for a in activities] == [f"Activity {i}" for i in range(54)]
+        block_reads = sorted(call[1] for call in api.calls if call[0] == 'get')
+        assert block_reads == sorted(['Food!A:A', 'Food!A1:M10', 'Food!A11:M20', 'Food!A21:M30',
+                                      'Food!A31:M40', 'Food!A41:M50', 'Food!A51:M'])
+    
+    def test_blank_rows_do_not_end_the_read(self, monkeypatch):
+        """Test that a run of blank rows longer than a block is skipped, not treated as the end."""
+        monkeypatch.setattr(sheets_module, 'ROW_BLOCK_SIZE', 10)
+        monkeypatch.setattr(sheets_module, 'FETCH_WORKERS', 1)
+        rows = activity_rows(5) + [[]] * 25 + activity_rows(5, prefix="Late")[1:]
+        api = FakeSheetsApi({'Food': rows}, grid_rows={'Food': len(rows)})
+        service = connected_service(api)
+        
+        names = [a.name for a in service._fetch_category_activities('Food')]
+        assert names == [f"Activity {i}" for i in range(5)] + [f"Late {i}" for i in range(5)]
+        assert sorted(call[1] for call in api.calls if call[0] == 'get') == ['Food!A1:M10', 'Food!A31:M', 'Food!A:A']
+    
+    def test_empty_grid_rows_are_not_read(self, monkeypatch):
+        """Test that a large, mostly empty grid is read in one block next to the name column."""
+        monkeypatch.setattr(sheets_module, 'ROW_BLOCK_SIZE', 10)
+        api = FakeSheetsApi({'Food': activity_rows(8)}, grid_rows={'Food': 1000})
+        service = connected_service(api)
+        
+        assert len(service._fetch_category_activities('Food')) == 8
+        assert sorted(call[1] for call in api.calls if call[0] == 'get') == ['Food!A1:M10', 'Food!A:A']
+    
+    def test_shrunk_sheet_stops_the_read(self, monkeypatch):
+        """Test that no more blocks are requested once one comes back short."""
+        monkeypatch.setattr(sheets_module, 'ROW_BLOCK_SIZE', 10)
+        monkeypatch.setattr(sheets_module, 'FETCH_WORKERS', 1)
+        api = FakeSheetsApi({'Food': activity_rows(44)}, grid_rows={'Food': 45})
+        service = connected_service(api)
+        original_named_rows = service._fetch_named_rows
+        
+        def named_rows_then_delete(category):
+            named_rows = original_named_rows(category)
+            api.sheets['Food'] = activity_rows(14)
+            return named_rows
+        monkeypatch.setattr(service, '_fetch_named_rows', named_rows_then_delete)
+        
+        assert len(service._fetch_category_activities('Food')) == 14
+        assert sorted(call[1] for call in api.calls if call[0] == 'get') == ['Food!A11:M20', 'Food!A1:M10', 'Food!A:A']
+    
+    def test_rows_added_after_the_count_are_read(self, monkeypatch):
+        """Test that the last block reads to the end of the sheet."""
+        monkeypatch.setattr(sheets_module, 'ROW_BLOCK_SIZE', 10)
+        api = FakeSheetsApi({'Food': activity_rows(24)}, grid_rows={'Food': 25})
+        service = connected_service(api)
+        assert len(service._fetch_category_activities('Food')) == 24
+        
+        api.sheets['Food'] = activity_rows(40)
+        assert len(service._fetch_category_activities('Food')) == 40
+
+
+class TestMultiCategoryLoading:
+    """Test cases for loading several categories together."""
+    
+    def setup_method(self):
+        """Set up a service over three worksheets."""
+        cache_service.clear()
+        self.api = FakeSheetsApi({
+            'Food': activity_rows(3, prefix="Food"),
+            'Fun': activity_rows(2, prefix="Fun"),
+            'Outdoor': activity_rows(4, prefix="Outdoor"),
+        })
+        self.service = connected_service(self.api)
+    
+    def teardown_method(self):
+        """Clean up the cache."""
+        cache_service.clear()
+    
+    def test_cold_categories_share_one_batch_get(self):
+        """Test that cold categories are read in one call and matched to their ranges."""
+        snapshots = self.service.get_category_snapshots(['Outdoor', 'Food', 'Outdoor'])
+        
+        assert list(snapshots) == ['Outdoor', 'Food']
+        assert [a.name for a in snapshots['Outdoor'].activities] == [f"Outdoor {i}" for i in range(4)]
+        assert [a.name for a in snapshots['Food'].activities] == [f"Food {i}" for i in range(3)]
+        assert [call for call in self.api.calls if call[0] == 'batchGet'] == [
+            ('batchGet', ('Outdoor!A1:M', 'Food!A1:M'))
+        ]
+    
+    def test_cached_categories_are_not_reread(self):
+        """Test that only categories missing from the cache are fetched."""
+        self.service.get_category_snapshots(['Food'])
+        self.api.calls.clear()
+        
+        snapshots = self.service.get_category_snapshots(['Food', 'Fun'])
+        assert len(snapshots['Fun']) == 2
+        assert self.api.calls == ['version', ('batchGet', ('Fun!A1:M',))]
+    
+    def test_unknown_categories_fail_before_reading(self):
+        """Test that misspelled categories are reported without reading any data."""
+        with pytest.raises(UnknownCategory) as error:
+            self.service.get_category_snapshots(['Food', 'Fod', 'Fnu'])
+        
+        assert error.value.categories == ['Fod', 'Fnu']
+        assert not [call for call in self.api.calls if call[0] == 'batchGet']
+        assert self.service.cached_snapshots(['Food']) is None
+    
+    def test_warming_drops_deleted_worksheets(self):
+        """Test that a deleted worksheet does not stop the others from being warmed."""
+        self.service.get_category_snapshots(['Food', 'Fun'])
+        del self.api.sheets['Fun']
+        cache_service.delete(self.service._cache_key("categories"))
+        for category in ('Food', 'Fun'):
+            cache_service.touch(self.service._snapshot_key(category), ttl=-1)
+        
+        assert self.service.warm_popular_snapshots() == ['Food']
+        assert cache_service.time_to_live(self.service._snapshot_key('Food')) > 0
+        assert cache_service.time_to_live(self.service._snapshot_key('Fun')) is None
+    
+    def test_missing_value_range_is_an_error(self, monkeypatch):
+        """Test that a short batchGet response is reported instead of losing categories."""
+        original_batch_get = FakeValues.batchGet
+        
+        def short_batch_get(values, spreadsheetId, ranges, **kwargs):
+            return original_batch_get(values, spreadsheetId, ranges[:1], **kwargs)
+        monkeypatch.setattr(FakeValues, 'batchGet', short_batch_get)
+        
+        with pytest.raises(RuntimeError, match="1 ranges for 2 categories"):
+            self.service.get_category_snapshots(['Food', 'Fun'])
@@ -0,0 +1,88 @@
+"""
+Unit tests for the pooled Sheets transport.
+"""
+import pytest
+import threading
+from backend.app.services.sheets_transport import (
+    SharedCredentials,
+    SheetsClientPool,
+    get_discovery_document
+)
+
+
+class FakeCredentials:
+    """Minimal stand-in for google-auth credentials."""
+    
+    def __init__(self):
+        self.token = None
+        self.refresh_count = 0
+        self._lock = threading.Lock()
+    
+    @property
+    def valid(self):
+        return self.token is not None
+    
+    def refresh(self, request):
+        with self._lock:
+            self.refresh_count += 1
+            self.token = f"token-{self.refresh_count}"
+    
+    def apply(self, headers, token=None):
+        headers["authorization"] = f"Bearer {self.token}"
+
+
+class TestSharedCredentials:
+    """Test cases for SharedCredentials."""
+    
+    def test_concurrent_refresh_happens_once(self):
+        """Test that threads racing on an expired token refresh it once."""
+        inner = FakeCredentials()
+        shared = SharedCredentials(inner)
+        barrier = threading.Barrier(8)
+        
+        def worker():
+            barrier.wait()
+            headers = {}
+            shared.before_request(None, "GET", "https://example.com", headers)
+            assert headers["authorization"] == "Bearer token-1"
+        
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert inner.refresh_count == 1
+    
+    def test_explicit_refresh_after_reuse_window(self):
+        """Test that a forced refresh is not swallowed once the window passed."""
+        inner = FakeCredentials()
+        shared = SharedCredentials(inner)
+        shared.refresh(None)
+        shared._last_refresh -= 60
+        shared.refresh(None)
+        assert inner.refresh_count == 2
+
+
+class TestSheetsClientPool:
+    """Test cases for SheetsClientPool."""
+    
+    def test_discovery_document_is_cached(self):
+        """Test that the bundled discovery document is parsed once."""
+        document = get_discovery_document("sheets", "v4")
+        assert document["name"] == "sheets"
+        assert get_discovery_document("sheets", "v4") is document
+    
+    def test_one_client_per_thread(self):
+        """Test that each thread gets its own client."""
+        pool = SheetsClientPool(FakeCredentials())
+        main_client = pool.client()
+        assert pool.client() is main_client
+        
+        clients = []
+        thread = threading.Thread(target=lambda: clients.append(pool.client()))
+        thread.start()
+        thread.join()
+        
+        assert clients[0] is not main_client
+        assert pool.client_count == 2
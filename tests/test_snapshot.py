@@ -0,0 +1,173 @@
+"""
+Unit tests for the category snapshot query engine.
+"""
+import pytest
+from datetime import date
+from backend.app.models import Activity, ActivityFilter, PriceLevel
+from backend.app.services.snapshot import CategorySnapshot, parse_visit_day, price_rank
+
+
+def make_activity(name, price_level, last_bill_price=None, last_visit_date=None):
+    """Create a test activity in the Food category."""
+    return Activity(
+        name=name,
+        price_level=price_level,
+        category="Food",
+        last_bill_price=last_bill_price,
+        last_visit_date=last_visit_date
+    )
+
+
+class TestCategorySnapshot:
+    """Test cases for CategorySnapshot."""
+    
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.snapshot = CategorySnapshot("Food", [
+            make_activity("Taco Stand", PriceLevel.LOW, 12.5, "2024-01-10"),
+            make_activity("Bistro", PriceLevel.MEDIUM, 45.0, "2024-06-01"),
+            make_activity("Steakhouse", PriceLevel.HIGH, 120.0),
+            make_activity("Picnic", PriceLevel.FREE),
+            make_activity("Tasting Menu", PriceLevel.LUXURY, 300.0, "2023-12-24"),
+        ])
+    
+    def names(self, activities):
+        """Get activity names for easy comparison."""
+        return [activity.name for activity in activities]
+    
+    def test_no_filters_returns_everything(self):
+        """Test that an unfiltered query returns all activities in order."""
+        assert self.snapshot.mask() is None
+        assert len(self.snapshot) == 5
+        assert self.names(self.snapshot.select()) == [
+            "Taco Stand", "Bistro", "Steakhouse", "Picnic", "Tasting Menu"
+        ]
+    
+    def test_exact_price_level(self):
+        """Test filtering by an exact price level."""
+        assert self.names(self.snapshot.select(PriceLevel.MEDIUM)) == ["Bistro"]
+        assert self.snapshot.count(PriceLevel.MEDIUM) == 1
+    
+    def test_price_level_range(self):
+        """Test filtering by a price level range."""
+        filters = ActivityFilter(min_price_level=PriceLevel.LOW, max_price_level=PriceLevel.HIGH)
+        assert self.names(self.snapshot.select(filters=filters)) == [
+            "Taco Stand", "Bistro", "Steakhouse"
+        ]
+    
+    def test_bill_ceiling_excludes_unknown_bills(self):
+        """Test that bill bounds only match activities with a recorded bill."""
+        filters = ActivityFilter(max_bill_price=100)
+        assert self.names(self.snapshot.select(filters=filters)) == ["Taco Stand", "Bistro"]
+        
+        filters = ActivityFilter(min_bill_price=100)
+        assert self.names(self.snapshot.select(filters=filters)) == ["Steakhouse", "Tasting Menu"]
+    
+    def test_last_visit_before_keeps_unvisited(self):
+        """Test the visited-before cutoff keeps never-visited activities."""
+        filters = ActivityFilter(last_visit_before=date(2024, 3, 1))
+        assert self.names(self.snapshot.select(filters=filters)) == [
+            "Taco Stand", "Steakhouse", "Picnic", "Tasting Menu"
+        ]
+    
+    def test_last_visit_after(self):
+        """Test the visited-after bound only matches visited activities."""
+        filters = ActivityFilter(last_visit_after=date(2024, 1, 1))
+        assert self.names(self.snapshot.select(filters=filters)) == ["Taco Stand", "Bistro"]
+    
+    def test_combined_predicates(self):
+        """Test that multiple predicates are combined with AND."""
+        filters = ActivityFilter(
+            max_price_level=PriceLevel.HIGH,
+            max_bill_price=200,
+            last_visit_before=date(2024, 3, 1)
+        )
+        assert self.names(self.snapshot.select(filters=filters)) == ["Taco Stand", "Steakhouse"]
+        assert self.snapshot.count(PriceLevel.LOW, filters) == 1
+    
+    def test_empty_snapshot(self):
+        """Test querying a snapshot without activities."""
+        snapshot = CategorySnapshot("Empty", [])
+        assert snapshot.select(PriceLevel.LOW) == []
+        assert snapshot.count() == 0
+
+
+class TestSnapshotHelpers:
+    """Test cases for snapshot helper functions."""
+    
+    def test_price_rank_order(self):
+        """Test that price ranks follow the PriceLevel order."""
+        assert price_rank(PriceLevel.FREE) == 0
+        assert price_rank("$$") == 2
+        assert price_rank(PriceLevel.LUXURY) == 4
+    
+    def test_parse_visit_day(self):
+        """Test parsing visit dates into day ordinals."""
+        assert parse_visit_day("2024-01-02") == date(2024, 1, 2).toordinal()
+        assert parse_visit_day(None) != parse_visit_day(None)  # NaN
+        assert parse_visit_day("last week") != parse_visit_day("last week")
+
+
+class TestSnapshotStats:
+    """Test cases for statistics precomputed at snapshot build time."""
+    
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.snapshot = CategorySnapshot("Food", [
+            make_activity("Taco Stand", PriceLevel.LOW, 10.0, "2024-01-10"),
+            make_activity("Burrito Bar", PriceLevel.LOW, 20.0),
+            make_activity("Bistro", PriceLevel.MEDIUM, None, "2024-06-01"),
+            make_activity("Picnic", PriceLevel.FREE),
+        ])
+    
+    def test_category_totals(self):
+        """Test category-level aggregates."""
+        stats = self.snapshot.stats
+        assert stats.category == "Food"
+        assert stats.total_found == 4
+        assert stats.avg_last_bill_price == 15.0
+        assert stats.visited_count == 2
+        assert stats.never_visited_count == 2
+    
+    def test_price_level_breakdown(self):
+        """Test per-price-level aggregates include every level."""
+        by_price = self.snapshot.stats.by_price_level
+        assert list(by_price) == ["Free", "$", "$$", "$$$", "$$$$"]
+        assert by_price["$"].count == 2
+        assert by_price["$"].avg_last_bill_price == 15.0
+        assert by_price["$$"].count == 1
+        assert by_price["$$"].avg_last_bill_price is None
+        assert by_price["$$$$"].count == 0
+    
+    def test_count_uses_precomputed_totals(self):
+        """Test counts without range filters match the stats."""
+        assert self.snapshot.count() == 4
+        assert self.snapshot.count(PriceLevel.LOW) == 2
+        assert self.snapshot.count(PriceLevel.LOW, ActivityFilter()) == 2
+        assert self.snapshot.count(PriceLevel.LOW, ActivityFilter(max_bill_price=15)) == 1
+    
+    def test_count_not_visited_in(self):
+        """Test not-visited windows include never-visited activities."""
+        today = date(2024, 6, 11)
+        assert self.snapshot.count_not_visited_in(5, today) == 4
+        assert self.snapshot.count_not_visited_in(10, today) == 3
+        assert self.snapshot.count_not_visited_in(200, today) == 2
+        assert set(self.snapshot.stats.not_visited_in_days) == {30, 90, 180, 365}
+
+
+class TestSnapshotUpdates:
+    """Test cases for CategorySnapshot.find and with_updates."""
+    
+    def test_with_updates_returns_new_snapshot(self):
+        """Test that updates rebuild columns without touching the original."""
+        snapshot = CategorySnapshot("Food", [
+            make_activity("Bistro", PriceLevel.MEDIUM),
+            make_activity("Picnic", PriceLevel.FREE),
+        ], version="7")
+        updated = snapshot.with_updates({"Bistro": {"last_bill_price": 42.0}, "Unknown": {}})
+        
+        assert snapshot.find("Bistro").last_bill_price is None
+        assert updated.find(" Bistro ").last_bill_price == 42.0
+        assert updated.version == "7"
+        assert updated.count(filters=ActivityFilter(min_bill_price=40)) == 1
+        assert updated.find("Unknown") is None
@@ -0,0 +1,157 @@
+"""
+Unit tests for snapshot change events.
+"""
+import asyncio
+import pytest
+import threading
+from backend.app.api import routes
+from backend.app.models import Activity, PriceLevel
+from backend.app.services.cache_service import cache_service
+from backend.app.services.sheets_service import GoogleSheetsService
+from backend.app.services.snapshot_events import (
+    MAX_CHANGED_NAMES,
+    SUBSCRIBER_QUEUE_SIZE,
+    SnapshotEventBus
+)
+from backend.app.services.visit_log import VisitLog
+
+
+class FakeRequest:
+    """Request stand-in that never disconnects."""
+    
+    async def is_disconnected(self):
+        return False
+
+
+class TestSnapshotEventBus:
+    """Test cases for SnapshotEventBus."""
+    
+    def test_publish_from_another_thread(self):
+        """Test that events published by worker threads reach subscribers."""
+        bus = SnapshotEventBus()
+        
+        async def scenario():
+            subscription, missed = bus.subscribe()
+            assert missed == []
+            thread = threading.Thread(target=bus.publish, args=("Food", "12", ["Bistro"]))
+            thread.start()
+            thread.join()
+            return await asyncio.wait_for(subscription.queue.get(), 1)
+        
+        event = asyncio.run(scenario())
+        assert (event.id, event.category, event.version, event.changed) == (1, "Food", "12", ["Bistro"])
+    
+    def test_replay_after_reconnect(self):
+        """Test that a reconnecting client gets the events it missed."""
+        bus = SnapshotEventBus()
+        for category in ("Food", "Fun", "Culture"):
+            bus.publish(category, None, [])
+        
+        async def scenario():
+            return [bus.subscribe(last_event_id)[1] for last_event_id in (1, 3, 9)]
+        
+        after_first, up_to_date, unknown = asyncio.run(scenario())
+        assert [event.category for event in after_first] == ["Fun", "Culture"]
+        assert up_to_date == []
+        assert unknown is None
+    
+    def test_history_gap_requires_reset(self):
+        """Test that events older than the history cannot be replayed."""
+        bus = SnapshotEventBus(history_size=2)
+        for _ in range(5):
+            bus.publish("Food", None, [])
+        
+        async def scenario():
+            return bus.subscribe(1)[1], bus.subscribe(3)[1]
+        
+        too_old, recent = asyncio.run(scenario())
+        assert too_old is None
+        assert [event.id for event in recent] == [4, 5]
+    
+    def test_large_changes_are_summarized(self):
+        """Test that huge change lists are replaced by a reload hint."""
+        bus = SnapshotEventBus()
+        event = bus.publish("Food", None, [f"A{i}" for i in range(MAX_CHANGED_NAMES + 1)])
+        assert event.changed is None
+    
+    def test_slow_subscriber_overflows(self):
+        """Test that a client that stops reading is flagged instead of blocking."""
+        bus = SnapshotEventBus()
+        
+        async def scenario():
+            subscription, _ = bus.subscribe()
+            for _ in range(SUBSCRIBER_QUEUE_SIZE + 1):
+                bus.publish("Food", None, [])
+            await asyncio.sleep(0)
+            return subscription
+        
+        assert asyncio.run(scenario()).overflowed
+    
+    def test_sse_stream_format(self):
+        """Test the messages written to an EventSource client."""
+        bus = SnapshotEventBus()
+        
+        async def scenario():
+            subscription, missed = bus.subscribe()
+            stream = routes._sse_stream(FakeRequest(), bus, subscription, [])
+            messages = [await stream.__anext__(), await stream.__anext__()]
+            bus.publish("Food", "7", ["Bistro"])
+            messages.append(await stream.__anext__())
+            await stream.aclose()
+            return messages
+        
+        retry, ready, snapshot = asyncio.run(scenario())
+        
+        assert retry.startswith("retry: ")
+        assert ready.startswith("id: 0\nevent: ready\n")
+        assert snapshot.startswith("id: 1\nevent: snapshot\ndata: ")
+        assert '"changed": ["Bistro"]' in snapshot
+        assert bus.subscriber_count == 0
+
+
+class TestSnapshotPublishing:
+    """Test cases for events published by the Sheets service."""
+    
+    def setup_method(self):
+        """Set up a mock-data service with its own event bus and visit log."""
+        cache_service.clear()
+        self.bus = SnapshotEventBus()
+        self.service = GoogleSheetsService(journal=VisitLog(), events=self.bus)
+    
+    def teardown_method(self):
+        """Clean up the cache."""
+        cache_service.clear()
+    
+    def test_only_changes_are_published(self):
+        """Test that first loads and unchanged refreshes stay silent."""
+        activities = [
+            Activity(name="Bistro", price_level=PriceLevel.MEDIUM, category="Food"),
+            Activity(name="Picnic", price_level=PriceLevel.FREE, category="Food"),
+        ]
+        self.service._store_snapshot("Food", activities, "1")
+        self.service._store_snapshot("Food", activities, "2")
+        assert self.bus.last_id == 0
+        
+        edited = [
+            activities[0].model_copy(update={"notes": "New chef"}),
+            Activity(name="Diner", price_level=PriceLevel.LOW, category="Food"),
+        ]
+        self.service._store_snapshot("Food", edited, "3")
+        
+        async def scenario():
+            return self.bus.subscribe(0)[1]
+        
+        event, = asyncio.run(scenario())
+        assert event.version == "3"
+        assert event.changed == ["Bistro", "Diner"]
+        assert event.removed == ["Picnic"]
+    
+    def test_recorded_visit_is_published(self):
+        """Test that recording a visit announces the changed activity."""
+        self.service.record_orders("Food", "Pizza Place", ["Margherita"])
+        
+        async def scenario():
+            return self.bus.subscribe(0)[1]
+        
+        event, = asyncio.run(scenario())
+        assert (event.category, event.changed) == ("Food", ["Pizza Place"])
@@ -0,0 +1,61 @@
+"""
+Unit tests for batched suggestions.
+"""
+from fastapi.testclient import TestClient
+from backend.app.api.routes import MAX_BATCH_SIZE
+from backend.app.main import app
+from backend.app.services.cache_service import cache_service
+
+
+class TestSuggestBatch:
+    """Test cases for /api/suggest/batch."""
+    
+    def setup_method(self):
+        """Set up a test client."""
+        cache_service.clear()
+        self.client = TestClient(app)
+    
+    def teardown_method(self):
+        """Clean up the cache."""
+        cache_service.clear()
+    
+    def test_responses_follow_request_order(self):
+        """Test that each request gets its own response, in request order."""
+        requests = [
+            {"category": "Fun", "limit": 2},
+            {"category": "Food", "price_level": "$$$"},
+            {"category": "Fun", "limit": 1},
+        ]
+        response = self.client.post("/api/suggest/batch", json=requests)
+        assert response.status_code == 200
+        
+        results = response.json()
+        assert [r["category"] for r in results] == ["Fun", "Food", "Fun"]
+        assert [len(r["activities"]) for r in results] == [2, 1, 1]
+        assert results[1]["activities"][0]["name"] == "Sushi Restaurant"
+        assert all(a["category"] == "Fun" for a in results[0]["activities"])
+    
+    def test_empty_batch(self):
+        """Test that an empty batch gets an empty list."""
+        response = self.client.post("/api/suggest/batch", json=[])
+        assert response.status_code == 200
+        assert response.json() == []
+    
+    def test_batch_size_limit(self):
+        """Test that batches up to MAX_BATCH_SIZE are accepted and larger ones rejected."""
+        response = self.client.post("/api/suggest/batch", json=[{"category": "Food"}] * MAX_BATCH_SIZE)
+        assert response.status_code == 200
+        assert len(response.json()) == MAX_BATCH_SIZE
+        
+        response = self.client.post("/api/suggest/batch", json=[{"category": "Food"}] * (MAX_BATCH_SIZE + 1))
+        assert response.status_code == 400
+    
+    def test_unknown_category_is_rejected(self):
+        """Test that a misspelled category fails the batch with a 404 naming it."""
+        requests = [{"category": "Food"}, {"category": "Fod"}, {"category": "Fnu"}]
+        response = self.client.post("/api/suggest/batch", json=requests)
+        assert response.status_code == 404
+        assert response.json()["detail"] == "Unknown categories: Fod, Fnu"
+        
+        response = self.client.post("/api/suggest", json={"category": "Fod"})
+        assert response.status_code == 404
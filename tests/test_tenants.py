@@ -0,0 +1,367 @@
+"""
+Unit tests for tenant isolation and quotas.
+"""
+import asyncio
+import json
+import threading
+import pytest
+import fastapi.dependencies.utils as fastapi_dependencies
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from backend.app.api import routes
+from backend.app.main import app
+from backend.app.models import TenantConfig
+from backend.app.services import sheets_service as sheets_module
+from backend.app.services.admission import QuotaBudget, QuotaExceeded
+from backend.app.services.cache_service import cache_service
+from backend.app.services.sheets_service import DEFAULT_TENANT, GoogleSheetsService, sheets_service
+from backend.app.services.tenants import TenantRegistry, tenant_registry
+
+
+API_KEY = "acme-0123456789abcdef"
+
+
+class TestQuotaBudget:
+    """Test cases for QuotaBudget."""
+    
+    def test_unlimited_budget_counts_requests(self):
+        """Test that a budget without a rate never rejects."""
+        quota = QuotaBudget("a", None)
+        for _ in range(1000):
+            quota.consume()
+        assert quota.consumed == 1000
+    
+    def test_unlimited_budget_counts_concurrent_requests(self):
+        """Test that no request is lost when threads consume at the same time."""
+        quota = QuotaBudget("a", None)
+        
+        def consume():
+            for _ in range(10000):
+                quota.consume()
+        threads = [threading.Thread(target=consume) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert quota.consumed == 80000
+    
+    def test_burst_is_limited_to_one_minute(self):
+        """Test that a full bucket allows one minute of requests at once."""
+        quota = QuotaBudget("a", 60)
+        quota.consume(60)
+        with pytest.raises(QuotaExceeded) as error:
+            quota.consume()
+        assert 0 < error.value.retry_after <= 1.0
+        assert quota.consumed == 60
+
+
+class TestTenantRegistry:
+    """Test cases for TenantRegistry."""
+    
+    def setup_method(self):
+        """Set up a registry without journals."""
+        cache_service.clear()
+        self.registry = TenantRegistry(sheets_service)
+    
+    def teardown_method(self):
+        """Clean up the cache."""
+        cache_service.clear()
+    
+    def test_services_are_created_on_first_use(self, monkeypatch):
+        """Test that registering a tenant does not start its service."""
+        monkeypatch.setenv("VISIT_JOURNAL_FILE", "")
+        self.registry.register(TenantConfig(tenant_id="acme", spreadsheet_id="sheet-1", api_key=API_KEY))
+        assert self.registry.active_services() == [sheets_service]
+        
+        service = self.registry.get("acme")
+        assert service.tenant_id == "acme"
+        assert service.spreadsheet_id == "sheet-1"
+        assert service.visit_log is not sheets_service.visit_log
+        assert service.events is not sheets_service.events
+        assert self.registry.get("acme") is service
+        assert self.registry.get("unknown") is None
+        assert self.registry.tenant_ids() == [DEFAULT_TENANT, "acme"]
+    
+    def test_tenants_share_client_pools(self, monkeypatch):
+        """Test that tenants with the same key file share one client pool."""
+        monkeypatch.setenv("VISIT_JOURNAL_FILE", "")
+        monkeypatch.setattr(sheets_module, "_client_pools", {})
+        loaded = []
+        monkeypatch.setattr(
+            sheets_module.Credentials,
+            "from_service_account_file",
+            lambda path, scopes: loaded.append(path) or object()
+        )
+        for tenant_id, key_file in (("acme", "/keys/a.json"), ("globex", "/keys/a.json"), ("initech", "/keys/b.json")):
+            self.registry.register(TenantConfig(
+                tenant_id=tenant_id,
+                spreadsheet_id=f"sheet-{tenant_id}",
+                credentials_file=key_file,
+                api_key=API_KEY
+            ))
+        
+        acme, globex, initech = (self.registry.get(tenant_id) for tenant_id in ("acme", "globex", "initech"))
+        
+        assert acme._clients is globex._clients
+        assert initech._clients is not acme._clients
+        assert loaded == ["/keys/a.json", "/keys/b.json"]
+    
+    def test_duplicate_tenants_are_rejected(self):
+        """Test that a tenant id cannot be registered twice."""
+        config = TenantConfig(tenant_id="acme", spreadsheet_id="sheet-1", api_key=API_KEY)
+        self.registry.register(config)
+        with pytest.raises(ValueError):
+            self.registry.register(config)
+        with pytest.raises(ValueError):
+            self.registry.register(TenantConfig(tenant_id=DEFAULT_TENANT, spreadsheet_id="sheet-2", api_key=API_KEY))
+    
+    def test_load_file(self, tmp_path, monkeypatch):
+        """Test that every tenant of a valid file is registered."""
+        monkeypatch.setenv("VISIT_JOURNAL_FILE", "")
+        path = tmp_path / "tenants.json"
+        path.write_text(json.dumps([
+            {"tenant_id": "acme", "spreadsheet_id": "sheet-1", "api_key": API_KEY},
+            {"tenant_id": "globex", "spreadsheet_id": "sheet-2", "api_key": API_KEY},
+        ]))
+        
+        assert self.registry.load_file(str(path)) == 2
+        assert self.registry.tenant_ids() == [DEFAULT_TENANT, "acme", "globex"]
+    
+    @pytest.mark.parametrize("entries", [
+        # Duplicate within the file
+        [{"tenant_id": "acme", "spreadsheet_id": "sheet-1", "api_key": API_KEY},
+         {"tenant_id": "globex", "spreadsheet_id": "sheet-2", "api_key": API_KEY},
+         {"tenant_id": "acme", "spreadsheet_id": "sheet-3", "api_key": API_KEY}],
+        # Already registered
+        [{"tenant_id": "globex", "spreadsheet_id": "sheet-2", "api_key": API_KEY},
+         {"tenant_id": "initech", "spreadsheet_id": "sheet-3", "api_key": API_KEY}],
+        # Invalid entry after a valid one
+        [{"tenant_id": "globex", "spreadsheet_id": "sheet-2", "api_key": API_KEY},
+         {"tenant_id": "bad id", "spreadsheet_id": "sheet-3", "api_key": API_KEY}],
+        # Not a tenant at all
+        [{"tenant_id": "globex", "spreadsheet_id": "sheet-2", "api_key": API_KEY}, "acme"],
+        {"tenant_id": "globex", "spreadsheet_id": "sheet-2", "api_key": API_KEY},
+    ])
+    def test_load_file_registers_all_or_nothing(self, entries, tmp_path, monkeypatch):
+        """Test that a bad entry anywhere in the file registers no tenant from it."""
+        monkeypatch.setenv("VISIT_JOURNAL_FILE", "")
+        self.registry.register(TenantConfig(tenant_id="initech", spreadsheet_id="sheet-0", api_key=API_KEY))
+        path = tmp_path / "tenants.json"
+        path.write_text(json.dumps(entries))
+        
+        with pytest.raises(ValueError):
+            self.registry.load_file(str(path))
+        assert self.registry.tenant_ids() == [DEFAULT_TENANT, "initech"]
+    
+    def test_api_keys(self, monkeypatch):
+        """Test that tenants only accept their own key."""
+        self.registry.register(TenantConfig(tenant_id="acme", spreadsheet_id="sheet-1", api_key=API_KEY))
+        assert self.registry.check_api_key("acme", API_KEY)
+        assert not self.registry.check_api_key("acme", None)
+        assert not self.registry.check_api_key("acme", API_KEY[:-1])
+        assert not self.registry.check_api_key("unknown", API_KEY)
+        
+        monkeypatch.delenv("DEFAULT_TENANT_API_KEY", raising=False)
+        assert self.registry.check_api_key(DEFAULT_TENANT, None)
+        monkeypatch.setenv("DEFAULT_TENANT_API_KEY", "household-key")
+        assert not self.registry.check_api_key(DEFAULT_TENANT, None)
+        assert not self.registry.check_api_key(DEFAULT_TENANT, API_KEY)
+        assert self.registry.check_api_key(DEFAULT_TENANT, "household-key")
+    
+    def test_short_api_keys_are_invalid(self):
+        """Test that tenants cannot be configured with a guessable key."""
+        with pytest.raises(ValueError):
+            TenantConfig(tenant_id="acme", spreadsheet_id="sheet-1", api_key="short")
+        with pytest.raises(ValueError):
+            TenantConfig(tenant_id="acme", spreadsheet_id="sheet-1")
+    
+    def test_cache_keys_are_namespaced(self):
+        """Test that tenants with the same categories do not share snapshots."""
+        first = GoogleSheetsService(tenant_id="a")
+        second = GoogleSheetsService(tenant_id="b")
+        first.get_category_snapshot("Food")
+        second.get_category_snapshot("Food")
+        
+        usage = cache_service.namespace_usage()
+        assert usage["a"] > 0 and usage["b"] > 0
+        
+        cache_service.clear("a")
+        assert first.cached_snapshots(["Food"]) is None
+        assert second.cached_snapshots(["Food"]) is not None
+
+
+class TestTenantRouting:
+    """Test cases for tenant resolution in the API."""
+    
+    def setup_method(self):
+        """Set up a test client."""
+        cache_service.clear()
+        self.client = TestClient(app)
+    
+    def teardown_method(self):
+        """Clean up the cache."""
+        cache_service.clear()
+    
+    def test_unknown_tenant_is_rejected(self):
+        """Test that requests for an unregistered tenant get a 404."""
+        response = self.client.get("/api/categories", headers={"X-Tenant-ID": "nobody"})
+        assert response.status_code == 404
+        
+        response = self.client.get("/api/cache/stats", params={"tenant": "nobody"})
+        assert response.status_code == 404
+    
+    def test_default_tenant(self):
+        """Test that requests without a tenant use the default spreadsheet."""
+        response = self.client.get("/api/cache/stats")
+        assert response.status_code == 200
+        assert list(response.json()["namespaces"]) == [DEFAULT_TENANT]
+    
+    def test_health_needs_no_tenant(self, monkeypatch):
+        """Test that liveness probes pass whatever tenant or key they send."""
+        monkeypatch.setenv("DEFAULT_TENANT_API_KEY", "household-key")
+        assert self.client.get("/api/health").status_code == 200
+        assert self.client.get("/api/health", headers={"X-Tenant-ID": "nobody"}).status_code == 200
+        assert "tenant" not in self.client.get("/api/health").json()
+    
+    def test_quota_exhaustion_returns_429(self, monkeypatch):
+        """Test that a tenant over its quota gets a 429 with Retry-After."""
+        def exhausted(categories, revalidate=False):
+            raise QuotaExceeded(DEFAULT_TENANT, "Sheets API quota exhausted", 12.5)
+        monkeypatch.setattr(sheets_service, "get_category_snapshots", exhausted)
+        
+        response = self.client.post("/api/suggest", json={"category": "Food"})
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == "13"
+    
+    def test_registration_requires_admin_token(self, monkeypatch):
+        """Test that tenants can only be added with the admin token."""
+        config = {"tenant_id": "route-test", "spreadsheet_id": "sheet-1", "api_key": API_KEY}
+        response = self.client.post("/api/tenants", json=config)
+        assert response.status_code == 403
+        
+        monkeypatch.setenv("TENANT_ADMIN_TOKEN", "secret")
+        monkeypatch.setenv("VISIT_JOURNAL_FILE", "")
+        monkeypatch.setattr(tenant_registry, "_configs", {})
+        monkeypatch.setattr(tenant_registry, "_services", dict(tenant_registry._services))
+        response = self.client.post("/api/tenants", json=config, headers={"X-Admin-Token": "wrong"})
+        assert response.status_code == 403
+        
+        response = self.client.post("/api/tenants", json=config, headers={"X-Admin-Token": "secret"})
+        assert response.status_code == 201
+        assert response.json() == {"tenant_id": "route-test"}
+        response = self.client.get("/api/cache/stats", headers={"X-Tenant-ID": "route-test", "X-API-Key": API_KEY})
+        assert list(response.json()["namespaces"]) == ["route-test"]
+
+
+class TestTenantAuthentication:
+    """Test cases for per-tenant API keys in the API."""
+    
+    def setup_method(self):
+        """Register a tenant with mock data."""
+        cache_service.clear()
+        self.client = TestClient(app)
+        self.configs = tenant_registry._configs
+        self.services = tenant_registry._services
+        tenant_registry._configs = {}
+        tenant_registry._services = dict(self.services)
+        tenant_registry._configs["acme"] = TenantConfig(tenant_id="acme", spreadsheet_id="sheet-1", api_key=API_KEY)
+        tenant_registry._services["acme"] = GoogleSheetsService(tenant_id="acme")
+    
+    def teardown_method(self):
+        """Restore the registry and clean up the cache."""
+        tenant_registry._configs = self.configs
+        tenant_registry._services = self.services
+        cache_service.clear()
+    
+    def test_requests_without_the_key_are_rejected(self):
+        """Test that reads and writes of a tenant need its API key."""
+        requests = [
+            ("GET", "/api/categories", None),
+            ("GET", "/api/activities?category=Food", None),
+            ("POST", "/api/suggest", {"category": "Food"}),
+            ("POST", "/api/visits", {"category": "Food", "name": "Pizza Place"}),
+            ("GET", "/api/cache/stats", None),
+            ("DELETE", "/api/cache/clear", None),
+        ]
+        for method, url, body in requests:
+            for key in (None, "wrong-key-0123456789"):
+                headers = {"X-Tenant-ID": "acme", **({"X-API-Key": key} if key else {})}
+                response = self.client.request(method, url, json=body, headers=headers)
+                assert response.status_code == 401, (method, url, key)
+    
+    def test_key_in_header_or_event_query(self):
+        """Test that the key is only accepted in the query string by the event stream."""
+        response = self.client.get("/api/categories", headers={"X-Tenant-ID": "acme", "X-API-Key": API_KEY})
+        assert response.status_code == 200
+        
+        response = self.client.get("/api/categories", params={"tenant": "acme", "api_key": API_KEY})
+        assert response.status_code == 401
+        
+        service = asyncio.run(routes.get_event_tenant_service(
+            x_tenant_id=None, x_api_key=None, tenant="acme", api_key=API_KEY
+        ))
+        assert service.tenant_id == "acme"
+        with pytest.raises(HTTPException) as error:
+            asyncio.run(routes.get_event_tenant_service(
+                x_tenant_id=None, x_api_key=None, tenant="acme", api_key=None
+            ))
+        assert error.value.status_code == 401
+    
+    def test_started_tenants_resolve_without_the_threadpool(self, monkeypatch):
+        """Test that cached requests of a started tenant never wait for a worker thread."""
+        headers = {"X-Tenant-ID": "acme", "X-API-Key": API_KEY}
+        self.client.get("/api/activities", params={"category": "Food"}, headers=headers)
+        
+        calls = []
+        
+        async def no_threadpool(func, *args, **kwargs):
+            calls.append(func)
+            return func(*args, **kwargs)
+        monkeypatch.setattr(fastapi_dependencies, "run_in_threadpool", no_threadpool)
+        monkeypatch.setattr(routes, "run_in_threadpool", no_threadpool)
+        
+        response = self.client.get("/api/activities", params={"category": "Food"}, headers=headers)
+        assert response.status_code == 200
+        assert calls == []
+    
+    def test_first_request_starts_the_tenant(self, monkeypatch):
+        """Test that a registered but idle tenant's service is created on demand."""
+        monkeypatch.setenv("VISIT_JOURNAL_FILE", "")
+        del tenant_registry._services["acme"]
+        headers = {"X-Tenant-ID": "acme", "X-API-Key": API_KEY}
+        assert self.client.get("/api/cache/stats", headers=headers).status_code == 200
+        assert tenant_registry.started("acme") is not None
+    
+    def test_another_tenants_key_is_rejected(self):
+        """Test that a key only opens its own tenant."""
+        response = self.client.get("/api/categories", headers={"X-API-Key": API_KEY})
+        assert response.status_code == 200
+        
+        tenant_registry._configs["other"] = TenantConfig(
+            tenant_id="other", spreadsheet_id="sheet-2", api_key="other-0123456789abcdef"
+        )
+        response = self.client.get("/api/categories", headers={"X-Tenant-ID": "other", "X-API-Key": API_KEY})
+        assert response.status_code == 401
+    
+    def test_default_tenant_key(self, monkeypatch):
+        """Test that DEFAULT_TENANT_API_KEY protects the default spreadsheet."""
+        monkeypatch.setenv("DEFAULT_TENANT_API_KEY", "household-key")
+        assert self.client.get("/api/categories").status_code == 401
+        response = self.client.get("/api/categories", headers={"X-API-Key": "household-key"})
+        assert response.status_code == 200
+    
+    def test_cache_stats_are_scoped(self):
+        """Test that a tenant only sees its own cache keys."""
+        headers = {"X-Tenant-ID": "acme", "X-API-Key": API_KEY}
+        self.client.get("/api/activities", params={"category": "Food"}, headers=headers)
+        self.client.get("/api/activities", params={"category": "Food"})
+        
+        stats = self.client.get("/api/cache/stats", headers=headers).json()
+        assert stats["keys"] and all(key.startswith("acme:") for key in stats["keys"])
+        assert all(key.startswith("acme:") for key in stats["key_stats"])
+        assert list(stats["namespaces"]) == ["acme"]
+        assert stats["total_entries"] == len(stats["keys"])
+        
+        stats = self.client.get("/api/cache/stats").json()
+        assert stats["keys"] and not any(key.startswith("acme:") for key in stats["keys"])
@@ -0,0 +1,225 @@
+"""
+Unit tests for write-behind visit logging.
+"""
+import os
+import pytest
+import threading
+from datetime import date
+from backend.app.services.cache_service import cache_service
+from backend.app.services import visit_log as visit_log_module
+from backend.app.services.sheets_service import GoogleSheetsService
+from backend.app.services.tenants import tenant_journal_path
+from backend.app.services.visit_log import VisitLog, data_path
+
+
+class TestVisitLog:
+    """Test cases for VisitLog."""
+    
+    def test_updates_are_coalesced_per_activity(self, tmp_path):
+        """Test that later updates of an activity override earlier ones."""
+        log = VisitLog(str(tmp_path / "journal.jsonl"))
+        log.record("Food", "Bistro", {"last_visit_date": "2024-01-01", "last_bill_price": 40.0})
+        log.record("Food", "Bistro", {"last_visit_date": "2024-02-01"})
+        log.record("Fun", "Arcade", {"past_orders": ["Tokens"]})
+        
+        assert log.pending_count == 2
+        assert log.pending_for("Food") == {
+            "Bistro": {"last_visit_date": "2024-02-01", "last_bill_price": 40.0}
+        }
+    
+    def test_journal_survives_restart(self, tmp_path):
+        """Test that queued updates are replayed from the journal."""
+        path = str(tmp_path / "journal.jsonl")
+        log = VisitLog(path)
+        log.record("Food", "Bistro", {"last_visit_date": "2024-01-01"})
+        log.record("Food", "Bistro", {"last_bill_price": 40.0})
+        with open(path, "a") as journal:
+            journal.write('{"category": "Food", "na')
+        
+        restarted = VisitLog(path)
+        assert restarted.pending_for("Food") == {
+            "Bistro": {"last_visit_date": "2024-01-01", "last_bill_price": 40.0}
+        }
+    
+    def test_flush_writes_once_and_compacts(self, tmp_path):
+        """Test that a successful flush empties the queue and the journal."""
+        path = str(tmp_path / "journal.jsonl")
+        log = VisitLog(path)
+        log.record("Food", "Bistro", {"last_visit_date": "2024-01-01"})
+        log.record("Fun", "Arcade", {"past_orders": ["Tokens"]})
+        
+        batches = []
+        assert log.flush(batches.append) == 2
+        assert len(batches) == 1
+        assert set(batches[0]) == {("Food", "Bistro"), ("Fun", "Arcade")}
+        assert log.pending_count == 0
+        assert VisitLog(path).pending_count == 0
+        assert log.flush(batches.append) == 0
+    
+    def test_failed_flush_keeps_updates(self, tmp_path):
+        """Test that updates stay queued when the writer fails."""
+        path = str(tmp_path / "journal.jsonl")
+        log = VisitLog(path)
+        log.record("Food", "Bistro", {"last_visit_date": "2024-01-01"})
+        
+        def failing_writer(batch):
+            raise RuntimeError("quota exceeded")
+        
+        with pytest.raises(RuntimeError):
+            log.flush(failing_writer)
+        assert log.pending_count == 1
+        assert VisitLog(path).pending_count == 1
+    
+    def test_updates_recorded_during_flush_are_kept(self):
+        """Test that an update arriving mid-flush is written by the next flush."""
+        log = VisitLog()
+        log.record("Food", "Bistro", {"last_visit_date": "2024-01-01"})
+        
+        def writer(batch):
+            log.record("Food", "Bistro", {"last_visit_date": "2024-03-01"})
+        
+        log.flush(writer)
+        assert log.pending_for("Food") == {"Bistro": {"last_visit_date": "2024-03-01"}}
+    
+    def test_written_updates_are_kept_until_settled(self):
+        """Test that rows read before a flush still get its updates."""
+        log = VisitLog()
+        log.record("Food", "Bistro", {"last_visit_date": "2024-01-01"})
+        read_at = log.generation
+        log.flush(lambda batch: None)
+        
+        assert log.pending_for("Food") == {}
+        assert log.pending_for("Food", since=read_at) == {"Bistro": {"last_visit_date": "2024-01-01"}}
+        assert log.pending_for("Food", since=log.generation) == {}
+        
+        log.settle("Fun", log.generation)
+        assert log.pending_for("Food", since=read_at) != {}
+        log.settle("Food", log.generation)
+        assert log.pending_for("Food", since=read_at) == {}
+    
+    def test_concurrent_records(self, tmp_path):
+        """Test that concurrent records are all journaled."""
+        path = str(tmp_path / "journal.jsonl")
+        log = VisitLog(path)
+        
+        def worker(index):
+            for i in range(20):
+                log.record("Food", f"Activity {index}-{i}", {"last_bill_price": float(i)})
+        
+        threads = [threading.Thread(target=worker, args=(index,)) for index in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert log.pending_count == 80
+        assert VisitLog(path).pending_count == 80
+
+
+class TestJournalPaths:
+    """Test cases for locating journals in the data directory."""
+    
+    def test_relative_paths_use_the_data_directory(self, tmp_path, monkeypatch):
+        """Test that journal paths do not depend on the working directory."""
+        monkeypatch.setattr(visit_log_module, "DATA_DIR", str(tmp_path / "data"))
+        monkeypatch.chdir(tmp_path)
+        
+        path = data_path("journals/visits.jsonl")
+        assert path == str(tmp_path / "data" / "journals" / "visits.jsonl")
+        assert not (tmp_path / "data").exists()
+        
+        log = VisitLog(path)
+        log.record("Food", "Bistro", {"last_visit_date": "2024-01-01"})
+        assert VisitLog(path).pending_count == 1
+        
+        absolute = str(tmp_path / "elsewhere" / "visits.jsonl")
+        assert data_path(absolute) == absolute
+    
+    def test_tenant_journals(self, tmp_path, monkeypatch):
+        """Test that tenant journals sit next to the default journal."""
+        monkeypatch.setattr(visit_log_module, "DATA_DIR", str(tmp_path))
+        monkeypatch.setenv("VISIT_JOURNAL_FILE", "visit_journal.jsonl")
+        assert tenant_journal_path("acme") == str(tmp_path / "visit_journal.acme.jsonl")
+        
+        monkeypatch.setenv("VISIT_JOURNAL_FILE", "")
+        assert tenant_journal_path("acme") is None
+    
+    def test_default_data_directory_is_absolute(self):
+        """Test that the default journal location is fixed at startup."""
+        journal_path = visit_log_module.visit_log.journal_path
+        assert os.path.isabs(visit_log_module.DATA_DIR)
+        assert journal_path is None or os.path.isabs(journal_path)
+
+
+class TestRecordVisit:
+    """Test cases for recording visits against cached snapshots."""
+    
+    def setup_method(self):
+        """Set up a mock-data service with an in-memory visit log."""
+        cache_service.clear()
+        self.log = VisitLog()
+        self.service = GoogleSheetsService(journal=self.log)
+    
+    def teardown_method(self):
+        """Clean up the cache."""
+        cache_service.clear()
+    
+    def test_visit_updates_snapshot_immediately(self):
+        """Test that a recorded visit is visible before it is written."""
+        activity = self.service.record_visit(
+            "Food", "Pizza Place",
+            visit_date=date(2024, 5, 1),
+            bill_price=32.5,
+            orders=["Margherita"]
+        )
+        assert activity.last_visit_date == "2024-05-01"
+        assert activity.last_bill_price == 32.5
+        assert activity.past_orders == ["Margherita"]
+        
+        snapshot = self.service.get_category_snapshot("Food")
+        assert snapshot.find("Pizza Place").last_visit_date == "2024-05-01"
+        assert snapshot.stats.visited_count == 1
+        assert self.log.pending_for("Food")["Pizza Place"]["last_bill_price"] == 32.5
+    
+    def test_older_visit_only_adds_orders(self):
+        """Test that back-dated visits do not move the last visit backwards."""
+        self.service.record_visit("Food", "Food Truck", visit_date=date(2024, 5, 1), bill_price=12.0)
+        activity = self.service.record_visit(
+            "Food", "Food Truck",
+            visit_date=date(2024, 4, 1),
+            bill_price=99.0,
+            orders=["Tacos"]
+        )
+        assert activity.last_visit_date == "2024-05-01"
+        assert activity.last_bill_price == 12.0
+        assert activity.past_orders == ["Tacos"]
+    
+    def test_pending_updates_survive_refresh(self):
+        """Test that unwritten visits are re-applied when a snapshot is rebuilt."""
+        self.service.record_orders("Fun", "Arcade", ["Tokens"])
+        cache_service.clear()
+        
+        snapshot = self.service.get_category_snapshot("Fun")
+        assert snapshot.find("Arcade").past_orders == ["Tokens"]
+    
+    def test_visits_flushed_during_a_refresh_are_kept(self, monkeypatch):
+        """Test that a refresh reading rows before a flush does not revert its visits."""
+        self.service.record_orders("Fun", "Arcade", ["Tokens"])
+        cache_service.clear()
+        read_rows = self.service._get_mock_activities
+        
+        def read_rows_then_flush(category):
+            activities = read_rows(category)
+            self.service.flush_visits()
+            return activities
+        monkeypatch.setattr(self.service, "_get_mock_activities", read_rows_then_flush)
+        
+        snapshot = self.service.get_category_snapshot("Fun")
+        assert self.log.pending_count == 0
+        assert snapshot.find("Arcade").past_orders == ["Tokens"]
+    
+    def test_unknown_activity(self):
+        """Test recording a visit to an activity that does not exist."""
+        with pytest.raises(KeyError):
+            self.service.record_visit("Food", "Nowhere")
+        assert self.log.pending_count == 0